@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AbtestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'abtests'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .cache import abtest_cache, variant_project_id
+        from .models import ABTest, ABTestVariant
+        abtest_cache.connect(ABTest, lambda test: test.project_id)
+        abtest_cache.connect(ABTestVariant, variant_project_id)
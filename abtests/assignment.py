@@ -0,0 +1,75 @@
+"""
+Stateless A/B variant assignment for anonymous widget visitors.
+
+A visitor is identified only by ``client_id``. Hashing ``(ab_test_id,
+client_id)`` gives a stable point in [0, 1): the first hash decides whether
+the visitor is in the test's traffic share, the second picks a variant by
+``ABTestVariant.weight``. Nothing is stored per visitor, and the compiled
+per-project variant table travels with the cached widget config.
+"""
+import hashlib
+from bisect import bisect_right
+
+from .models import ABTestVariant
+
+
+def _unit_hash(*parts):
+    digest = hashlib.blake2b(':'.join(str(part) for part in parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def compile_project_tests(project_id):
+    """
+    Таблица тестов проекта: кортежи (test_id, traffic_share, cumulative_weights, variants).
+    variants — кортежи (variant_id, name, channel_order, copy_text). Один запрос.
+    """
+    rows = (
+        ABTestVariant.objects
+        .filter(ab_test__project_id=project_id, weight__gt=0)
+        .order_by('ab_test_id', 'id')
+        .values_list(
+            'ab_test_id', 'ab_test__traffic_percentage',
+            'id', 'name', 'channel_order', 'copy_text', 'weight',
+        )
+    )
+
+    tests = {}
+    for test_id, traffic, variant_id, name, channel_order, copy_text, weight in rows:
+        test = tests.setdefault(test_id, (min(max(traffic, 0), 100) / 100, [], []))
+        cumulative = test[1]
+        cumulative.append((cumulative[-1] if cumulative else 0) + weight)
+        test[2].append((variant_id, name, channel_order or [], copy_text or {}))
+
+    return tuple(
+        (test_id, traffic, tuple(cumulative), tuple(variants))
+        for test_id, (traffic, cumulative, variants) in tests.items()
+    )
+
+
+def assign_variants(compiled_tests, client_id):
+    """Варианты, выпавшие посетителю: список (test_id, variant) в порядке тестов."""
+    if not client_id:
+        return []
+
+    assigned = []
+    for test_id, traffic, cumulative, variants in compiled_tests:
+        if _unit_hash(test_id, client_id, 'traffic') >= traffic:
+            continue
+        point = _unit_hash(test_id, client_id, 'variant') * cumulative[-1]
+        assigned.append((test_id, variants[bisect_right(cumulative, point)]))
+    return assigned
+
+
+def apply_channel_order(channels, channel_order):
+    """Сортирует каналы по channel_order (id или type канала); остальные — в исходном порядке."""
+    if not channel_order:
+        return channels
+    rank = {}
+    for position, key in enumerate(channel_order):
+        rank.setdefault(str(key), position)
+
+    def sort_key(channel):
+        position = rank.get(str(channel['id']), rank.get(channel['type']))
+        return (0, position) if position is not None else (1, 0)
+
+    return sorted(channels, key=sort_key)
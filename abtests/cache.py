@@ -0,0 +1,10 @@
+from core.cache import CacheNamespace
+
+# A/B-тесты и варианты проекта; scope — id проекта
+abtest_cache = CacheNamespace('abtests')
+
+
+def variant_project_id(variant):
+    # При каскадном удалении теста его строки уже может не быть — тогда версию поднимет сам тест
+    from .models import ABTest
+    return ABTest.objects.filter(id=variant.ab_test_id).values_list('project_id', flat=True).first()
@@ -0,0 +1,171 @@
+"""
+A/B exposure and conversion counters.
+
+Events are counted in per-process memory and flushed as aggregated
+increments into ``VariantDailyStats`` — one UPDATE per (variant, day) per
+flush instead of one row per event. A flush happens on the first event
+after ``ABTEST_EVENTS_FLUSH_INTERVAL`` seconds and at process exit, so a
+crash loses at most one interval of counts. Counts whose write fails go
+back into the buffer for the next flush.
+
+An exposure is counted once per visitor (``client_id``), variant and day,
+like conversions are counted once per lead: repeat page views and 304
+revalidations don't inflate the denominator of the results z-test. The
+"seen" marks live in the shared cache (``cache.add``), with a per-process
+set in front so repeat views by the same visitor cost no cache call.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import VariantDailyStats
+
+
+logger = logging.getLogger('abtests.events')
+
+# Метка "посетитель уже видел вариант сегодня" живет дольше суток: ключ содержит дату
+EXPOSURE_MARK_TIMEOUT = 2 * 86400
+# Размер локального множества меток; при переполнении оно очищается
+LOCAL_MARKS_SIZE = 100000
+
+
+class VariantCounters:
+    def __init__(self, flush_interval=None):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: [0, 0])
+        self._last_flush = time.monotonic()
+
+    def record(self, variant_ids, exposures=0, conversions=0, flush=True):
+        """Учитывает события. Возвращает True, если пора сбросить счетчики в БД."""
+        day = timezone.localdate()
+        interval = self.flush_interval
+        if interval is None:
+            interval = settings.ABTEST_EVENTS_FLUSH_INTERVAL
+        with self._lock:
+            for variant_id in variant_ids:
+                counts = self._counts[(variant_id, day)]
+                counts[0] += exposures
+                counts[1] += conversions
+            due = time.monotonic() - self._last_flush >= interval
+        if due and flush:
+            self.flush()
+        return due
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(lambda: [0, 0])
+            self._last_flush = time.monotonic()
+
+        failed, error = {}, None
+        for (variant_id, day), (exposures, conversions) in counts.items():
+            try:
+                _increment(variant_id, day, exposures, conversions)
+            except DatabaseError as e:
+                failed[(variant_id, day)], error = (exposures, conversions), e
+        if failed:
+            logger.error('A/B counters of %s variants were not flushed, retrying later', len(failed), exc_info=error)
+            with self._lock:
+                for key, (exposures, conversions) in failed.items():
+                    counts = self._counts[key]
+                    counts[0] += exposures
+                    counts[1] += conversions
+
+
+def _increment(variant_id, day, exposures, conversions):
+    updated = VariantDailyStats.objects.filter(variant_id=variant_id, day=day).update(
+        exposures=F('exposures') + exposures,
+        conversions=F('conversions') + conversions,
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            VariantDailyStats.objects.create(
+                variant_id=variant_id, day=day, exposures=exposures, conversions=conversions,
+            )
+    except IntegrityError:
+        # Строку создал другой процесс, либо вариант удален (тогда обновится 0 строк)
+        VariantDailyStats.objects.filter(variant_id=variant_id, day=day).update(
+            exposures=F('exposures') + exposures,
+            conversions=F('conversions') + conversions,
+        )
+
+
+counters = VariantCounters()
+atexit.register(counters.flush)
+
+
+class ExposureMarks:
+    """Какие (день, вариант, посетитель) уже учтены: локальное множество перед общим кешем."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = set()
+
+    def _keys(self, variant_ids, client_id):
+        day = timezone.localdate().isoformat()
+        client = hashlib.blake2b(str(client_id).encode(), digest_size=8).hexdigest()
+        keys = {}
+        with self._lock:
+            if len(self._local) > LOCAL_MARKS_SIZE:
+                self._local.clear()
+            for variant_id in variant_ids:
+                key = f'abtests:exposure:{day}:{variant_id}:{client}'
+                if key not in self._local:
+                    self._local.add(key)
+                    keys[variant_id] = key
+        return keys
+
+    def first(self, variant_ids, client_id):
+        """Варианты, которые посетитель видит сегодня впервые."""
+        cache = caches['default']
+        return [
+            variant_id for variant_id, key in self._keys(variant_ids, client_id).items()
+            if cache.add(key, 1, EXPOSURE_MARK_TIMEOUT)
+        ]
+
+    async def afirst(self, variant_ids, client_id):
+        cache = caches['default']
+        return [
+            variant_id for variant_id, key in self._keys(variant_ids, client_id).items()
+            if await cache.aadd(key, 1, EXPOSURE_MARK_TIMEOUT)
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+exposure_marks = ExposureMarks()
+
+
+def record_exposures(variant_ids, client_id):
+    if variant_ids and client_id:
+        variant_ids = exposure_marks.first(variant_ids, client_id)
+        if variant_ids:
+            counters.record(variant_ids, exposures=1)
+
+
+async def arecord_exposures(variant_ids, client_id):
+    if not variant_ids or not client_id:
+        return
+    variant_ids = await exposure_marks.afirst(variant_ids, client_id)
+    # Счет — в памяти; в БД (в потоке) уходит только периодический сброс
+    if variant_ids and counters.record(variant_ids, exposures=1, flush=False):
+        await sync_to_async(counters.flush)()
+
+
+def record_conversions(variant_ids):
+    if variant_ids:
+        counters.record(variant_ids, conversions=1)
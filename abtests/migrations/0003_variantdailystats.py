@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('abtests', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariantDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('exposures', models.PositiveBigIntegerField(default=0)),
+                ('conversions', models.PositiveBigIntegerField(default=0)),
+                ('variant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='abtests.abtestvariant')),
+            ],
+            options={
+                'unique_together': {('variant', 'day')},
+            },
+        ),
+    ]
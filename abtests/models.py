@@ -35,3 +35,17 @@ class UserVariant(models.Model):
 
     class Meta:
         unique_together = ['user', 'ab_test']
+
+
+class VariantDailyStats(models.Model):
+    """Агрегированные показы и конверсии варианта за день (не по строке на событие)."""
+    variant = models.ForeignKey(ABTestVariant, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    exposures = models.PositiveBigIntegerField(default=0)
+    conversions = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['variant', 'day']
+
+    def __str__(self) -> str:
+        return f"{self.variant_id} {self.day}: {self.conversions}/{self.exposures}"
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from leads.models import Lead
+from leads.signals import leads_bulk_created
+from .assignment import assign_variants
+from .events import record_conversions
+
+
+def _record_lead_conversions(leads):
+    from widget.config import get_widget_config
+
+    for lead in leads:
+        if not lead.client_id:
+            continue
+        config = get_widget_config(lead.project_id)
+        if config and config['ab_tests']:
+            assigned = assign_variants(config['ab_tests'], lead.client_id)
+            record_conversions([variant[0] for _, variant in assigned])
+
+
+@receiver(post_save, sender=Lead)
+def lead_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: _record_lead_conversions([instance]))
+
+
+@receiver(leads_bulk_created)
+def leads_bulk_created_handler(sender, leads, **kwargs):
+    _record_lead_conversions(leads)
@@ -0,0 +1,17 @@
+import math
+
+
+def conversion_rate(conversions, exposures):
+    return conversions / exposures if exposures else 0.0
+
+
+def two_proportion_test(control_conversions, control_exposures, conversions, exposures):
+    """Двусторонний z-тест для двух долей. Возвращает (z, p_value) или (None, None)."""
+    if not control_exposures or not exposures:
+        return None, None
+    pooled = (control_conversions + conversions) / (control_exposures + exposures)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / control_exposures + 1 / exposures))
+    if se == 0:
+        return None, None
+    z = (conversion_rate(conversions, exposures) - conversion_rate(control_conversions, control_exposures)) / se
+    return z, math.erfc(abs(z) / math.sqrt(2))
@@ -1,12 +1,74 @@
+from django.db.models import Q, Sum
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import ABTest, ABTestVariant, UserVariant
 from .serializers import ABTestSerializer, ABTestVariantSerializer, UserVariantSerializer
+from .events import counters
+from .stats import conversion_rate, two_proportion_test
 
 
 class ABTestViewSet(viewsets.ModelViewSet):
     queryset = ABTest.objects.all()
     serializer_class = ABTestSerializer
 
+    @action(detail=True, methods=['get'])
+    def results(self, request, pk=None):
+        """Конверсия вариантов и значимость отличий от контрольного (?date_from, ?date_to, ?alpha)"""
+        ab_test = self.get_object()
+        # Сбрасываем счетчики этого процесса, чтобы видеть свежие данные
+        counters.flush()
+
+        period = Q()
+        date_from = parse_date(request.query_params.get('date_from', ''))
+        date_to = parse_date(request.query_params.get('date_to', ''))
+        if date_from:
+            period &= Q(daily_stats__day__gte=date_from)
+        if date_to:
+            period &= Q(daily_stats__day__lte=date_to)
+        try:
+            alpha = float(request.query_params.get('alpha', 0.05))
+        except ValueError:
+            alpha = 0.05
+
+        variants = list(
+            ab_test.variants
+            .order_by('id')
+            .annotate(
+                exposures=Sum('daily_stats__exposures', filter=period),
+                conversions=Sum('daily_stats__conversions', filter=period),
+            )
+        )
+        control = next((v for v in variants if v.is_control), variants[0] if variants else None)
+
+        results = []
+        for variant in variants:
+            exposures = variant.exposures or 0
+            conversions = variant.conversions or 0
+            row = {
+                'variant_id': variant.id,
+                'name': variant.name,
+                'is_control': variant is control,
+                'exposures': exposures,
+                'conversions': conversions,
+                'conversion_rate': conversion_rate(conversions, exposures),
+            }
+            if variant is not control:
+                control_exposures = control.exposures or 0
+                control_conversions = control.conversions or 0
+                control_rate = conversion_rate(control_conversions, control_exposures)
+                z, p_value = two_proportion_test(control_conversions, control_exposures, conversions, exposures)
+                row.update({
+                    'lift': (row['conversion_rate'] - control_rate) / control_rate if control_rate else None,
+                    'z_score': z,
+                    'p_value': p_value,
+                    'significant': p_value is not None and p_value < alpha,
+                })
+            results.append(row)
+
+        return Response({'ab_test': ab_test.id, 'alpha': alpha, 'variants': results})
+
 
 class ABTestVariantViewSet(viewsets.ModelViewSet):
     queryset = ABTestVariant.objects.all()
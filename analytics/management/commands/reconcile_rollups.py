@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from analytics.rollups import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает роллапы лидов из сырых таблиц за период'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Сколько последних дней пересчитать')
+        parser.add_argument('--since', help='Начальная дата (YYYY-MM-DD), вместо --days')
+        parser.add_argument('--until', help='Конечная дата включительно (YYYY-MM-DD), по умолчанию сегодня')
+
+    def handle(self, *args, **options):
+        end_day = parse_date(options['until']) if options['until'] else timezone.localdate()
+        if options['since']:
+            start_day = parse_date(options['since'])
+        else:
+            start_day = end_day - timedelta(days=options['days'] - 1)
+        if start_day is None or end_day is None or start_day > end_day:
+            raise CommandError('Invalid date range')
+
+        for day, total in reconcile(start_day, end_day):
+            self.stdout.write(f'{day}: {total} rows rolled up')
+        self.stdout.write(self.style.SUCCESS('Rollups reconciled'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('kind', models.CharField(choices=[('lead', 'Lead'), ('callback', 'Callback')], max_length=10)),
+                ('channel_id', models.BigIntegerField(default=0)),
+                ('utm_source', models.CharField(blank=True, default='', max_length=100)),
+                ('utm_medium', models.CharField(blank=True, default='', max_length=100)),
+                ('utm_campaign', models.CharField(blank=True, default='', max_length=100)),
+                ('device_type', models.CharField(blank=True, default='', max_length=20)),
+                ('language', models.CharField(blank=True, default='', max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lead_rollups', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('project', 'day', 'kind', 'channel_id', 'utm_source', 'utm_medium', 'utm_campaign', 'device_type', 'language'), name='lead_rollup_dimensions_uniq')],
+            },
+        ),
+    ]
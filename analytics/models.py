@@ -0,0 +1,36 @@
+from django.db import models
+from projects.models import Project
+
+
+class LeadRollup(models.Model):
+    """Счетчик лидов / заявок на звонок за день в разрезе канала, UTM, устройства и языка."""
+    KIND_CHOICES = [
+        ('lead', 'Lead'),
+        ('callback', 'Callback'),
+    ]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='lead_rollups')
+    day = models.DateField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Без FK: 0 означает «без канала», а NULL сломал бы уникальность измерений
+    channel_id = models.BigIntegerField(default=0)
+    utm_source = models.CharField(max_length=100, blank=True, default='')
+    utm_medium = models.CharField(max_length=100, blank=True, default='')
+    utm_campaign = models.CharField(max_length=100, blank=True, default='')
+    device_type = models.CharField(max_length=20, blank=True, default='')
+    language = models.CharField(max_length=10, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'project', 'day', 'kind', 'channel_id', 'utm_source', 'utm_medium',
+                    'utm_campaign', 'device_type', 'language',
+                ],
+                name='lead_rollup_dimensions_uniq',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.project_id} {self.day} {self.kind}: {self.count}"
@@ -0,0 +1,113 @@
+"""
+Incremental maintenance and reconciliation of ``LeadRollup``.
+
+Every new Lead / CallbackRequest adds one to the rollup row of its
+(project, day, kind, channel, utm_*, device_type, language) bucket, so
+dashboards read a few rollup rows instead of grouping the raw tables.
+``reconcile`` recomputes whole days from the raw tables and fixes any drift.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from leads.models import Lead, CallbackRequest
+from .models import LeadRollup
+
+
+DIMENSIONS = (
+    'project_id', 'day', 'kind', 'channel_id', 'utm_source', 'utm_medium',
+    'utm_campaign', 'device_type', 'language',
+)
+
+SOURCES = {
+    'lead': Lead,
+    'callback': CallbackRequest,
+}
+
+
+def _bucket(kind, obj):
+    return (
+        obj.project_id,
+        timezone.localdate(obj.created_at),
+        kind,
+        obj.channel_id or 0,
+        obj.utm_source or '',
+        obj.utm_medium or '',
+        obj.utm_campaign or '',
+        obj.device_type or '',
+        obj.language or '',
+    )
+
+
+def _increment(key, amount):
+    lookup = dict(zip(DIMENSIONS, key))
+    if LeadRollup.objects.filter(**lookup).update(count=F('count') + amount):
+        return
+    try:
+        with transaction.atomic():
+            LeadRollup.objects.create(count=amount, **lookup)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        LeadRollup.objects.filter(**lookup).update(count=F('count') + amount)
+
+
+def record(kind, objects):
+    """Учитывает новые объекты в роллапах (по одному UPDATE на корзину)."""
+    for key, amount in Counter(_bucket(kind, obj) for obj in objects).items():
+        _increment(key, amount)
+
+
+def reconcile(start_day, end_day):
+    """Пересчитывает роллапы за дни [start_day, end_day] из сырых таблиц."""
+    tz = timezone.get_current_timezone()
+    day = start_day
+    while day <= end_day:
+        day_start = timezone.make_aware(datetime.combine(day, time.min), tz)
+        day_end = day_start + timedelta(days=1)
+
+        rollups = []
+        for kind, model in SOURCES.items():
+            rows = (
+                model.objects
+                .filter(created_at__gte=day_start, created_at__lt=day_end)
+                .annotate(day=TruncDate('created_at', tzinfo=tz))
+                .values(
+                    'project_id', 'day', 'channel_id', 'utm_source', 'utm_medium',
+                    'utm_campaign', 'device_type', 'language',
+                )
+                .annotate(total=Count('id'))
+                .order_by()
+            )
+            for row in rows:
+                rollups.append(LeadRollup(
+                    project_id=row['project_id'],
+                    day=row['day'],
+                    kind=kind,
+                    channel_id=row['channel_id'] or 0,
+                    utm_source=row['utm_source'] or '',
+                    utm_medium=row['utm_medium'] or '',
+                    utm_campaign=row['utm_campaign'] or '',
+                    device_type=row['device_type'] or '',
+                    language=row['language'] or '',
+                    count=row['total'],
+                ))
+
+        # NULL и '' в сырых данных попадают в одну корзину — сливаем их
+        merged = {}
+        for rollup in rollups:
+            key = tuple(getattr(rollup, name) for name in DIMENSIONS)
+            if key in merged:
+                merged[key].count += rollup.count
+            else:
+                merged[key] = rollup
+
+        with transaction.atomic():
+            LeadRollup.objects.filter(day=day).delete()
+            LeadRollup.objects.bulk_create(merged.values(), batch_size=1000)
+
+        yield day, sum(rollup.count for rollup in merged.values())
+        day += timedelta(days=1)
@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from leads.models import Lead, CallbackRequest
+from leads.signals import leads_bulk_created
+from .rollups import record
+
+
+@receiver(post_save, sender=Lead)
+def lead_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: record('lead', [instance]))
+
+
+@receiver(post_save, sender=CallbackRequest)
+def callback_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: record('callback', [instance]))
+
+
+@receiver(leads_bulk_created)
+def leads_bulk_created_handler(sender, leads, **kwargs):
+    record('lead', leads)
@@ -0,0 +1,76 @@
+from django.db.models import Sum
+from django.utils.dateparse import parse_date
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.filters import apply_filters
+from .models import LeadRollup
+
+
+def _parse_date(value):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+ROLLUP_FILTERS = {
+    'project': ('project_id', int),
+    'kind': ('kind', str),
+    'channel': ('channel_id', int),
+    'utm_source': ('utm_source', str),
+    'utm_medium': ('utm_medium', str),
+    'utm_campaign': ('utm_campaign', str),
+    'device_type': ('device_type', str),
+    'language': ('language', str),
+    'date_from': ('day__gte', _parse_date),
+    'date_to': ('day__lte', _parse_date),
+}
+
+BREAKDOWN_DIMENSIONS = {
+    'kind': 'kind',
+    'channel': 'channel_id',
+    'utm_source': 'utm_source',
+    'utm_medium': 'utm_medium',
+    'utm_campaign': 'utm_campaign',
+    'device_type': 'device_type',
+    'language': 'language',
+    'day': 'day',
+}
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """Аналитика по лидам из предагрегированных роллапов (без GROUP BY по сырым таблицам)"""
+
+    def _rollups(self, request):
+        return apply_filters(LeadRollup.objects.all(), request.query_params, ROLLUP_FILTERS)
+
+    def list(self, request):
+        """Итоги по типам обращений"""
+        rows = self._rollups(request).values('kind').annotate(count=Sum('count')).order_by('kind')
+        totals = {row['kind']: row['count'] for row in rows}
+        return Response({'totals': totals, 'total': sum(totals.values())})
+
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        """Количество обращений по дням"""
+        rows = self._rollups(request).values('day').annotate(count=Sum('count')).order_by('day')
+        return Response([{'day': row['day'], 'count': row['count']} for row in rows])
+
+    @action(detail=False, methods=['get'])
+    def breakdown(self, request):
+        """Разбивка по измерению: ?by=utm_source|utm_medium|utm_campaign|channel|device_type|language|kind|day"""
+        dimension = BREAKDOWN_DIMENSIONS.get(request.query_params.get('by', 'utm_source'))
+        if dimension is None:
+            return Response(
+                {'error': f"'by' must be one of: {', '.join(BREAKDOWN_DIMENSIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rows = (
+            self._rollups(request)
+            .values(dimension)
+            .annotate(count=Sum('count'))
+            .order_by('-count')
+        )
+        return Response([{'value': row[dimension], 'count': row['count']} for row in rows])
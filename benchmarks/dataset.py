@@ -0,0 +1,198 @@
+"""
+Reproducible benchmark dataset.
+
+All generated projects are named ``bench-<n>`` and are filled with a fixed
+random seed, so two runs of ``seed_benchmark`` with the same options give
+the same shape of data. Rows are written with ``bulk_create`` in batches;
+signals (rollups, webhooks) are deliberately skipped.
+"""
+import random
+from datetime import time
+
+from projects.models import Project
+from channels.models import Channel
+from schedules.models import Schedule
+from leads.models import Lead, CallbackRequest
+from chat.models import ChatSession, ChatMessage
+from chat.summary import recount as recount_sessions
+from users.models import User
+
+
+PROJECT_PREFIX = 'bench-'
+BENCH_USER_EMAIL = 'bench@habio.local'
+BENCH_USER_PASSWORD = 'bench-password'
+
+CHANNEL_TYPES = ('chat', 'form', 'call', 'callback', 'messenger')
+WORKING_DAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday')
+UTM_SOURCES = ('google', 'facebook', 'direct', 'newsletter', None)
+DEVICES = ('desktop', 'mobile', 'tablet')
+LANGUAGES = ('en', 'ru', 'de')
+
+
+def bench_projects():
+    return Project.objects.filter(name__startswith=PROJECT_PREFIX)
+
+
+def reset():
+    """Удаляет данные предыдущего прогона. Крупные таблицы чистятся напрямую, без каскада через проекты."""
+    projects = bench_projects()
+    ChatMessage.objects.filter(session__project__in=projects).delete()
+    ChatSession.objects.filter(project__in=projects).delete()
+    Lead.objects.filter(project__in=projects).delete()
+    CallbackRequest.objects.filter(project__in=projects).delete()
+    projects.delete()
+
+
+def ensure_user():
+    user, created = User.objects.get_or_create(
+        email=BENCH_USER_EMAIL, defaults={'role': 'admin', 'first_name': 'Bench'},
+    )
+    if created or not user.check_password(BENCH_USER_PASSWORD):
+        user.set_password(BENCH_USER_PASSWORD)
+        user.save()
+    return user
+
+
+def _bulk_insert(model, rows, batch_size, on_batch=None):
+    """Вставляет объекты из генератора пачками, не держа их все в памяти. Возвращает число строк."""
+    total, batch = 0, []
+    for obj in rows:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            created = model.objects.bulk_create(batch)
+            if on_batch:
+                on_batch(created)
+            total += len(batch)
+            batch = []
+    if batch:
+        created = model.objects.bulk_create(batch)
+        if on_batch:
+            on_batch(created)
+        total += len(batch)
+    return total
+
+
+def _spread(rng, keys, total):
+    """Распределяет total строк по ключам неравномерно (как у реальных клиентов)."""
+    weights = [rng.paretovariate(1.5) for _ in keys]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    counts[0] += total - sum(counts)
+    return zip(keys, counts)
+
+
+def seed(projects=50, channels_per_project=5, leads=100_000, callbacks=20_000,
+         sessions=20_000, messages=200_000, batch_size=5000, random_seed=42, log=None):
+    """Создает набор данных. Возвращает словарь с количеством созданных строк."""
+    rng = random.Random(random_seed)
+    log = log or (lambda message: None)
+    ensure_user()
+
+    project_objs = Project.objects.bulk_create([
+        Project(name=f'{PROJECT_PREFIX}{n}', timezone=rng.choice(('UTC', 'Europe/Moscow', 'America/New_York')))
+        for n in range(projects)
+    ])
+    log(f'projects: {len(project_objs)}')
+
+    channel_objs = Channel.objects.bulk_create([
+        Channel(
+            project=project,
+            type=CHANNEL_TYPES[i % len(CHANNEL_TYPES)],
+            label=f'Channel {i}',
+            link=f'https://example.com/{project.id}/{i}',
+            priority=i,
+            show_in_top=i < 2,
+        )
+        for project in project_objs
+        for i in range(channels_per_project)
+    ])
+    channels_by_project = {}
+    for channel in channel_objs:
+        channels_by_project.setdefault(channel.project_id, []).append(channel)
+    log(f'channels: {len(channel_objs)}')
+
+    Schedule.objects.bulk_create([
+        Schedule(project=project, day=day, start_time=time(9), end_time=time(18))
+        for project in project_objs
+        for day in WORKING_DAYS
+    ])
+
+    def lead_rows():
+        for project, count in _spread(rng, project_objs, leads):
+            project_channels = channels_by_project[project.id]
+            for i in range(count):
+                yield Lead(
+                    project=project,
+                    channel=rng.choice(project_channels),
+                    contact=f'lead-{project.id}-{i}@example.com',
+                    message='Benchmark lead',
+                    utm_source=rng.choice(UTM_SOURCES),
+                    utm_medium='cpc',
+                    utm_campaign=f'campaign-{rng.randrange(20)}',
+                    page_url='https://example.com/landing',
+                    client_id=f'client-{rng.randrange(leads or 1)}',
+                    device_type=rng.choice(DEVICES),
+                    language=rng.choice(LANGUAGES),
+                    processed=rng.random() < 0.3,
+                )
+
+    lead_count = _bulk_insert(Lead, lead_rows(), batch_size)
+    log(f'leads: {lead_count}')
+
+    def callback_rows():
+        for project, count in _spread(rng, project_objs, callbacks):
+            for i in range(count):
+                yield CallbackRequest(
+                    project=project,
+                    channel=channels_by_project[project.id][0],
+                    phone=f'+1555{rng.randrange(10 ** 7):07d}',
+                    message='Call me back',
+                    utm_source=rng.choice(UTM_SOURCES),
+                    device_type=rng.choice(DEVICES),
+                    language=rng.choice(LANGUAGES),
+                )
+
+    callback_count = _bulk_insert(CallbackRequest, callback_rows(), batch_size)
+    log(f'callbacks: {callback_count}')
+
+    def session_rows():
+        for project, count in _spread(rng, project_objs, sessions):
+            for i in range(count):
+                yield ChatSession(
+                    project=project,
+                    client_id=f'client-{project.id}-{i}',
+                    page_url='https://example.com/pricing',
+                    device_type=rng.choice(DEVICES),
+                    language=rng.choice(LANGUAGES),
+                )
+
+    session_ids = []
+    _bulk_insert(ChatSession, session_rows(), batch_size,
+                 on_batch=lambda created: session_ids.extend(session.id for session in created))
+    log(f'chat sessions: {len(session_ids)}')
+
+    def message_rows():
+        if not session_ids:
+            return
+        for session_id, count in _spread(rng, session_ids, messages):
+            for i in range(count):
+                yield ChatMessage(
+                    session_id=session_id,
+                    message_type='user' if i % 2 == 0 else 'admin',
+                    content=f'Message {i}',
+                    is_read=rng.random() < 0.8,
+                )
+
+    message_count = _bulk_insert(ChatMessage, message_rows(), batch_size)
+    log(f'chat messages: {message_count}')
+    # bulk_create обходит сигналы — сводку сессий (счетчики, последнее сообщение) считаем одним UPDATE
+    recount_sessions(ChatSession.objects.filter(project__in=project_objs))
+
+    return {
+        'projects': len(project_objs),
+        'channels': len(channel_objs),
+        'leads': lead_count,
+        'callbacks': callback_count,
+        'sessions': len(session_ids),
+        'messages': message_count,
+    }
@@ -0,0 +1,85 @@
+import copy
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.utils import ConnectionHandler
+
+from benchmarks.runner import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стоимость получения соединения с БД на запрос: новое соединение, '
+        'постоянное (CONN_MAX_AGE + CONN_HEALTH_CHECKS) и пул psycopg'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Эмулируемых запросов на режим')
+        parser.add_argument('--queries', type=int, default=3, help='SQL-запросов на один запрос')
+        parser.add_argument('--mode', action='append', choices=('none', 'persistent', 'pool'),
+                            help='Можно указать несколько раз; по умолчанию — все доступные')
+
+    def _database(self, mode):
+        """Настройки default-базы, переключенные в нужный режим соединений."""
+        database = copy.deepcopy(connection.settings_dict)
+        options = database.setdefault('OPTIONS', {})
+        options.pop('pool', None)
+        database['CONN_MAX_AGE'] = 0
+        database['CONN_HEALTH_CHECKS'] = False
+        if mode == 'persistent':
+            database['CONN_MAX_AGE'] = 600
+            database['CONN_HEALTH_CHECKS'] = True
+        elif mode == 'pool':
+            options['pool'] = {'min_size': 1, 'max_size': 2}
+        return database
+
+    def _run(self, mode, count, queries):
+        alias = f'bench_{mode}'
+        # ConnectionHandler требует default; отдельный alias не пересекается с пулом основного соединения
+        handler = ConnectionHandler({'default': connection.settings_dict, alias: self._database(mode)})
+        db = handler[alias]
+        samples = []
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                # Границы запроса — как в close_old_connections на request_started / request_finished
+                db.close_if_unusable_or_obsolete()
+                with db.cursor() as cursor:
+                    for _ in range(queries):
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                db.close_if_unusable_or_obsolete()
+                samples.append(time.perf_counter() - started)
+        finally:
+            db.close()
+            if mode == 'pool':
+                db.close_pool()
+        return samples
+
+    def handle(self, *args, **options):
+        modes = options['mode'] or ['none', 'persistent', 'pool']
+        if 'pool' in modes and connection.vendor != 'postgresql':
+            if options['mode']:
+                raise CommandError('Connection pooling requires PostgreSQL with psycopg 3')
+            modes.remove('pool')
+            self.stdout.write('pool: skipped (requires PostgreSQL with psycopg 3)')
+
+        results = {}
+        for mode in modes:
+            # Прогрев: первое соединение и пул создаются вне замера
+            self._run(mode, 5, options['queries'])
+            samples = sorted(self._run(mode, options['requests'], options['queries']))
+            results[mode] = samples
+            self.stdout.write(
+                f'{mode:<11} p50 {percentile(samples, 50) * 1000:8.3f} ms   '
+                f'p95 {percentile(samples, 95) * 1000:8.3f} ms   '
+                f'total {sum(samples):7.2f} s for {len(samples)} requests'
+            )
+
+        if 'none' in results:
+            baseline = percentile(results['none'], 50)
+            for mode, samples in results.items():
+                if mode != 'none':
+                    saved = (baseline - percentile(samples, 50)) * 1000
+                    self.stdout.write(f'{mode}: {saved:.3f} ms of connection setup removed per request (p50)')
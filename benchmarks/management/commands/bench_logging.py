@@ -0,0 +1,119 @@
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.runner import percentile
+from core.log_handlers import JSONFormatter, QueueListenerHandler, _build_handler, file_handler
+
+
+VERBOSE = logging.Formatter('{levelname} {asctime} {module} {process:d} {thread:d} {message}', style='{')
+
+
+class StallingFileHandler(logging.FileHandler):
+    """FileHandler, который каждые stall_every записей ждет stall_ms — как медленный диск или fsync."""
+
+    def __init__(self, filename, stall_ms=0.0, stall_every=0, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.stall = stall_ms / 1000
+        self.stall_every = stall_every
+        self.written = 0
+
+    def emit(self, record):
+        super().emit(record)
+        self.written += 1
+        if self.stall and self.stall_every and self.written % self.stall_every == 0:
+            time.sleep(self.stall)
+
+
+class Command(BaseCommand):
+    help = (
+        'Стоимость логирования на запрос для потока запроса: синхронный FileHandler (text/json) '
+        'против очереди с фоновым слушателем (LOG_MODE=queue, core/log_handlers.py)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000, help='Эмулируемых запросов на режим')
+        parser.add_argument('--records', type=int, default=5, help='Записей лога на запрос')
+        parser.add_argument('--queue-size', type=int, default=10000)
+        parser.add_argument('--stall-ms', type=float, default=0.0,
+                            help='Задержка записи на диск (мс), эмулирует медленный диск')
+        parser.add_argument('--stall-every', type=int, default=500, help='Каждые сколько записей задержка')
+        parser.add_argument('--rotation', choices=('none', 'size', 'time'), default='none')
+        parser.add_argument('--max-bytes', type=int, default=10 * 1024 * 1024, help='Для --rotation size')
+
+    def _handler(self, mode, formatter, filename, options):
+        config = file_handler(
+            filename, mode=mode, rotation=options['rotation'], max_bytes=options['max_bytes'],
+            backup_count=3, queue_size=options['queue_size'],
+        )
+        target = config.get('target', config)
+        target = {key: value for key, value in target.items() if key not in ('level', 'formatter', '()')}
+        if options['stall_ms'] and options['rotation'] == 'none':
+            target.update({
+                'class': f'{__name__}.StallingFileHandler',
+                'stall_ms': options['stall_ms'], 'stall_every': options['stall_every'],
+            })
+        if mode == 'queue':
+            handler = QueueListenerHandler(target, queue_size=options['queue_size'])
+        else:
+            handler = _build_handler(target)
+        handler.setFormatter(formatter)
+        return handler
+
+    def _run(self, logger, requests, records):
+        samples = []
+        for n in range(requests):
+            started = time.perf_counter()
+            # Примерно то, что пишет запрос: строка доступа, пара событий, предупреждение
+            for i in range(records):
+                logger.info('Request %s event %s', n, i, extra={'path': '/api/widget/leads/', 'status': 201})
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    def handle(self, *args, **options):
+        requests, records = options['requests'], options['records']
+        if options['stall_ms'] and options['rotation'] != 'none':
+            self.stdout.write('--stall-ms is applied only with --rotation none')
+
+        modes = (
+            ('sync text', 'sync', VERBOSE),
+            ('sync json', 'sync', JSONFormatter()),
+            ('queue json', 'queue', JSONFormatter()),
+        )
+        logger = logging.getLogger('bench.logging')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+
+        self.stdout.write(f'{requests} requests x {records} records')
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, mode, formatter in modes:
+                handler = self._handler(mode, formatter, Path(directory) / f'{mode}.log', options)
+                logger.addHandler(handler)
+                try:
+                    self._run(logger, 100, records)  # прогрев: открытие файла, старт слушателя
+                    samples = sorted(self._run(logger, requests, records))
+                    started = time.perf_counter()
+                    handler.flush()
+                    drain = time.perf_counter() - started
+                finally:
+                    logger.removeHandler(handler)
+                    handler.close()
+
+                results[name] = samples
+                line = (
+                    f'{name:<11} p50 {percentile(samples, 50) * 1e6:8.1f} µs   '
+                    f'p99 {percentile(samples, 99) * 1e6:8.1f} µs   '
+                    f'max {samples[-1] * 1e6:9.1f} µs   '
+                    f'mean {sum(samples) / len(samples) * 1e6:8.1f} µs'
+                )
+                if mode == 'queue':
+                    line += f'   drain {drain * 1000:.1f} ms, dropped {handler.dropped}'
+                self.stdout.write(line)
+
+        baseline = sum(results['sync text'])
+        for name in ('sync json', 'queue json'):
+            self.stdout.write(f'{name} vs sync text: total request-thread time x{sum(results[name]) / baseline:.2f}')
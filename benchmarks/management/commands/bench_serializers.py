@@ -0,0 +1,97 @@
+import json
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from chat.models import ChatSession, ChatMessage
+from chat.serializers import (
+    ChatSessionListSerializer, ChatMessageSerializer, serialize_chat_session, serialize_chat_message,
+)
+from core.renderers import ORJSONRenderer
+from leads.models import Lead, CallbackRequest
+from leads.serializers import LeadSerializer, CallbackRequestSerializer, serialize_lead, serialize_callback
+
+
+class Command(BaseCommand):
+    help = 'Микробенчмарк: DRF ModelSerializer против скомпилированных сериализаторов и json против orjson'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5, help='Лучший из N прогонов')
+
+    def _objects(self, count):
+        """Несохраненные объекты с заполненными полями — без обращений к БД."""
+        now = timezone.now()
+        leads, callbacks, sessions, messages = [], [], [], []
+        for i in range(count):
+            created = now - timedelta(seconds=i)
+            leads.append(Lead(
+                id=i + 1, project_id=1, channel_id=2, contact=f'lead-{i}@example.com', message='Hello',
+                utm_source='google', utm_medium='cpc', utm_campaign='spring', page_url='https://example.com/',
+                client_id=f'client-{i}', device_type='mobile', language='en', submission_id=uuid.uuid4(),
+                created_at=created, updated_at=created,
+            ))
+            callbacks.append(CallbackRequest(
+                id=i + 1, project_id=1, channel_id=2, phone='+15550000000', preferred_time=created,
+                message='Call me', client_id=f'client-{i}', device_type='desktop', language='en',
+                created_at=created, updated_at=created,
+            ))
+            sessions.append(ChatSession(
+                id=i + 1, project_id=1, client_id=f'client-{i}', page_url='https://example.com/',
+                device_type='desktop', language='en', created_at=created, updated_at=created,
+            ))
+            messages.append(ChatMessage(
+                id=i + 1, session_id=i + 1, message_type='user', content=f'Message {i}',
+                created_at=created, updated_at=created,
+            ))
+        return [
+            ('lead', leads, LeadSerializer, serialize_lead),
+            ('callback', callbacks, CallbackRequestSerializer, serialize_callback),
+            ('chat session', sessions, ChatSessionListSerializer, serialize_chat_session),
+            ('chat message', messages, ChatMessageSerializer, serialize_chat_message),
+        ]
+
+    def _best(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def handle(self, *args, **options):
+        count, repeat = options['objects'], options['repeat']
+        self.stdout.write(f'{count} objects, best of {repeat}; µs per object')
+        self.stdout.write(f'{"":<14}{"DRF":>10}{"compiled":>10}{"speedup":>9}')
+
+        payloads = []
+        for name, objects, serializer_class, serialize in self._objects(count):
+            for obj in objects[:50]:
+                expected, actual = dict(serializer_class(obj).data), serialize(obj)
+                if list(expected) != list(actual) or expected != actual:
+                    raise CommandError(f'{name}: compiled output differs from {serializer_class.__name__}')
+
+            # Как на путях записи: отдельный экземпляр сериализатора на каждый объект
+            drf = self._best(repeat, lambda: [serializer_class(obj).data for obj in objects])
+            fast = self._best(repeat, lambda: [serialize(obj) for obj in objects])
+            self.stdout.write(
+                f'{name:<14}{drf / count * 1e6:>10.2f}{fast / count * 1e6:>10.2f}{drf / fast:>8.1f}x'
+            )
+            payloads.append([serialize(obj) for obj in objects])
+
+        self.stdout.write('')
+        self.stdout.write(f'{"render":<14}{"json":>10}{"orjson":>10}{"speedup":>9}   (ms per response)')
+        json_renderer, orjson_renderer = JSONRenderer(), ORJSONRenderer()
+        for size in (1, 50, count):
+            data = payloads[-1][:size]
+            if json.loads(json_renderer.render(data)) != json.loads(orjson_renderer.render(data)):
+                raise CommandError('ORJSONRenderer output differs from JSONRenderer')
+            loops = max(1, 2000 // size)
+            slow = self._best(repeat, lambda: [json_renderer.render(data) for _ in range(loops)]) / loops
+            fast = self._best(repeat, lambda: [orjson_renderer.render(data) for _ in range(loops)]) / loops
+            self.stdout.write(f'{f"{size} messages":<14}{slow * 1e3:>10.3f}{fast * 1e3:>10.3f}{slow / fast:>8.1f}x')
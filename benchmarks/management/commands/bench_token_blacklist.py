@@ -0,0 +1,159 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from benchmarks.dataset import _bulk_insert
+from users.tokens import BlacklistFilter, prune_expired_tokens
+
+
+JTI_PREFIX = 'bench-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный замер черного списка refresh-токенов: проверка в БД против Bloom-фильтра '
+        '(users/tokens.py) и очистка истекших (prune_tokens) на большой таблице'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help='Строк OutstandingToken')
+        parser.add_argument('--blacklisted', type=float, default=0.5, help='Доля токенов в черном списке')
+        parser.add_argument('--expired', type=float, default=0.3, help='Доля истекших (самые старые id)')
+        parser.add_argument('--checks', type=int, default=5000, help='Проверок на замер')
+        parser.add_argument('--batch-size', type=int, default=50000)
+        parser.add_argument('--keep', action='store_true', help='Не удалять сгенерированные строки')
+
+    # ===== Dataset =====
+    def _seed(self, rows, blacklisted, expired, batch_size):
+        """Токены bench-N: первые expired*rows истекли, каждый step-й — в черном списке."""
+        now = timezone.now()
+        step = max(int(round(1 / blacklisted)), 1) if blacklisted else 0
+        expired_rows = int(rows * expired)
+
+        if connection.vendor == 'postgresql':
+            # 10M строк через ORM — десятки минут; generate_series — минуты
+            outstanding, blacklist = OutstandingToken._meta.db_table, BlacklistedToken._meta.db_table
+            with connection.cursor() as cursor:
+                for start in range(0, rows, batch_size):
+                    stop = min(start + batch_size, rows)
+                    cursor.execute(
+                        f'INSERT INTO {outstanding} (jti, token, created_at, expires_at) '
+                        f"SELECT %s || lpad(n::text, 10, '0'), '', %s, "
+                        f'CASE WHEN n < %s THEN %s::timestamptz ELSE %s::timestamptz END '
+                        f'FROM generate_series(%s, %s) AS n',
+                        [JTI_PREFIX, now, expired_rows, now - timedelta(days=1), now + timedelta(days=7),
+                         start, stop - 1],
+                    )
+                first_id = self._first_id()
+                if step:
+                    cursor.execute(
+                        f'INSERT INTO {blacklist} (token_id, blacklisted_at) '
+                        f'SELECT id, %s FROM {outstanding} WHERE id >= %s AND (id - %s) %% %s = 0',
+                        [now, first_id, first_id, step],
+                    )
+        else:
+            def outstanding_rows():
+                for n in range(rows):
+                    yield OutstandingToken(
+                        jti=f'{JTI_PREFIX}{n:010d}', token='', created_at=now,
+                        expires_at=now - timedelta(days=1) if n < expired_rows else now + timedelta(days=7),
+                    )
+            _bulk_insert(OutstandingToken, outstanding_rows(), batch_size)
+            first_id = self._first_id()
+            if step:
+                ids = OutstandingToken.objects.filter(id__gte=first_id).values_list('id', flat=True)
+                _bulk_insert(BlacklistedToken, (
+                    BlacklistedToken(token_id=token_id, blacklisted_at=now)
+                    for token_id in ids.iterator(chunk_size=batch_size) if (token_id - first_id) % step == 0
+                ), batch_size)
+        return first_id, step, expired_rows
+
+    def _first_id(self):
+        # Строки вставлены подряд одной сессией: id = first_id + N для токена bench-N
+        return OutstandingToken.objects.get(jti=f'{JTI_PREFIX}{0:010d}').id
+
+    def _cleanup(self, first_id, batch_size):
+        BlacklistedToken.objects.filter(token_id__gte=first_id, token__jti__startswith=JTI_PREFIX).delete()
+        last_id = OutstandingToken.objects.aggregate(last=Max('id'))['last'] or 0
+        for start in range(first_id, last_id + 1, batch_size):
+            with transaction.atomic():
+                OutstandingToken.objects.filter(
+                    id__gte=start, id__lt=start + batch_size, jti__startswith=JTI_PREFIX,
+                ).only('id').delete()
+
+    # ===== Measurements =====
+    def _per_call(self, func, values):
+        started = time.perf_counter()
+        for value in values:
+            func(value)
+        return (time.perf_counter() - started) / len(values) * 1e6
+
+    def _report(self, name, microseconds):
+        self.stdout.write(f'{name:<36}{microseconds:>10.1f} µs')
+
+    def handle(self, *args, **options):
+        rows, checks, batch_size = options['rows'], options['checks'], options['batch_size']
+        rng = random.Random(42)
+
+        started = time.perf_counter()
+        first_id, step, expired_rows = self._seed(rows, options['blacklisted'], options['expired'], batch_size)
+        blacklisted = BlacklistedToken.objects.filter(token_id__gte=first_id).count()
+        self.stdout.write(
+            f'Seeded {rows} outstanding / {blacklisted} blacklisted tokens in {time.perf_counter() - started:.1f} s'
+        )
+
+        try:
+            # Живые токены вне черного списка — обычный случай при refresh
+            def live_jti(n):
+                return f'{JTI_PREFIX}{n:010d}'
+            live = [n for n in (rng.randrange(expired_rows, rows) for _ in range(checks * 2))
+                    if not step or n % step][:checks]
+            clean = [live_jti(n) for n in live]
+            listed = [live_jti(n - n % step) for n in live] if step else []
+            unknown = [f'unknown-{rng.getrandbits(64):x}' for _ in range(checks)]
+
+            def db_check(jti):
+                return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+            self.stdout.write('')
+            self._report('DB check, not blacklisted', self._per_call(db_check, clean))
+            if listed:
+                self._report('DB check, blacklisted', self._per_call(db_check, listed))
+
+            bloom_filter = BlacklistFilter()
+            hour = {'TOKEN_BLACKLIST_FILTER_REBUILD_INTERVAL': 3600}
+            with override_settings(TOKEN_BLACKLIST_FILTER_SYNC_INTERVAL=3600, **hour):
+                started = time.perf_counter()
+                bloom_filter.rebuild()
+                bloom = bloom_filter._bloom
+                self.stdout.write(
+                    f'Filter build: {time.perf_counter() - started:.1f} s, {bloom.count} live JTIs, '
+                    f'{len(bloom.bits) / 2 ** 20:.1f} MiB, {bloom.hashes} hashes'
+                )
+                self._report('Filter, not blacklisted', self._per_call(bloom_filter.might_contain, clean))
+                false_positives = sum(bloom_filter.might_contain(jti) for jti in unknown)
+                self.stdout.write(f'False positive rate: {false_positives / len(unknown):.4%}')
+            # Все строки стенда только что вставлены: с запасом синхронизация перечитывала бы их все
+            with override_settings(TOKEN_BLACKLIST_FILTER_SYNC_INTERVAL=0, TOKEN_BLACKLIST_FILTER_SYNC_MARGIN=0, **hour):
+                self._report('Filter, sync interval 0 (1 query)', self._per_call(bloom_filter.might_contain, clean))
+
+            self.stdout.write('')
+            started = time.perf_counter()
+            # Истекшие строки стенда вставлены после живых, поэтому обход полный
+            outstanding, pruned_blacklisted = prune_expired_tokens(batch_size, full=True)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Prune: {outstanding} outstanding + {pruned_blacklisted} blacklisted in {elapsed:.1f} s '
+                f'({(outstanding + pruned_blacklisted) / max(elapsed, 1e-9):.0f} rows/s)'
+            )
+            self._report('DB check after prune', self._per_call(db_check, clean))
+        finally:
+            if not options['keep']:
+                self._cleanup(first_id, batch_size)
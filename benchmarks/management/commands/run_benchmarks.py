@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from benchmarks.runner import (
+    ClientDriver, HTTPDriver, obtain_token, run_scenario, load_baseline, save_baseline, compare,
+)
+from benchmarks.scenarios import SCENARIOS, SCENARIOS_BY_NAME, load_context
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный прогон горячих эндпоинтов виджета и чата со сравнением с baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--driver', choices=('client', 'http'), default='client')
+        parser.add_argument('--base-url', default='http://localhost:8000', help='Сервер для --driver http')
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS_BY_NAME),
+                            help='Можно указать несколько раз; по умолчанию — все')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=8, help='Потоков для --driver http')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true', help='Записать результаты как новый baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимое ухудшение p95 и пропускной способности (доля)')
+
+    def handle(self, *args, **options):
+        ctx = load_context()
+        if not ctx.project_ids or not ctx.session_ids:
+            raise CommandError('No benchmark data found; run seed_benchmark first')
+
+        if options['driver'] == 'http':
+            driver, concurrency = HTTPDriver(options['base_url']), options['concurrency']
+        else:
+            driver, concurrency = ClientDriver(), 1
+            # Все запросы стенда идут с одного IP — лимиты виджета исказили бы замер.
+            # Для --driver http сервер запускают с RATE_LIMIT_ENABLED=false
+            override_settings(RATE_LIMIT_ENABLED=False).enable()
+        token = obtain_token(driver)
+
+        scenarios = [SCENARIOS_BY_NAME[name] for name in options['scenario']] if options['scenario'] else SCENARIOS
+        results = {}
+        header = f'{"scenario":<24}{"reqs":>6}{"err":>5}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"req/s":>10}{"queries":>9}'
+        self.stdout.write(header)
+        for scenario in scenarios:
+            result = run_scenario(driver, scenario, ctx, options['requests'], concurrency, options['warmup'], token)
+            results[scenario.name] = result
+            queries = '-' if result['queries'] is None else f'{result["queries"]:.1f}'
+            self.stdout.write(
+                f'{scenario.name:<24}{result["requests"]:>6}{result["errors"]:>5}{result["p50_ms"]:>10.2f}'
+                f'{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}{result["rps"]:>10.1f}{queries:>9}'
+            )
+
+        if options['save_baseline']:
+            save_baseline(options['baseline'], driver.name, results)
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {options["baseline"]}'))
+            return
+
+        baseline = load_baseline(options['baseline'])
+        if baseline is None:
+            self.stdout.write(f'No baseline at {options["baseline"]}; use --save-baseline to create one')
+            return
+        if baseline.get('driver') != driver.name:
+            self.stdout.write(f'Baseline was recorded with --driver {baseline.get("driver")}; comparison skipped')
+            return
+
+        regressions = compare(results, baseline, options['tolerance'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'{len(regressions)} performance regression(s) against {options["baseline"]}')
+        self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from benchmarks import dataset
+
+
+class Command(BaseCommand):
+    help = 'Создает воспроизводимый набор данных для run_benchmarks (проекты bench-*)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=50)
+        parser.add_argument('--channels', type=int, default=5, help='Каналов на проект')
+        parser.add_argument('--leads', type=int, default=100_000)
+        parser.add_argument('--callbacks', type=int, default=20_000)
+        parser.add_argument('--sessions', type=int, default=20_000)
+        parser.add_argument('--messages', type=int, default=200_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--keep', action='store_true', help='Не удалять данные предыдущего прогона')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if not options['keep']:
+            dataset.reset()
+
+        with transaction.atomic():
+            dataset.seed(
+                projects=max(options['projects'], 1),
+                channels_per_project=max(options['channels'], 1),
+                leads=options['leads'],
+                callbacks=options['callbacks'],
+                sessions=options['sessions'],
+                messages=options['messages'],
+                batch_size=options['batch_size'],
+                random_seed=options['seed'],
+                log=self.stdout.write,
+            )
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s'))
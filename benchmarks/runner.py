@@ -0,0 +1,170 @@
+"""
+Drivers, latency statistics and baseline comparison for ``run_benchmarks``.
+
+``ClientDriver`` runs requests in-process through the Django test client
+and counts SQL queries per request; ``HTTPDriver`` sends them over real
+HTTP from a thread pool against a running server (queries are not visible
+from outside, so they are reported only by the client driver).
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+
+from .dataset import BENCH_USER_EMAIL, BENCH_USER_PASSWORD
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ClientDriver:
+    name = 'client'
+
+    def __init__(self):
+        self.client = Client()
+        self.host = settings.ALLOWED_HOSTS[0].lstrip('.').replace('*', 'localhost') or 'localhost'
+
+    def request(self, method, path, body=None, token=None):
+        extra = {'HTTP_HOST': self.host, 'secure': True}
+        if token:
+            extra['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            if method == 'GET':
+                response = self.client.get(path, **extra)
+            else:
+                response = self.client.generic(method, path, json.dumps(body or {}),
+                                               content_type='application/json', **extra)
+        return response.status_code, time.perf_counter() - started, counter.count
+
+    def json(self, method, path, body=None):
+        extra = {'HTTP_HOST': self.host, 'secure': True}
+        response = self.client.generic(method, path, json.dumps(body or {}), content_type='application/json', **extra)
+        return response.status_code, response.json()
+
+
+class HTTPDriver:
+    name = 'http'
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        # requests.Session не потокобезопасен — своя keep-alive сессия на поток
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        started = time.perf_counter()
+        try:
+            response = self._session().request(
+                method, self.base_url + path, json=body, headers=headers, timeout=self.timeout,
+            )
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        return status, time.perf_counter() - started, None
+
+    def json(self, method, path, body=None):
+        response = self._session().request(method, self.base_url + path, json=body, timeout=self.timeout)
+        return response.status_code, response.json()
+
+
+def obtain_token(driver):
+    status, data = driver.json('POST', '/api/auth/login/', {'email': BENCH_USER_EMAIL, 'password': BENCH_USER_PASSWORD})
+    if status != 200:
+        raise RuntimeError(f'Login as {BENCH_USER_EMAIL} failed with HTTP {status}; run seed_benchmark first')
+    return data['access']
+
+
+def percentile(sorted_values, q):
+    """Перцентиль по ближайшему рангу."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(q / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(samples, wall_time):
+    latencies = sorted(elapsed for _, elapsed, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for status, _, _ in samples if not 200 <= status < 400),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'rps': round(len(samples) / wall_time, 1) if wall_time else 0.0,
+        'queries': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run_scenario(driver, scenario, ctx, count, concurrency=1, warmup=0, token=None):
+    def call(i):
+        path, body = scenario.build(ctx, i)
+        return driver.request(scenario.method, path, body, token if scenario.auth else None)
+
+    for i in range(warmup):
+        call(count + i)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(call, range(count)))
+    else:
+        samples = [call(i) for i in range(count)]
+    return summarize(samples, time.perf_counter() - started)
+
+
+# ===== Baseline =====
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, driver_name, results):
+    with open(path, 'w') as f:
+        json.dump({'driver': driver_name, 'scenarios': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, tolerance):
+    """
+    Регрессии относительно baseline: p95 или пропускная способность хуже более чем на tolerance,
+    больше SQL-запросов на запрос или появились ошибки. Возвращает список описаний.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline['scenarios'].get(name)
+        if base is None:
+            continue
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{name}: p95 {result["p95_ms"]} ms > baseline {base["p95_ms"]} ms')
+        if result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f'{name}: throughput {result["rps"]} req/s < baseline {base["rps"]} req/s')
+        if result['queries'] is not None and base.get('queries') is not None \
+                and result['queries'] > base['queries'] + 0.5:
+            regressions.append(f'{name}: {result["queries"]} queries/request > baseline {base["queries"]}')
+        if result['errors'] and not base['errors']:
+            regressions.append(f'{name}: {result["errors"]} failed requests')
+    return regressions
@@ -0,0 +1,80 @@
+"""
+Benchmark scenarios: the widget hot paths, the admin chat endpoints and login.
+
+A scenario turns a request number into ``(method, path, body, auth)``;
+``auth`` marks requests that need the bench user's access token.
+"""
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable
+
+from chat.models import ChatSession
+from .dataset import bench_projects, BENCH_USER_EMAIL, BENCH_USER_PASSWORD
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    build: Callable
+    auth: bool = False
+
+
+@dataclass
+class Context:
+    project_ids: list
+    session_ids: list
+    # Метка прогона в заявках: повторный прогон не должен попадать в дедупликацию (leads/dedup.py)
+    run: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+
+
+def load_context(sample=500):
+    project_ids = list(bench_projects().order_by('id').values_list('id', flat=True))
+    session_ids = list(
+        ChatSession.objects.filter(project_id__in=project_ids).order_by('-id').values_list('id', flat=True)[:sample]
+    )
+    return Context(project_ids=project_ids, session_ids=session_ids)
+
+
+def _project(ctx, i):
+    return ctx.project_ids[i % len(ctx.project_ids)]
+
+
+def _session(ctx, i):
+    return ctx.session_ids[i % len(ctx.session_ids)]
+
+
+def _visitor(i):
+    return {
+        'client_id': f'bench-visitor-{i}',
+        'page_url': 'https://example.com/landing',
+        'device_type': 'mobile' if i % 3 == 0 else 'desktop',
+        'language': 'en',
+    }
+
+
+SCENARIOS = [
+    Scenario('widget_channels', 'GET', lambda ctx, i: (
+        f'/api/widget/channels/{_project(ctx, i)}/?client_id=bench-visitor-{i}', None)),
+    Scenario('widget_create_lead', 'POST', lambda ctx, i: (
+        f'/api/widget/create_lead/{_project(ctx, i)}/',
+        {'contact': f'visitor-{i}@example.com', 'message': f'Hello {ctx.run}', 'utm_source': 'bench', **_visitor(i)})),
+    Scenario('widget_create_callback', 'POST', lambda ctx, i: (
+        f'/api/widget/create_callback/{_project(ctx, i)}/',
+        {'phone': f'+1555{i:07d}', 'message': f'Call me {ctx.run}', **_visitor(i)})),
+    Scenario('widget_start_chat', 'POST', lambda ctx, i: (
+        f'/api/widget/start_chat/{_project(ctx, i)}/', _visitor(i))),
+    Scenario('widget_send_message', 'POST', lambda ctx, i: (
+        f'/api/widget/send_message/{_project(ctx, i)}/',
+        {'session_id': _session(ctx, i), 'content': f'Question {i}'})),
+    Scenario('chat_sessions_list', 'GET', lambda ctx, i: (
+        f'/api/chat-sessions/?project={_project(ctx, i)}', None), auth=True),
+    Scenario('chat_inbox', 'GET', lambda ctx, i: (
+        f'/api/chat-sessions/inbox/?project={_project(ctx, i)}', None), auth=True),
+    Scenario('chat_messages', 'GET', lambda ctx, i: (
+        f'/api/chat-sessions/{_session(ctx, i)}/messages/?after_id=0&limit=50', None), auth=True),
+    Scenario('login', 'POST', lambda ctx, i: (
+        '/api/auth/login/', {'email': BENCH_USER_EMAIL, 'password': BENCH_USER_PASSWORD})),
+]
+
+SCENARIOS_BY_NAME = {scenario.name: scenario for scenario in SCENARIOS}
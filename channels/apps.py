@@ -5,3 +5,8 @@ class ChannelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'channels'
     label = 'hc_channels'
+
+    def ready(self):
+        from .cache import channel_cache
+        from .models import Channel
+        channel_cache.connect(Channel, lambda channel: channel.project_id)
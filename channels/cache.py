@@ -0,0 +1,4 @@
+from core.cache import CacheNamespace
+
+# Каналы проекта; scope — id проекта
+channel_cache = CacheNamespace('channels')
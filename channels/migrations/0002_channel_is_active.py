@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hc_channels', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='channel',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -20,6 +20,7 @@ class Channel(models.Model):
     show_in_top = models.BooleanField(default=False)
     priority = models.IntegerField(default=0)
     icon = models.CharField(max_length=50, blank=True, null=True)
+    is_active = models.BooleanField(default=True)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now_add=True)
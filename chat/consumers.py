@@ -0,0 +1,131 @@
+"""
+Raw ASGI WebSocket endpoint for chat sessions: ``/ws/chat/<session_id>/``.
+
+The visitor authenticates with the ``client_id`` the session was started
+with, operators with the JWT access token of an active user (``?token=``).
+Every message persisted for the session is pushed as JSON; a client can
+also send ``{"content": "..."}`` to post a message over the same socket.
+"""
+import asyncio
+import json
+import logging
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from users.authentication import CachedJWTAuthentication
+from .models import ChatSession, ChatMessage
+from .realtime import get_broker, session_channel
+
+
+logger = logging.getLogger('chat.consumers')
+
+SESSION_PATH = re.compile(r'^/ws/chat/(?P<session_id>\d+)/?$')
+
+CLOSE_NOT_FOUND = 4404
+CLOSE_FORBIDDEN = 4403
+CLOSE_UNAVAILABLE = 1011
+
+# Сколько ждать подтверждения подписки от брокера перед рукопожатием
+SUBSCRIBE_TIMEOUT = 5
+
+
+def _query_param(scope, name):
+    values = parse_qs(scope.get('query_string', b'').decode()).get(name)
+    return values[0] if values else None
+
+
+async def _authorize(scope, session_id):
+    """Возвращает тип отправителя ('user' / 'admin') или None."""
+    token = _query_param(scope, 'token')
+    if token:
+        # Как у REST: пользователь токена должен существовать и быть активным
+        authentication = CachedJWTAuthentication()
+        try:
+            validated_token = authentication.get_validated_token(token)
+            await sync_to_async(authentication.get_user)(validated_token)
+        except AuthenticationFailed:
+            return None
+        if await ChatSession.objects.filter(id=session_id).aexists():
+            return 'admin'
+        return None
+
+    client_id = _query_param(scope, 'client_id')
+    if client_id and await ChatSession.objects.filter(id=session_id, client_id=client_id).aexists():
+        return 'user'
+    return None
+
+
+async def _pump(subscription, send):
+    while True:
+        payload = await subscription.get()
+        await send({'type': 'websocket.send', 'text': json.dumps(payload)})
+
+
+def _pump_done(task):
+    # Исключение задачи (например, отправка в уже закрытый сокет) иначе никто не заберет
+    if not task.cancelled() and task.exception() is not None:
+        logger.error('Chat push to a WebSocket failed', exc_info=task.exception())
+
+
+async def _close_old_connections():
+    # Соединения ORM живут в потоке sync_to_async; без сигналов request_started /
+    # request_finished их, как и для HTTP, закрываем сами (CONN_MAX_AGE, ошибки)
+    await sync_to_async(close_old_connections)()
+
+
+async def chat_websocket(scope, receive, send):
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    match = SESSION_PATH.match(scope['path'])
+    if not match:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+
+    session_id = int(match.group('session_id'))
+    await _close_old_connections()
+    message_type = await _authorize(scope, session_id)
+    if message_type is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+
+    # Подписываемся до accept, чтобы не потерять сообщения между рукопожатием и подпиской
+    subscription = get_broker().subscribe(session_channel(session_id))
+    if not await subscription.ready(SUBSCRIBE_TIMEOUT):
+        logger.error('Chat subscription for session %s was not confirmed by the broker', session_id)
+        subscription.close()
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAVAILABLE})
+        return
+    await send({'type': 'websocket.accept'})
+    pump = asyncio.create_task(_pump(subscription, send))
+    pump.add_done_callback(_pump_done)
+
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            if event['type'] != 'websocket.receive' or not event.get('text'):
+                continue
+            try:
+                data = json.loads(event['text'])
+            except ValueError:
+                continue
+            content = data.get('content') if isinstance(data, dict) else None
+            if content:
+                # Рассылка произойдет из post_save, как и для REST
+                await ChatMessage.objects.acreate(
+                    session_id=session_id,
+                    content=content,
+                    message_type=message_type,
+                )
+                await _close_old_connections()
+    finally:
+        pump.cancel()
+        subscription.close()
+        await _close_old_connections()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from chat.models import ChatSession
+from chat.summary import recount
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сводку ChatSession (message_count, unread_count, last_message_*) '
+        'из таблицы сообщений (если она разошлась)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, help='Только сессии этого проекта')
+
+    def handle(self, *args, **options):
+        sessions = ChatSession.objects.all()
+        if options['project']:
+            sessions = sessions.filter(project_id=options['project'])
+        fixed = recount(sessions)
+        self.stdout.write(self.style.SUCCESS(f'{fixed} session summaries corrected'))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatmessage_session_id_index'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['created_at', 'id'], name='chat_msg_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['created_at', 'id'], name='chat_session_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='chat_session_project_idx'),
+        ),
+    ]
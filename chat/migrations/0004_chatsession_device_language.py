@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='device_type',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='language',
+            field=models.CharField(default='en', max_length=10),
+        ),
+    ]
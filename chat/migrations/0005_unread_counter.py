@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:50
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_count(apps, schema_editor):
+    ChatSession = apps.get_model('chat', 'ChatSession')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    unread = (
+        ChatMessage.objects
+        .filter(session=OuterRef('pk'), message_type='user', is_read=False)
+        .order_by()
+        .values('session')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    ChatSession.objects.update(unread_count=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_chatsession_device_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['session', 'id'], name='chat_msg_unread_idx'),
+        ),
+        migrations.RunPython(backfill_unread_count, migrations.RunPython.noop),
+    ]
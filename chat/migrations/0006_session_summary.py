@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:53
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def backfill_session_summary(apps, schema_editor):
+    ChatSession = apps.get_model('chat', 'ChatSession')
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    messages = ChatMessage.objects.filter(session=OuterRef('pk')).order_by()
+    ChatSession.objects.update(
+        message_count=Coalesce(Subquery(messages.values('session').annotate(total=Count('id')).values('total')), 0),
+        last_message_at=Coalesce(
+            Subquery(messages.values('session').annotate(last=Max('created_at')).values('last')),
+            F('created_at'),
+        ),
+        last_message_preview=Coalesce(
+            Subquery(
+                messages.order_by('-created_at', '-id')
+                .annotate(preview=Substr('content', 1, 200)).values('preview')[:1]
+            ),
+            Value(''),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_unread_counter'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['project', 'last_message_at', 'id'], name='chat_session_inbox_idx'),
+        ),
+        migrations.RunPython(backfill_session_summary, migrations.RunPython.noop),
+    ]
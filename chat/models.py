@@ -1,16 +1,35 @@
 from django.db import models
+from django.utils import timezone
 from projects.models import Project
 
 
+# Длина ChatSession.last_message_preview
+PREVIEW_LENGTH = 200
+
+
 class ChatSession(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='chat_sessions')
     client_id = models.CharField(max_length=100)
     page_url = models.CharField(max_length=500, blank=True, null=True)
+    device_type = models.CharField(max_length=20, blank=True, null=True)
+    language = models.CharField(max_length=10, default='en')
+    # Сводка для списка диалогов оператора; поддерживается сигналами (chat/summary.py)
+    unread_count = models.PositiveIntegerField(default=0)
+    message_count = models.PositiveIntegerField(default=0)
+    # Без сообщений — время создания сессии, чтобы сортировка по полю не упиралась в NULL
+    last_message_at = models.DateTimeField(default=timezone.now)
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='chat_session_created_idx'),
+            models.Index(fields=['project', 'created_at', 'id'], name='chat_session_project_idx'),
+            # Inbox: WHERE project_id = ? ORDER BY last_message_at DESC, id DESC
+            models.Index(fields=['project', 'last_message_at', 'id'], name='chat_session_inbox_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Chat {self.id}"
@@ -32,6 +51,24 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Keyset-выборка новых сообщений сессии: WHERE session_id = ? AND id > ?
+            models.Index(fields=['session', 'id'], name='chat_msg_session_id_idx'),
+            models.Index(fields=['created_at', 'id'], name='chat_msg_created_idx'),
+            # Только непрочитанные: отметка «прочитано до id N» и выборки непрочитанного
+            models.Index(fields=['session', 'id'], name='chat_msg_unread_idx', condition=models.Q(is_read=False)),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Состояние в БД на момент загрузки — по нему сигналы правят ChatSession.unread_count
+        if 'is_read' in field_names and 'message_type' in field_names:
+            instance._db_unread = instance.counts_as_unread()
+        return instance
+
+    def counts_as_unread(self):
+        return self.message_type == 'user' and not self.is_read
 
     def __str__(self) -> str:
         return self.content[:50]
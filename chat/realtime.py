@@ -0,0 +1,254 @@
+"""
+Pub/sub fan-out for chat messages.
+
+Persisted ``ChatMessage`` rows are published to a per-session channel and
+pushed to every WebSocket subscribed to that session. The broker class is
+taken from ``CHAT_REALTIME_BACKEND``. ``InProcessBroker`` reaches only the
+sockets of its own process: it serves a single ASGI worker and doubles as
+the stand-in for tests. ``RedisBroker`` publishes through Redis pub/sub
+(``CHAT_REALTIME_REDIS_URL``), so a message written in one worker reaches
+sockets connected to any other; production requires it with more than one
+worker.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+import orjson
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger('chat.realtime')
+
+
+def session_channel(session_id):
+    return f'chat.session.{session_id}'
+
+
+class Subscription:
+    """Очередь сообщений одного подписчика, привязанная к его event loop."""
+
+    def __init__(self, broker, channel, maxsize, ready=True):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self._ready = asyncio.Event()
+        if ready:
+            self._ready.set()
+
+    def _put(self, payload):
+        if self.queue.full():
+            # Медленный клиент: выбрасываем самое старое сообщение, а не блокируем остальных
+            self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+    def deliver(self, payload):
+        """Потокобезопасная доставка, можно вызывать из синхронного кода."""
+        self.loop.call_soon_threadsafe(self._put, payload)
+
+    def mark_ready(self):
+        """Потокобезопасно: брокер подтвердил подписку, сообщения канала будут доставлены."""
+        self.loop.call_soon_threadsafe(self._ready.set)
+
+    async def ready(self, timeout=None):
+        """Ждет подтверждения подписки. False, если не дождались за timeout секунд."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class BaseBroker:
+    def publish(self, channel, payload):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.CHAT_REALTIME_QUEUE_SIZE
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(payload)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+# Как часто слушатель Redis, ожидая сообщений, забирает новые подписки и отписки
+LISTEN_TIMEOUT = 0.05
+RECONNECT_DELAY = 1.0
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Публикация через Redis pub/sub. В каждом процессе один поток-слушатель
+    подписан на каналы сокетов этого процесса и раздает им сообщения, в том
+    числе опубликованные самим процессом. Только он работает с PubSub:
+    остальные потоки передают ему подписки и отписки через очередь.
+    """
+
+    def __init__(self, url=None, queue_size=None):
+        import redis
+
+        super().__init__(queue_size)
+        self.url = url or settings.CHAT_REALTIME_REDIS_URL
+        self._redis = redis
+        self._client = None
+        self._commands = None
+        # Каналы, подписку на которые Redis уже подтвердил
+        self._confirmed = set()
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # После fork поток слушателя родителя в этом процессе не существует
+            self._client = self._redis.Redis.from_url(self.url)
+            self._commands = queue.SimpleQueue()
+            self._confirmed = set()
+            threading.Thread(target=self._listen, name='chat-realtime-redis', daemon=True).start()
+            self._pid = os.getpid()
+
+    def publish(self, channel, payload):
+        if self._pid != os.getpid():
+            self._start()
+        self._client.publish(channel, orjson.dumps(payload))
+
+    def subscribe(self, channel):
+        if self._pid != os.getpid():
+            self._start()
+        subscription = Subscription(self, channel, self.queue_size, ready=False)
+        with self._lock:
+            first = channel not in self._subscribers
+            self._subscribers[channel].add(subscription)
+            if channel in self._confirmed:
+                subscription.mark_ready()
+        if first:
+            self._commands.put(('subscribe', channel))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if subscribers:
+                return
+            del self._subscribers[subscription.channel]
+            self._confirmed.discard(subscription.channel)
+        self._commands.put(('unsubscribe', subscription.channel))
+
+    def _listen(self):
+        pubsub = None
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = self._client.pubsub()
+                    # Новое соединение (первое или после обрыва): подписываемся на все каналы заново
+                    with self._lock:
+                        self._confirmed.clear()
+                        channels = list(self._subscribers)
+                    if channels:
+                        pubsub.subscribe(*channels)
+                while True:
+                    try:
+                        command, channel = self._commands.get_nowait()
+                    except queue.Empty:
+                        break
+                    if command == 'subscribe':
+                        pubsub.subscribe(channel)
+                    elif pubsub.subscribed:
+                        pubsub.unsubscribe(channel)
+                message = pubsub.get_message(timeout=LISTEN_TIMEOUT)
+                if message is not None:
+                    self._dispatch(message)
+            except self._redis.RedisError:
+                logger.exception('Chat pub/sub connection to Redis failed, reconnecting')
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except self._redis.RedisError:
+                        pass
+                pubsub = None
+                time.sleep(RECONNECT_DELAY)
+            except Exception:
+                # Одно битое сообщение не должно останавливать доставку остальных
+                logger.exception('Chat pub/sub message was not delivered')
+
+    def _dispatch(self, message):
+        channel = message['channel'].decode()
+        if message['type'] == 'message':
+            super().publish(channel, orjson.loads(message['data']))
+        elif message['type'] == 'subscribe':
+            with self._lock:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    self._confirmed.add(channel)
+                    for subscription in subscribers:
+                        subscription.mark_ready()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.CHAT_REALTIME_BACKEND)()
+    return _broker
+
+
+def set_broker(broker):
+    """Подменяет брокер (например, на локальный в тестах)."""
+    global _broker
+    _broker = broker
+
+
+def publish_message(message):
+    from .serializers import serialize_chat_message
+
+    get_broker().publish(session_channel(message.session_id), {
+        'type': 'message',
+        'message': serialize_chat_message(message),
+    })
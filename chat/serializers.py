@@ -1,7 +1,12 @@
 from rest_framework import serializers
+from core.serialization import compile_model_serializer
 from .models import ChatSession, ChatMessage
 
 
+# Поддерживаются сигналами (chat/summary.py), через API не пишутся
+SUMMARY_FIELDS = ('unread_count', 'message_count', 'last_message_at', 'last_message_preview')
+
+
 class ChatMessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChatMessage
@@ -14,3 +19,31 @@ class ChatSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChatSession
         fields = '__all__'
+        read_only_fields = SUMMARY_FIELDS
+
+
+class ChatSessionListSerializer(serializers.ModelSerializer):
+    """Сессия без вложенных сообщений — для списков и частого опроса."""
+
+    class Meta:
+        model = ChatSession
+        fields = '__all__'
+        read_only_fields = SUMMARY_FIELDS
+
+
+class ChatMessageBulkItemSerializer(serializers.Serializer):
+    """Одно сообщение пакетной отправки (POST /chat-messages/bulk/)."""
+    session = serializers.IntegerField()
+    content = serializers.CharField()
+    message_type = serializers.ChoiceField(choices=ChatMessage.MESSAGE_TYPES, default='admin')
+    is_read = serializers.BooleanField(default=False)
+
+
+class MarkReadSerializer(serializers.Serializer):
+    up_to_id = serializers.IntegerField(min_value=1)
+    message_type = serializers.ChoiceField(choices=ChatMessage.MESSAGE_TYPES, default='user')
+
+
+# Тот же вывод, что у ChatMessageSerializer / ChatSessionListSerializer, для горячих путей чата
+serialize_chat_message = compile_model_serializer(ChatMessage)
+serialize_chat_session = compile_model_serializer(ChatSession)
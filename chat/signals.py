@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver, Signal
+
+from .models import ChatMessage
+from .realtime import publish_message
+from . import summary
+
+
+# bulk_create не отправляет post_save, поэтому пакетная запись шлет свой сигнал
+# внутри транзакции. Аргументы: messages — список созданных ChatMessage.
+messages_bulk_created = Signal()
+
+
+@receiver(post_save, sender=ChatMessage)
+def message_saved(sender, instance, created, **kwargs):
+    if created:
+        summary.record_new([instance])
+        # Подписчики получают сообщение только после фиксации транзакции
+        transaction.on_commit(lambda: publish_message(instance))
+    else:
+        was_unread = getattr(instance, '_db_unread', None)
+        if was_unread is not None:
+            summary.adjust({instance.session_id: int(instance.counts_as_unread()) - int(was_unread)})
+    instance._db_unread = instance.counts_as_unread()
+
+
+@receiver(messages_bulk_created)
+def messages_bulk_created_handler(sender, messages, **kwargs):
+    summary.record_new(messages)
+    transaction.on_commit(lambda: [publish_message(message) for message in messages])
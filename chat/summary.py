@@ -0,0 +1,105 @@
+"""
+Denormalized chat session summary for the operator inbox.
+
+``ChatSession`` keeps ``message_count``, ``unread_count`` (unread visitor
+``message_type='user'`` messages), ``last_message_at`` and
+``last_message_preview``, so the inbox reads one indexed row per session
+instead of aggregating messages. A message insert updates all of them with
+one UPDATE per session; signals keep ``unread_count`` in step when
+``is_read`` changes. ``recount`` rebuilds everything from the messages table
+if the summary ever drifts.
+"""
+from collections import Counter
+
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Substr
+from django.utils import timezone
+
+from .models import ChatSession, ChatMessage, PREVIEW_LENGTH
+
+
+def preview(content):
+    return (content or '')[:PREVIEW_LENGTH]
+
+
+def record_new(messages):
+    """
+    Учитывает новые сообщения: счетчики, последнее сообщение и updated_at —
+    одним UPDATE на сессию. Более раннее сообщение (транзакции фиксируются
+    не по порядку) последнее не перезаписывает.
+    """
+    sessions = {}
+    for message in messages:
+        count, unread, last = sessions.get(message.session_id, (0, 0, None))
+        if last is None or (message.created_at, message.id) >= (last.created_at, last.id):
+            last = message
+        sessions[message.session_id] = (count + 1, unread + message.counts_as_unread(), last)
+
+    now = timezone.now()
+    for session_id, (count, unread, last) in sessions.items():
+        is_older = Q(last_message_at__gt=last.created_at)
+        ChatSession.objects.filter(id=session_id).update(
+            message_count=F('message_count') + count,
+            unread_count=F('unread_count') + unread,
+            last_message_at=Case(When(is_older, then=F('last_message_at')), default=Value(last.created_at)),
+            last_message_preview=Case(
+                When(is_older, then=F('last_message_preview')), default=Value(preview(last.content)),
+            ),
+            updated_at=now,
+        )
+
+
+def adjust(deltas):
+    """deltas: {session_id: изменение unread_count}. Счетчик не опускается ниже нуля."""
+    for session_id, delta in deltas.items():
+        if delta:
+            ChatSession.objects.filter(id=session_id).update(
+                unread_count=Greatest(F('unread_count') + delta, Value(0)),
+            )
+
+
+def count_new(messages):
+    return Counter(message.session_id for message in messages if message.counts_as_unread())
+
+
+def mark_read(session_id, up_to_id, message_type='user'):
+    """Отмечает прочитанными сообщения сессии с id <= up_to_id одним UPDATE. Возвращает их число."""
+    updated = ChatMessage.objects.filter(
+        session_id=session_id, id__lte=up_to_id, is_read=False, message_type=message_type,
+    ).update(is_read=True, updated_at=timezone.now())
+    if message_type == 'user':
+        adjust({session_id: -updated})
+    return updated
+
+
+def _session_aggregate(aggregate, **filters):
+    return Subquery(
+        ChatMessage.objects
+        .filter(session=OuterRef('pk'), **filters)
+        .order_by()
+        .values('session')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def recount(sessions=None):
+    """Пересчитывает сводку сессий из таблицы сообщений. Возвращает число исправленных сессий."""
+    last = ChatMessage.objects.filter(session=OuterRef('pk')).order_by('-created_at', '-id')
+    values = {
+        'message_count': Coalesce(_session_aggregate(Count('id')), 0),
+        'unread_count': Coalesce(_session_aggregate(Count('id'), message_type='user', is_read=False), 0),
+        'last_message_at': Coalesce(_session_aggregate(Max('created_at')), F('created_at')),
+        'last_message_preview': Coalesce(
+            Subquery(last.annotate(preview=Substr('content', 1, PREVIEW_LENGTH)).values('preview')[:1]),
+            Value(''),
+        ),
+    }
+    sessions = ChatSession.objects.all() if sessions is None else sessions
+    stale = sessions.annotate(**{f'actual_{name}': value for name, value in values.items()}).filter(
+        ~Q(message_count=F('actual_message_count'))
+        | ~Q(unread_count=F('actual_unread_count'))
+        | ~Q(last_message_at=F('actual_last_message_at'))
+        | ~Q(last_message_preview=F('actual_last_message_preview'))
+    )
+    return ChatSession.objects.filter(id__in=stale.values('id')).update(**values)
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import unittest
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from projects.models import Project
+from users.models import User
+from . import summary
+from .consumers import CLOSE_FORBIDDEN, CLOSE_NOT_FOUND, chat_websocket
+from .models import ChatSession, ChatMessage
+from .realtime import InProcessBroker, RedisBroker, set_broker
+from .serializers import serialize_chat_message
+
+
+TIMEOUT = 5
+
+
+class WebSocket:
+    """Клиент для chat_websocket поверх очередей ASGI receive/send."""
+
+    def __init__(self, path, query=''):
+        self.scope = {'type': 'websocket', 'path': path, 'query_string': query.encode()}
+        self.incoming = asyncio.Queue()
+        self.sent = asyncio.Queue()
+        self.task = None
+        # Отправка в оборванное соединение
+        self.broken = False
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send(self, event):
+        if self.broken:
+            raise OSError('Connection reset')
+        await self.sent.put(event)
+
+    async def connect(self):
+        self.task = asyncio.create_task(chat_websocket(self.scope, self.receive, self.send))
+        await self.incoming.put({'type': 'websocket.connect'})
+        return await self.next_event()
+
+    async def next_event(self):
+        return await asyncio.wait_for(self.sent.get(), TIMEOUT)
+
+    async def send_text(self, data):
+        await self.incoming.put({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def disconnect(self):
+        await self.incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, TIMEOUT)
+
+
+class ChatWebSocketTests(TransactionTestCase):
+    def setUp(self):
+        self.broker = InProcessBroker()
+        set_broker(self.broker)
+        project = Project.objects.create(name='Chat')
+        self.session = ChatSession.objects.create(project=project, client_id='visitor-1')
+        self.path = f'/ws/chat/{self.session.id}/'
+
+    def tearDown(self):
+        set_broker(None)
+
+    async def test_unknown_path_and_wrong_client_are_closed(self):
+        socket = WebSocket('/ws/chat/abc/', 'client_id=visitor-1')
+        self.assertEqual(await socket.connect(), {'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        socket = WebSocket(self.path, 'client_id=visitor-2')
+        self.assertEqual(await socket.connect(), {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        socket = WebSocket(self.path, 'token=broken')
+        self.assertEqual(await socket.connect(), {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+
+    async def test_persisted_message_is_pushed(self):
+        socket = WebSocket(self.path, 'client_id=visitor-1')
+        self.assertEqual(await socket.connect(), {'type': 'websocket.accept'})
+
+        message = await ChatMessage.objects.acreate(session=self.session, content='Hello', message_type='admin')
+        event = await socket.next_event()
+        self.assertEqual(event['type'], 'websocket.send')
+        self.assertEqual(json.loads(event['text']), {
+            'type': 'message', 'message': json.loads(json.dumps(serialize_chat_message(message))),
+        })
+
+        await socket.disconnect()
+        self.assertFalse(self.broker._subscribers)
+
+    async def test_operator_message_over_socket(self):
+        user = await User.objects.acreate(email='operator@example.com')
+        socket = WebSocket(self.path, f'token={AccessToken.for_user(user)}')
+        self.assertEqual(await socket.connect(), {'type': 'websocket.accept'})
+
+        await socket.send_text({'content': 'From operator'})
+        pushed = json.loads((await socket.next_event())['text'])['message']
+        self.assertEqual((pushed['content'], pushed['message_type']), ('From operator', 'admin'))
+        await socket.send_text('not an object')
+        await socket.disconnect()
+        self.assertEqual(await ChatMessage.objects.filter(session=self.session).acount(), 1)
+
+    async def test_tokens_of_inactive_or_deleted_users_are_refused(self):
+        inactive = await User.objects.acreate(email='inactive@example.com', is_active=False)
+        deleted = await User.objects.acreate(email='deleted@example.com')
+        token = AccessToken.for_user(deleted)
+        await deleted.adelete()
+        for query in (f'token={AccessToken.for_user(inactive)}', f'token={token}'):
+            socket = WebSocket(self.path, query)
+            self.assertEqual(await socket.connect(), {'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+
+    async def test_connections_are_closed_around_queries(self):
+        with mock.patch('chat.consumers.close_old_connections') as close:
+            socket = WebSocket(self.path, 'client_id=visitor-1')
+            await socket.connect()
+            await socket.send_text({'content': 'Hi'})
+            await socket.next_event()
+            await socket.disconnect()
+        # После рукопожатия, после записи сообщения и при отключении
+        self.assertEqual(close.call_count, 3)
+
+    async def test_failed_push_is_logged(self):
+        socket = WebSocket(self.path, 'client_id=visitor-1')
+        await socket.connect()
+        socket.broken = True
+        with self.assertLogs('chat.consumers', 'ERROR') as logs:
+            await ChatMessage.objects.acreate(session=self.session, content='Lost', message_type='admin')
+            for _ in range(100):
+                if logs.records:
+                    break
+                await asyncio.sleep(0.01)
+        self.assertIn('Connection reset', logs.output[0])
+        await socket.disconnect()
+
+
+def _redis_available():
+    try:
+        import redis
+        return redis.Redis.from_url(settings.CHAT_REALTIME_REDIS_URL, socket_connect_timeout=0.2).ping()
+    except Exception:
+        return False
+
+
+@unittest.skipUnless(_redis_available(), 'Redis at CHAT_REALTIME_REDIS_URL is not reachable')
+class RedisBrokerTests(SimpleTestCase):
+    async def test_message_reaches_subscribers_of_another_worker(self):
+        # Два брокера — как два процесса с общим Redis
+        publisher, listener = RedisBroker(), RedisBroker()
+        channel = f'chat.session.test-{uuid.uuid4().hex}'
+        subscription = listener.subscribe(channel)
+        self.assertTrue(await subscription.ready(TIMEOUT))
+
+        publisher.publish(channel, {'type': 'message', 'message': {'id': 1}})
+        self.assertEqual(await asyncio.wait_for(subscription.get(), TIMEOUT), {'type': 'message', 'message': {'id': 1}})
+        subscription.close()
+        self.assertFalse(listener._subscribers)
+
+
+class BulkMessageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        project = Project.objects.create(name='Bulk')
+        cls.session = ChatSession.objects.create(project=project, client_id='visitor-1')
+        cls.user = User.objects.create(email='operator@example.com')
+
+    def setUp(self):
+        self.client = APIClient(HTTP_HOST='localhost')
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, data):
+        return self.client.post(url, data, format='json', secure=True)
+
+    def test_bulk_send_and_mark_read(self):
+        response = self.post('/api/chat-messages/bulk/', [
+            {'session': self.session.id, 'content': 'One', 'message_type': 'user'},
+            {'session': self.session.id, 'content': 'Two', 'message_type': 'user'},
+            {'session': self.session.id, 'content': 'Read', 'message_type': 'user', 'is_read': True},
+            {'session': self.session.id, 'content': 'Reply', 'message_type': 'admin'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        ids = [message['id'] for message in response.json()]
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.unread_count, 2)
+
+        response = self.post(f'/api/chat-sessions/{self.session.id}/mark_read/', {'up_to_id': ids[0]})
+        self.assertEqual(response.json(), {'updated': 1, 'unread_count': 1})
+        response = self.post(f'/api/chat-sessions/{self.session.id}/mark_read/', {'up_to_id': ids[-1]})
+        self.assertEqual(response.json(), {'updated': 1, 'unread_count': 0})
+
+    def test_bulk_rejects_unknown_sessions(self):
+        response = self.post('/api/chat-messages/bulk/', [{'session': self.session.id + 100, 'content': 'Lost'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ChatMessage.objects.exists())
+
+
+class SummaryTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name='Summary')
+        self.session = ChatSession.objects.create(project=self.project, client_id='visitor-1')
+
+    def test_counters_follow_messages(self):
+        first = ChatMessage.objects.create(session=self.session, content='First', message_type='user')
+        ChatMessage.objects.create(session=self.session, content='Reply', message_type='admin')
+        ChatMessage.objects.create(session=self.session, content='Second', message_type='user')
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.message_count, self.session.unread_count), (3, 2))
+        self.assertEqual(self.session.last_message_preview, 'Second')
+
+        first.is_read = True
+        first.save()
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.unread_count, 1)
+        self.assertEqual(summary.recount(), 0)
+
+    def test_older_message_does_not_replace_last(self):
+        latest = ChatMessage.objects.create(session=self.session, content='Latest', message_type='user')
+        # Транзакция с более ранним сообщением зафиксировалась позже
+        older = ChatMessage(
+            id=latest.id + 1, session=self.session, content='Committed late', message_type='user',
+            created_at=latest.created_at - timedelta(minutes=5),
+        )
+        summary.record_new([older])
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.message_count, self.session.last_message_preview), (2, 'Latest'))
+        self.assertEqual(self.session.last_message_at, latest.created_at)
+
+    def test_recount_repairs_drift(self):
+        ChatMessage.objects.create(session=self.session, content='Hello', message_type='user')
+        ChatSession.objects.filter(id=self.session.id).update(message_count=7, unread_count=0)
+        self.assertEqual(summary.recount(), 1)
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.message_count, self.session.unread_count), (1, 1))
+
+    def test_inbox_orders_by_last_message(self):
+        other = ChatSession.objects.create(project=self.project, client_id='visitor-2')
+        ChatMessage.objects.create(session=self.session, content='Earlier', message_type='user', is_read=True)
+        ChatMessage.objects.create(session=other, content='Later', message_type='user')
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(User.objects.create(email='operator@example.com'))
+
+        rows = client.get(f'/api/chat-sessions/inbox/?project={self.project.id}', secure=True).json()['results']
+        self.assertEqual([row['id'] for row in rows], [other.id, self.session.id])
+        rows = client.get(f'/api/chat-sessions/inbox/?project={self.project.id}&unread=true', secure=True).json()
+        self.assertEqual([row['last_message_preview'] for row in rows['results']], ['Later'])
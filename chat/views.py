@@ -2,24 +2,109 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from .models import ChatSession, ChatMessage
-from .serializers import ChatSessionSerializer, ChatMessageSerializer
+from .serializers import (
+    ChatSessionSerializer, ChatSessionListSerializer, ChatMessageSerializer,
+    ChatMessageBulkItemSerializer, MarkReadSerializer,
+    serialize_chat_session, serialize_chat_message,
+)
+from .signals import messages_bulk_created
+from . import summary
 from projects.models import Project
+from core.filters import QueryParamFilterMixin, DATE_RANGE_FILTERS, apply_filters, parse_bool
+from core.idempotency import idempotent
+from core.throttling import WidgetRateThrottle
+from core.pagination import CreatedAtCursorPagination, LastMessageCursorPagination
 
 
-class ChatSessionViewSet(viewsets.ModelViewSet):
+MESSAGES_PAGE_SIZE = 100
+MESSAGES_MAX_PAGE_SIZE = 500
+BULK_MAX_MESSAGES = 1000
+# Поля строки inbox — все из ChatSession, без обращения к сообщениям
+INBOX_FIELDS = (
+    'id', 'client_id', 'page_url', 'device_type', 'language',
+    'last_message_at', 'last_message_preview', 'message_count', 'unread_count', 'created_at',
+)
+
+
+class ChatSessionViewSet(QueryParamFilterMixin, viewsets.ModelViewSet):
     queryset = ChatSession.objects.all()
     serializer_class = ChatSessionSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_fields = {
+        'project': ('project_id', int),
+        'client_id': ('client_id', str),
+        **DATE_RANGE_FILTERS,
+    }
+
+    def _include_messages(self):
+        return self.request.query_params.get('include_messages', '').lower() in ('true', '1', 'yes')
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == 'list' and self._include_messages():
+            qs = qs.prefetch_related('messages')
+        return qs
+
+    def get_serializer_class(self):
+        # В списке вложенные сообщения отдаются только по ?include_messages=true
+        if self.action == 'list' and not self._include_messages():
+            return ChatSessionListSerializer
+        return super().get_serializer_class()
 
     @action(detail=True, methods=['get'])
     def messages(self, request, pk=None):
+        """Сообщения сессии; с ?after_id=N — только новые (id > N), по возрастанию id"""
         session = self.get_object()
         messages = session.messages.all()
-        return Response(ChatMessageSerializer(messages, many=True).data)
 
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+        after_id = request.query_params.get('after_id')
+        if after_id is not None:
+            try:
+                after_id = int(after_id)
+                limit = min(int(request.query_params.get('limit', MESSAGES_PAGE_SIZE)), MESSAGES_MAX_PAGE_SIZE)
+            except ValueError:
+                return Response({'error': 'after_id and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+            messages = messages.filter(id__gt=after_id).order_by('id')[:max(limit, 1)]
+
+        return Response([serialize_chat_message(message) for message in messages])
+
+    @action(detail=True, methods=['post'])
+    def mark_read(self, request, pk=None):
+        """Отмечает прочитанными сообщения сессии до up_to_id включительно (по умолчанию — сообщения посетителя)"""
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = self.get_object()
+        with transaction.atomic():
+            updated = summary.mark_read(session.id, **serializer.validated_data)
+        session.refresh_from_db(fields=['unread_count'])
+        return Response({'updated': updated, 'unread_count': session.unread_count})
+
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        """
+        Диалоги проекта для оператора: ?project=N обязателен, ?unread=true — только
+        с непрочитанными. Свежие сверху, курсорная пагинация; одна выборка по индексу
+        (project, last_message_at, id).
+        """
+        if not request.query_params.get('project'):
+            return Response({'error': 'project is required'}, status=status.HTTP_400_BAD_REQUEST)
+        sessions = apply_filters(ChatSession.objects.all(), request.query_params, {
+            'project': ('project_id', int),
+            'client_id': ('client_id', str),
+            # false — порог -1, то есть без фильтра
+            'unread': ('unread_count__gt', lambda value: 0 if parse_bool(value) else -1),
+        })
+
+        paginator = LastMessageCursorPagination()
+        page = paginator.paginate_queryset(sessions.values(*INBOX_FIELDS), request, view=self)
+        return paginator.get_paginated_response(page)
+
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny], throttle_classes=[WidgetRateThrottle])
+    @idempotent('start_chat')
     def start_chat(self, request):
         """Начало чат-сессии через виджет"""
         project_id = request.data.get('project_id')
@@ -45,9 +130,9 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
                 message_type='system'
             )
             
-            serializer = ChatSessionSerializer(session)
-            data = serializer.data
-            data['messages'] = [ChatMessageSerializer(welcome_message).data]
+            # Сессия только что создана — из сообщений у нее только приветствие
+            data = serialize_chat_session(session)
+            data['messages'] = [serialize_chat_message(welcome_message)]
             
             return Response(data, status=status.HTTP_201_CREATED)
             
@@ -55,11 +140,54 @@ class ChatSessionViewSet(viewsets.ModelViewSet):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ChatMessageViewSet(viewsets.ModelViewSet):
+class ChatMessageViewSet(QueryParamFilterMixin, viewsets.ModelViewSet):
     queryset = ChatMessage.objects.all()
     serializer_class = ChatMessageSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_fields = {
+        'session': ('session_id', int),
+        'project': ('session__project_id', int),
+        'message_type': ('message_type', str),
+        'is_read': ('is_read', parse_bool),
+        **DATE_RANGE_FILTERS,
+    }
+
+    def perform_destroy(self, instance):
+        # Удаление по одному идет только здесь; каскад от сессии сводку не трогает.
+        # Удаленное могло быть последним сообщением — сводку сессии пересчитываем целиком
+        with transaction.atomic():
+            instance.delete()
+            summary.recount(ChatSession.objects.filter(id=instance.session_id))
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Пакетная отправка: список {session, content, message_type, is_read}, до BULK_MAX_MESSAGES за раз"""
+        serializer = ChatMessageBulkItemSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+        if not items or len(items) > BULK_MAX_MESSAGES:
+            return Response({'error': f'Send 1 to {BULK_MAX_MESSAGES} messages'}, status=status.HTTP_400_BAD_REQUEST)
+
+        session_ids = {item['session'] for item in items}
+        missing = session_ids - set(ChatSession.objects.filter(id__in=session_ids).values_list('id', flat=True))
+        if missing:
+            return Response({'error': f'Unknown sessions: {sorted(missing)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            messages = ChatMessage.objects.bulk_create([
+                ChatMessage(
+                    session_id=item['session'],
+                    content=item['content'],
+                    message_type=item['message_type'],
+                    is_read=item['is_read'],
+                )
+                for item in items
+            ])
+            messages_bulk_created.send(sender=ChatMessage, messages=messages)
+        return Response([serialize_chat_message(message) for message in messages], status=status.HTTP_201_CREATED)
 
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny], throttle_classes=[WidgetRateThrottle])
+    @idempotent('send_message')
     def send_message(self, request):
         """Отправка сообщения в чат через виджет"""
         session_id = request.data.get('session_id')
@@ -79,8 +207,7 @@ class ChatMessageViewSet(viewsets.ModelViewSet):
             # Здесь можно добавить логику для автоматических ответов
             # или уведомления администраторов
             
-            serializer = ChatMessageSerializer(message)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(serialize_chat_message(message), status=status.HTTP_201_CREATED)
             
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,140 @@
+"""
+Namespaced, version-invalidated caching on top of Django's cache framework.
+
+Every namespace (``projects``, ``channels``, ``schedules``, ``abtests``, ...)
+keeps a version counter per scope — usually a project id. Entries are keyed
+by that version, so invalidation is a single ``incr``: old entries are
+never read again and expire on their own. ``connect()`` bumps the version
+from ``post_save`` / ``post_delete`` after the transaction commits.
+
+A namespace can depend on others (the widget config depends on all four):
+its version is the combination of their versions, read with one
+``get_many``.
+
+With a per-process backend (LocMemCache) a bump is only seen by the process
+that made it, so versions there expire after ``CACHE_VERSION_TIMEOUT`` to
+bound staleness in the other workers. Shared backends keep them forever.
+
+Lookups are counted in ``habio_cache_requests_total`` (``/metrics``).
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .metrics import registry, register_counter
+
+
+register_counter('habio_cache_requests_total', 'Namespaced cache lookups by result')
+
+
+class CacheNamespace:
+    def __init__(self, name, depends_on=(), alias='default'):
+        for namespace in depends_on:
+            if namespace.alias != alias:
+                raise ValueError(f'{name}: dependency {namespace.name} uses another cache alias')
+        self.name = name
+        self.alias = alias
+        self.depends_on = tuple(depends_on)
+        self._hit = (('namespace', name), ('result', 'hit'))
+        self._miss = (('namespace', name), ('result', 'miss'))
+
+    def __repr__(self):
+        return f'<CacheNamespace {self.name}>'
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _version_key(self, scope):
+        return f'{self.name}:version:{scope}'
+
+    def _version_keys(self, scope):
+        return [namespace._version_key(scope) for namespace in (self, *self.depends_on)]
+
+    def key(self, scope, version, *parts):
+        return ':'.join(str(part) for part in (self.name, scope, version, *parts))
+
+    # ===== Versions =====
+    def version(self, scope):
+        keys = self._version_keys(scope)
+        found = self.cache.get_many(keys)
+        if len(found) < len(keys):
+            # Seed with a timestamp so that versions never repeat after a cache flush
+            for key in keys:
+                if key not in found:
+                    self.cache.add(key, time.time_ns(), settings.CACHE_VERSION_TIMEOUT)
+            found = self.cache.get_many(keys)
+        return '.'.join(str(found.get(key, 0)) for key in keys)
+
+    async def aversion(self, scope):
+        keys = self._version_keys(scope)
+        found = await self.cache.aget_many(keys)
+        if len(found) < len(keys):
+            for key in keys:
+                if key not in found:
+                    await self.cache.aadd(key, time.time_ns(), settings.CACHE_VERSION_TIMEOUT)
+            found = await self.cache.aget_many(keys)
+        return '.'.join(str(found.get(key, 0)) for key in keys)
+
+    def bump(self, scope):
+        key = self._version_key(scope)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, time.time_ns(), settings.CACHE_VERSION_TIMEOUT)
+
+    def invalidate(self, scope):
+        """Поднимает версию после коммита, чтобы параллельная пересборка не закешировала старые данные."""
+        transaction.on_commit(lambda: self.bump(scope))
+
+    # ===== Entries =====
+    def get(self, scope, version, *parts):
+        value = self.cache.get(self.key(scope, version, *parts))
+        registry.inc('habio_cache_requests_total', self._miss if value is None else self._hit)
+        return value
+
+    async def aget(self, scope, version, *parts):
+        value = await self.cache.aget(self.key(scope, version, *parts))
+        registry.inc('habio_cache_requests_total', self._miss if value is None else self._hit)
+        return value
+
+    def set(self, scope, version, value, *parts, timeout=DEFAULT_TIMEOUT):
+        self.cache.set(self.key(scope, version, *parts), value, timeout)
+
+    async def aset(self, scope, version, value, *parts, timeout=DEFAULT_TIMEOUT):
+        await self.cache.aset(self.key(scope, version, *parts), value, timeout)
+
+    def get_or_build(self, scope, version, build, *parts, timeout=DEFAULT_TIMEOUT):
+        """Значение из кеша или build(); None от build() не кешируется."""
+        value = self.get(scope, version, *parts)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.set(scope, version, value, *parts, timeout=timeout)
+        return value
+
+    async def aget_or_build(self, scope, version, build, *parts, timeout=DEFAULT_TIMEOUT):
+        """Асинхронный get_or_build; синхронный build() выполняется в потоке."""
+        value = await self.aget(scope, version, *parts)
+        if value is None:
+            value = await sync_to_async(build)()
+            if value is not None:
+                await self.aset(scope, version, value, *parts, timeout=timeout)
+        return value
+
+    # ===== Invalidation =====
+    def connect(self, model, scope_of):
+        """Инвалидирует scope_of(instance) при сохранении и удалении model; None — пропустить."""
+        def receiver(sender, instance, **kwargs):
+            scope = scope_of(instance)
+            if scope is not None:
+                self.invalidate(scope)
+
+        uid = f'core.cache:{self.name}:{model._meta.label}'
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
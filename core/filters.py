@@ -0,0 +1,59 @@
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+
+def parse_bool(value):
+    value = value.lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    raise ValueError(value)
+
+
+def parse_moment(value):
+    """ISO datetime или дата (YYYY-MM-DD, начало дня)."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = timezone.datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def apply_filters(queryset, params, filter_fields):
+    """
+    Применяет фильтры из query params. filter_fields: {param: (lookup, parser)}.
+    Некорректные значения дают 400, а не ошибку БД.
+    """
+    for param, (lookup, parser) in filter_fields.items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        try:
+            value = parser(value)
+        except (TypeError, ValueError):
+            raise ValidationError({param: f'Invalid value: {value}'})
+        queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+class QueryParamFilterMixin:
+    """Фильтрация списка по query params, поля описываются в filter_fields."""
+    filter_fields = {}
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == 'list':
+            qs = apply_filters(qs, self.request.query_params, self.filter_fields)
+        return qs
+
+
+DATE_RANGE_FILTERS = {
+    'created_after': ('created_at__gte', parse_moment),
+    'created_before': ('created_at__lt', parse_moment),
+}
@@ -0,0 +1,167 @@
+"""
+``Idempotency-Key`` support for the public create endpoints.
+
+A client that retries a POST (double click, flaky mobile network) sends the
+same ``Idempotency-Key`` header. The first request reserves the key with
+``cache.add``, runs the view and stores its successful response for
+``IDEMPOTENCY_KEY_TTL`` seconds; repeats get that response back with
+``Idempotent-Replayed: true`` and write nothing. A repeat that arrives
+while the first request is still running gets 409. Error responses are not
+stored, so the client can retry them with the same key.
+
+The key is scoped by project and ``client_id``, so a key reused by another
+visitor never replays someone else's response. A hash of the request body
+is stored with the response: the same key with a different body gets 422.
+
+Keys are shared between workers only with a shared cache backend
+(``CACHE_BACKEND=redis``); with LocMemCache each process remembers its own.
+"""
+import functools
+import hashlib
+import inspect
+import json
+
+import orjson
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from .metrics import registry, register_counter
+from .renderers import json_dumps
+
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+register_counter('habio_idempotency_requests_total', 'Requests with Idempotency-Key by view and result')
+
+
+def _cache():
+    return caches[settings.IDEMPOTENCY_CACHE_ALIAS]
+
+
+def _payload(request):
+    """Тело запроса как dict: request.data у DRF, иначе JSON или форма."""
+    data = getattr(request, 'data', None)
+    if data is None:
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                data = {}
+        else:
+            data = request.POST
+    if hasattr(data, 'lists'):
+        data = {key: values[0] if len(values) == 1 else values for key, values in data.lists()}
+    return data if isinstance(data, dict) else {'': data}
+
+
+def _identify(scope, request):
+    """(ключ кеша, отпечаток тела) или (None, None) без заголовка."""
+    key = request.META.get(HEADER)
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return None, None
+    data = _payload(request)
+    # project_id — из URL (виджет) или из тела (create_lead API)
+    url_kwargs = request.resolver_match.kwargs if request.resolver_match else {}
+    project_id = url_kwargs.get('project_id') or data.get('project_id')
+    owner = orjson.dumps([str(project_id or ''), str(data.get('client_id') or ''), key])
+    fingerprint = hashlib.sha256(orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    return f'idempotency:v2:{scope}:{hashlib.sha256(owner).hexdigest()}', fingerprint
+
+
+def _count(scope, result):
+    registry.inc('habio_idempotency_requests_total', (('view', scope), ('result', result)))
+
+
+def _replay(scope, stored, fingerprint):
+    """stored — (отпечаток, (status, тело)) или (отпечаток, None), пока первый запрос выполняется."""
+    stored_fingerprint, result = stored
+    if stored_fingerprint != fingerprint:
+        _count(scope, 'mismatch')
+        return HttpResponse(
+            json_dumps({'error': 'This Idempotency-Key was used with a different request body'}),
+            status=422, content_type='application/json',
+        )
+    if result is None:
+        _count(scope, 'conflict')
+        return HttpResponse(
+            json_dumps({'error': 'A request with this Idempotency-Key is in progress'}),
+            status=409, content_type='application/json',
+        )
+    _count(scope, 'replay')
+    status_code, body = result
+    response = HttpResponse(body, status=status_code, content_type='application/json')
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _stored(response, fingerprint):
+    """(отпечаток, (status, тело)) успешного ответа или None. Ответы DRF еще не отрендерены — берем data."""
+    if not 200 <= response.status_code < 300:
+        return None
+    data = getattr(response, 'data', None)
+    return fingerprint, (response.status_code, json_dumps(data) if data is not None else response.content)
+
+
+def _find_request(args):
+    return next(arg for arg in args if hasattr(arg, 'META'))
+
+
+def idempotent(scope):
+    """
+    Декоратор view (синхронного метода DRF или async-функции): повтор запроса
+    с тем же Idempotency-Key получает сохраненный ответ вместо новой записи.
+    """
+    def decorator(view):
+        if inspect.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                key, fingerprint = _identify(scope, _find_request(args))
+                if key is None:
+                    return await view(*args, **kwargs)
+                cache = _cache()
+                if not await cache.aadd(key, (fingerprint, None), settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                    stored = await cache.aget(key)
+                    if stored is not None:
+                        return _replay(scope, stored, fingerprint)
+                _count(scope, 'new')
+                try:
+                    response = await view(*args, **kwargs)
+                except BaseException:
+                    await cache.adelete(key)
+                    raise
+                stored = _stored(response, fingerprint)
+                if stored is None:
+                    await cache.adelete(key)
+                else:
+                    await cache.aset(key, stored, settings.IDEMPOTENCY_KEY_TTL)
+                return response
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key, fingerprint = _identify(scope, _find_request(args))
+            if key is None:
+                return view(*args, **kwargs)
+            cache = _cache()
+            if not cache.add(key, (fingerprint, None), settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                stored = cache.get(key)
+                # Ключ мог истечь между add и get — тогда выполняем запрос как новый
+                if stored is not None:
+                    return _replay(scope, stored, fingerprint)
+            _count(scope, 'new')
+            try:
+                response = view(*args, **kwargs)
+            except BaseException:
+                cache.delete(key)
+                raise
+            stored = _stored(response, fingerprint)
+            if stored is None:
+                cache.delete(key)
+            else:
+                cache.set(key, stored, settings.IDEMPOTENCY_KEY_TTL)
+            return response
+        return wrapper
+    return decorator
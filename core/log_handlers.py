@@ -0,0 +1,167 @@
+"""
+Non-blocking, structured log output.
+
+In ``LOG_MODE=queue`` request threads only put records on a bounded
+in-memory queue; a listener thread per process writes them to the real
+file handler. When the queue is full (the disk can't keep up) new records
+are dropped and counted in ``habio_log_records_dropped_total`` instead of
+stalling requests. ``JSONFormatter`` writes one JSON object per line.
+
+The listener starts on the first record in each process, so gunicorn
+workers forked from a master get their own thread.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+import orjson
+
+from .metrics import registry, register_counter
+
+
+register_counter('habio_log_records_dropped_total', 'Log records dropped because the log queue was full')
+
+# Атрибуты LogRecord; все прочие (extra=...) попадают в JSON как есть
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc_info'] = record.exc_text
+        if record.stack_info:
+            data['stack_info'] = self.formatStack(record.stack_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        return orjson.dumps(data, default=str).decode()
+
+
+def _build_handler(config):
+    config = dict(config)
+    handler_class = config.pop('class')
+    module, _, name = handler_class.rpartition('.')
+    return getattr(__import__(module, fromlist=[name]), name)(**config)
+
+
+class QueueListenerHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler с ограниченной очередью и собственным слушателем. target —
+    описание конечного обработчика ({'class': ..., аргументы}); форматтер и
+    уровень этого обработчика применяются к нему на стороне слушателя.
+    """
+
+    def __init__(self, target, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target_config = target
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # После fork поток слушателя родителя в этом процессе не существует
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            target = _build_handler(self.target_config)
+            target.setFormatter(self.formatter)
+            target.setLevel(self.level)
+            self._listener = logging.handlers.QueueListener(self.queue, target, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Сообщение и трейсбек собираются в потоке запроса (args и exc_info могут
+        # измениться позже), а форматирует запись уже конечный обработчик. Копия —
+        # для остальных обработчиков записи; без __init__ она втрое дешевле copy.copy
+        copied = object.__new__(logging.LogRecord)
+        copied.__dict__.update(record.__dict__)
+        record = copied
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            registry.inc('habio_log_records_dropped_total', ())
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        super().emit(record)
+
+    def flush(self):
+        """Ждет, пока слушатель запишет все, что уже в очереди."""
+        if self._listener is not None and self._pid == os.getpid():
+            self.queue.join()
+
+    def stop(self):
+        listener = self._listener
+        if listener is None or self._pid != os.getpid():
+            return
+        self._listener = None
+        try:
+            listener.stop()
+        except queue.Full:
+            pass
+        for handler in listener.handlers:
+            handler.close()
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+def file_handler(filename, formatter='verbose', level='INFO', mode='sync', rotation='none',
+                 max_bytes=0, backup_count=0, when='midnight', queue_size=10000):
+    """
+    Описание файлового обработчика для LOGGING. rotation: none | size (maxBytes)
+    | time (when) | watched (внешний logrotate); mode=queue ставит перед ним очередь.
+    """
+    target = {'filename': str(filename), 'encoding': 'utf-8'}
+    if rotation == 'size':
+        target.update({'class': 'logging.handlers.RotatingFileHandler',
+                       'maxBytes': max_bytes, 'backupCount': backup_count})
+    elif rotation == 'time':
+        target.update({'class': 'logging.handlers.TimedRotatingFileHandler',
+                       'when': when, 'backupCount': backup_count, 'utc': True})
+    elif rotation == 'watched':
+        target['class'] = 'logging.handlers.WatchedFileHandler'
+    else:
+        target['class'] = 'logging.FileHandler'
+
+    if mode == 'queue':
+        # '()' вместо 'class': начиная с 3.12 dictConfig сам собирает QueueHandler по 'class'
+        return {
+            '()': 'core.log_handlers.QueueListenerHandler',
+            'level': level,
+            'formatter': formatter,
+            'target': target,
+            'queue_size': queue_size,
+        }
+    return {'level': level, 'formatter': formatter, **target}
@@ -0,0 +1,296 @@
+"""
+In-process request metrics in Prometheus text format.
+
+Each thread writes to its own shard, so recording takes no locks; the
+lock is only taken when a new thread registers its shard. ``/metrics``
+merges all shards at scrape time.
+
+With ``PERF_METRICS_DIR`` set (gunicorn.conf.py does it for every worker)
+each worker also writes its totals to ``<dir>/<pid>.json`` every
+``PERF_METRICS_FLUSH_INTERVAL`` seconds from a background thread and on
+exit, and ``/metrics`` refreshes its own file and sums all of them, so
+every scrape returns the totals of the whole server (other workers' numbers
+lag by at most the flush interval). The gunicorn master folds the files of
+exited workers into ``dead.json`` (``merge_dead_worker``), so totals do not
+drop when workers are recycled. Without it metrics are per process.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import orjson
+from django.conf import settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'habio_request_duration_seconds': ('Request wall time', DURATION_BUCKETS),
+    'habio_request_db_queries': ('DB queries per request', QUERY_BUCKETS),
+    'habio_request_db_duration_seconds': ('DB time per request', DURATION_BUCKETS),
+    'habio_response_size_bytes': ('Response body size', SIZE_BUCKETS),
+}
+
+COUNTERS = {}
+
+DEAD_WORKERS = 'dead.json'
+# Сколько раз перечитывать каталог, если мастер переносил снимки во время чтения
+READ_ATTEMPTS = 3
+
+logger = logging.getLogger('api.perf')
+
+
+class _Shard:
+    __slots__ = ('histograms', 'counters')
+
+    def __init__(self):
+        # (metric, labels) -> [count per bucket..., +Inf count, sum]
+        self.histograms = {}
+        self.counters = {}
+
+
+def _merge(histograms, counters, other_histograms, other_counters):
+    for key, series in other_histograms.items():
+        merged = histograms.setdefault(key, [0] * len(series))
+        for i, value in enumerate(series):
+            merged[i] += value
+    for key, value in other_counters.items():
+        counters[key] = counters.get(key, 0) + value
+
+
+def _encode(histograms, counters):
+    return {
+        'histograms': [[metric, labels, series] for (metric, labels), series in histograms.items()],
+        'counters': [[metric, labels, value] for (metric, labels), value in counters.items()],
+    }
+
+
+def _decode(data):
+    def key(metric, labels):
+        return metric, tuple(tuple(pair) for pair in labels)
+    histograms = {key(metric, labels): series for metric, labels, series in data.get('histograms', ())}
+    counters = {key(metric, labels): value for metric, labels, value in data.get('counters', ())}
+    return histograms, counters
+
+
+def _load(path):
+    try:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _dump(path, data):
+    # Через временный файл: читатель видит либо старый снимок, либо новый целиком
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(data))
+    os.replace(tmp_path, path)
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+class WorkerSnapshots:
+    """Снимки метрик воркеров в общем каталоге: <pid>.json на воркер и dead.json."""
+
+    def __init__(self, path, pid=None):
+        self.path = path
+        self.pid = pid or os.getpid()
+
+    def write(self, histograms, counters):
+        _dump(os.path.join(self.path, f'{self.pid}.json'), _encode(histograms, counters))
+
+    def read(self):
+        """Сумма снимков всех воркеров, включая завершившиеся."""
+        dead_path = os.path.join(self.path, DEAD_WORKERS)
+        for _ in range(READ_ATTEMPTS):
+            before = _stat(dead_path)
+            dead = _load(dead_path) or {}
+            histograms, counters = _decode(dead)
+            # Снимок, уже перенесенный в dead.json, но еще не удаленный, не считаем дважды
+            skip = set(dead.get('pids', ()))
+            complete = True
+            for name in os.listdir(self.path):
+                stem, ext = os.path.splitext(name)
+                if ext != '.json' or not stem.isdigit() or int(stem) in skip:
+                    continue
+                snapshot = _load(os.path.join(self.path, name))
+                if snapshot is None:
+                    complete = False
+                    break
+                _merge(histograms, counters, *_decode(snapshot))
+            if complete and _stat(dead_path) == before:
+                break
+        return histograms, counters
+
+
+def merge_dead_worker(path, pid):
+    """Переносит снимок завершившегося воркера в dead.json. Вызывается мастером gunicorn."""
+    worker_path = os.path.join(path, f'{pid}.json')
+    snapshot = _load(worker_path)
+    if snapshot is None:
+        return
+    dead_path = os.path.join(path, DEAD_WORKERS)
+    histograms, counters = _decode(_load(dead_path) or {})
+    _merge(histograms, counters, *_decode(snapshot))
+    _dump(dead_path, {**_encode(histograms, counters), 'pids': [pid]})
+    os.remove(worker_path)
+
+
+def reset_directory(path):
+    """Очищает каталог снимков при старте мастера gunicorn."""
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(path, name))
+
+
+class Registry:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        # Снимки для PERF_METRICS_DIR и pid, в котором запущен поток записи
+        self._snapshots = None
+        self._flusher_pid = None
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard()
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+                self._start_flusher()
+        return shard
+
+    def _worker_snapshots(self):
+        if not settings.PERF_METRICS_DIR:
+            return None
+        snapshots = self._snapshots
+        if snapshots is None or snapshots.pid != os.getpid() or snapshots.path != settings.PERF_METRICS_DIR:
+            os.makedirs(settings.PERF_METRICS_DIR, exist_ok=True)
+            snapshots = WorkerSnapshots(settings.PERF_METRICS_DIR)
+            self._snapshots = snapshots
+        return snapshots
+
+    def _start_flusher(self):
+        # После fork поток родителя не существует — запускаем свой в каждом воркере
+        if self._flusher_pid == os.getpid() or not settings.PERF_METRICS_DIR:
+            return
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(settings.PERF_METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception('Failed to write metrics snapshot')
+
+    def flush(self):
+        """Записывает снимок процесса в PERF_METRICS_DIR (если задан)."""
+        snapshots = self._worker_snapshots()
+        if snapshots is not None:
+            snapshots.write(*self.collect())
+
+    def observe(self, metric, labels, value):
+        buckets = HISTOGRAMS[metric][1]
+        key = (metric, labels)
+        histograms = self._shard().histograms
+        series = histograms.get(key)
+        if series is None:
+            series = [0] * (len(buckets) + 2)
+            histograms[key] = series
+        # Значение попадает в первый подходящий бакет, кумулятивные суммы считаются при выдаче
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def inc(self, metric, labels, amount=1):
+        counters = self._shard().counters
+        key = (metric, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            shards = list(self._shards)
+        histograms, counters = {}, {}
+        for shard in shards:
+            _merge(histograms, counters, dict(shard.histograms), dict(shard.counters))
+        return histograms, counters
+
+    def collect_all(self):
+        """collect() или, с PERF_METRICS_DIR, сумма снимков всех воркеров."""
+        snapshots = self._worker_snapshots()
+        if snapshots is None:
+            return self.collect()
+        # Свой снимок тоже берется из файла: каждый файл только растет, и сумма
+        # не убывает от скрейпа к скрейпу, какой бы воркер его ни обслужил
+        snapshots.write(*self.collect())
+        return snapshots.read()
+
+    def render(self):
+        histograms, counters = self.collect_all()
+        lines = []
+
+        for metric, (help_text, buckets) in HISTOGRAMS.items():
+            series = sorted((labels, values) for (name, labels), values in histograms.items() if name == metric)
+            if not series:
+                continue
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for labels, values in series:
+                label_text = _labels(labels)
+                cumulative = 0
+                for bound, count in zip(buckets, values):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{_labels(labels + (("le", _number(bound)),))} {cumulative}')
+                cumulative += values[len(buckets)]
+                lines.append(f'{metric}_bucket{_labels(labels + (("le", "+Inf"),))} {cumulative}')
+                lines.append(f'{metric}_sum{label_text} {_number(values[-1])}')
+                lines.append(f'{metric}_count{label_text} {cumulative}')
+
+        for metric, help_text in COUNTERS.items():
+            series = sorted((labels, value) for (name, labels), value in counters.items() if name == metric)
+            if not series:
+                continue
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for labels, value in series:
+                lines.append(f'{metric}{_labels(labels)} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def register_counter(name, help_text):
+    COUNTERS[name] = help_text
+
+
+register_counter('habio_requests_total', 'Requests by view and status code')
+
+registry = Registry()
@@ -0,0 +1,97 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+
+
+logger = logging.getLogger('api.perf')
+
+
+class _QueryTracker:
+    """execute_wrapper: считает запросы и время БД, при необходимости сохраняет SQL."""
+
+    def __init__(self, capture_sql):
+        self.count = 0
+        self.duration = 0.0
+        self.capture_sql = capture_sql
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if self.capture_sql:
+                self.queries.append((elapsed, sql))
+
+
+class PerformanceMiddleware:
+    """
+    Время запроса, число и время SQL-запросов и размер ответа по имени URL.
+    Медленные запросы (PERF_SLOW_REQUEST_MS) логируются вместе с их SQL.
+    Работает и в синхронном, и в асинхронном стеке, не переключая поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.PERF_METRICS_ENABLED:
+            return self.get_response(request)
+
+        tracker = _QueryTracker(capture_sql=settings.PERF_SLOW_REQUEST_MS is not None)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(tracker))
+            response = self.get_response(request)
+        self._record(request, response, tracker, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.PERF_METRICS_ENABLED:
+            return await self.get_response(request)
+
+        tracker = _QueryTracker(capture_sql=settings.PERF_SLOW_REQUEST_MS is not None)
+        started = time.perf_counter()
+        # Соединения привязаны к контексту запроса и видны в потоках sync_to_async
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(tracker))
+            response = await self.get_response(request)
+        self._record(request, response, tracker, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, tracker, elapsed):
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        labels = (('view', view),)
+        registry.observe('habio_request_duration_seconds', labels, elapsed)
+        registry.observe('habio_request_db_queries', labels, tracker.count)
+        registry.observe('habio_request_db_duration_seconds', labels, tracker.duration)
+        if not response.streaming:
+            registry.observe('habio_response_size_bytes', labels, len(response.content))
+        registry.inc('habio_requests_total', labels + (('status', response.status_code),))
+
+        threshold = settings.PERF_SLOW_REQUEST_MS
+        if threshold is not None and elapsed * 1000 >= threshold:
+            logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms in DB\n%s',
+                request.method, request.path, view, elapsed * 1000, tracker.count, tracker.duration * 1000,
+                '\n'.join(f'  [{duration * 1000:.1f} ms] {sql}' for duration, sql in tracker.queries),
+            )
@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по (created_at, id): страница не зависит от размера
+    таблицы, в отличие от LIMIT/OFFSET.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class LastMessageCursorPagination(CursorPagination):
+    """Keyset-пагинация списка диалогов по (last_message_at, id), свежие сверху."""
+    ordering = ('-last_message_at', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,251 @@
+"""
+Rate limiting for the public (AllowAny) widget endpoints.
+
+Each action has limits per key kind — ``ip``, ``client`` (``client_id``)
+and ``project`` — in ``RATE_LIMITS`` (``{'create_lead': {'ip': '10/min',
+...}}``), scaled by ``RATE_LIMIT_PLAN_MULTIPLIERS`` for authenticated
+callers. A request is checked against in-process token buckets before the
+view runs, so a rejected request costs no database work.
+
+Buckets are per process: with N workers a key can get up to N times its
+limit. ``RATE_LIMIT_SYNC='cache'`` adds a shared sliding-window counter:
+each process pushes its hits to the cache at most every
+``RATE_LIMIT_SYNC_INTERVAL`` seconds and blocks keys whose global count is
+over the limit until the window moves on. The push is the only blocking
+part of a check; async views call ``acheck``, which runs it through the
+cache's async API instead of on the event loop.
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import registry, register_counter
+
+
+register_counter('habio_rate_limited_total', 'Requests rejected by the rate limiter by action and key')
+
+Rate = namedtuple('Rate', 'count period')
+
+PERIODS = {'s': 1, 'sec': 1, 'second': 1, 'm': 60, 'min': 60, 'minute': 60,
+           'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+# Полные (давно не использованные) корзины вычищаются раз в столько проверок
+CLEANUP_EVERY = 10000
+
+
+def parse_rate(rate):
+    """'10/min' -> Rate(10, 60)."""
+    count, _, period = rate.partition('/')
+    return Rate(int(count), PERIODS[period.strip().lower()])
+
+
+class TokenBucketLimiter:
+    """Корзины токенов в памяти процесса: {ключ: (токены, время)}."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._checks = 0
+
+    def hit(self, limits, now):
+        """
+        Списывает по токену из каждой корзины limits ([(ключ, Rate)]), только если
+        токены есть во всех. Возвращает None или (индекс отказавшей корзины,
+        сколько секунд ждать следующего токена).
+        """
+        with self._lock:
+            refilled = []
+            for index, (key, rate) in enumerate(limits):
+                refill = rate.count / rate.period
+                tokens, updated = self._buckets.get(key, (rate.count, now))
+                tokens = min(rate.count, tokens + (now - updated) * refill)
+                if tokens < 1:
+                    # Отказ одной корзины не тратит токены остальных
+                    return index, (1 - tokens) / refill
+                refilled.append(tokens)
+            for (key, rate), tokens in zip(limits, refilled):
+                self._buckets[key] = (tokens - 1, now)
+            self._checks += 1
+            if self._checks % CLEANUP_EVERY == 0:
+                self._cleanup(now)
+        return None
+
+    def _cleanup(self, now):
+        # Корзина, простоявшая дольше суток, гарантированно полна — ее можно забыть
+        self._buckets = {key: value for key, value in self._buckets.items() if now - value[1] < 86400}
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SharedWindow:
+    """
+    Общий для процессов счетчик скользящего окна в кеше: оценка — текущее
+    фиксированное окно плюс доля предыдущего. Локальные попадания копятся
+    и отправляются пачкой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._synced = {}
+        self._blocked = {}
+
+    def blocked(self, key, now):
+        until = self._blocked.get(key)
+        if until is None:
+            return 0
+        if until <= now:
+            self._blocked.pop(key, None)
+            return 0
+        return until - now
+
+    def hit(self, key, rate, now):
+        """
+        Учитывает попадание. Возвращает None или отправку в кеш (key, rate,
+        pending, now), которую вызывающий выполняет через push или apush.
+        """
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+            if now - self._synced.get(key, 0) < settings.RATE_LIMIT_SYNC_INTERVAL:
+                return None
+            pending = self._pending.pop(key)
+            self._synced[key] = now
+            if len(self._synced) > CLEANUP_EVERY:
+                self._synced = {k: t for k, t in self._synced.items() if now - t < 86400}
+        return key, rate, pending, now
+
+    def push(self, key, rate, pending, now):
+        cache = caches[settings.RATE_LIMIT_CACHE_ALIAS]
+        window = int(now // rate.period)
+        current_key, previous_key = f'ratelimit:{key}:{window}', f'ratelimit:{key}:{window - 1}'
+        if cache.add(current_key, pending, rate.period * 2):
+            current = pending
+        else:
+            try:
+                current = cache.incr(current_key, pending)
+            except ValueError:
+                cache.set(current_key, pending, rate.period * 2)
+                current = pending
+        self._update(key, rate, window, current, cache.get(previous_key) or 0, now)
+
+    async def apush(self, key, rate, pending, now):
+        """push для асинхронных представлений: кеш не блокирует цикл событий."""
+        cache = caches[settings.RATE_LIMIT_CACHE_ALIAS]
+        window = int(now // rate.period)
+        current_key, previous_key = f'ratelimit:{key}:{window}', f'ratelimit:{key}:{window - 1}'
+        if await cache.aadd(current_key, pending, rate.period * 2):
+            current = pending
+        else:
+            try:
+                current = await cache.aincr(current_key, pending)
+            except ValueError:
+                await cache.aset(current_key, pending, rate.period * 2)
+                current = pending
+        self._update(key, rate, window, current, await cache.aget(previous_key) or 0, now)
+
+    def _update(self, key, rate, window, current, previous, now):
+        elapsed = now / rate.period - window
+        if previous * (1 - elapsed) + current > rate.count:
+            # До конца текущего окна ключ закрыт во всем процессе
+            self._blocked[key] = (window + 1) * rate.period
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._synced.clear()
+            self._blocked.clear()
+
+
+buckets = TokenBucketLimiter()
+shared = SharedWindow()
+
+_rates = {}
+
+
+def _limits(action, plan):
+    """[(вид ключа, Rate)] для действия с учетом тарифа; разбор строк кешируется."""
+    cache_key = (action, plan)
+    limits = _rates.get(cache_key)
+    if limits is None:
+        multiplier = settings.RATE_LIMIT_PLAN_MULTIPLIERS.get(plan, 1) if plan else 1
+        limits = []
+        for kind, rate in settings.RATE_LIMITS.get(action, {}).items():
+            rate = parse_rate(rate)
+            limits.append((kind, Rate(max(int(rate.count * multiplier), 1), rate.period)))
+        _rates[cache_key] = limits
+    return limits
+
+
+def _take(action, ip, client_id, project_id, plan):
+    """
+    Проверяет все ключи действия и, только если разрешены все, списывает токены.
+    Возвращает (секунды ожидания или None, отправки в общий счетчик).
+    """
+    values = {'ip': ip, 'client': client_id, 'project': project_id}
+    now = time.time()
+    sync = settings.RATE_LIMIT_SYNC == 'cache'
+    limits = []
+    for kind, rate in _limits(action, plan):
+        value = values.get(kind)
+        if value in (None, ''):
+            continue
+        limits.append((kind, f'{action}:{kind}:{value}', rate))
+
+    rejected = None
+    for kind, key, rate in limits if sync else ():
+        wait = shared.blocked(key, now)
+        if wait:
+            rejected = kind, wait
+            break
+    if rejected is None:
+        refused = buckets.hit([(key, rate) for kind, key, rate in limits], now)
+        if refused is not None:
+            index, wait = refused
+            rejected = limits[index][0], wait
+    if rejected is not None:
+        kind, wait = rejected
+        registry.inc('habio_rate_limited_total', (('action', action), ('key', kind)))
+        return math.ceil(wait), ()
+    if not sync:
+        return None, ()
+    return None, [push for kind, key, rate in limits if (push := shared.hit(key, rate, now))]
+
+
+def check(action, ip=None, client_id=None, project_id=None, plan=None):
+    """
+    Учитывает запрос действия action. Возвращает None, если он разрешен, иначе
+    сколько секунд ждать. Ключи со значением None не проверяются.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    wait, pushes = _take(action, ip, client_id, project_id, plan)
+    for push in pushes:
+        shared.push(*push)
+    return wait
+
+
+async def acheck(action, ip=None, client_id=None, project_id=None, plan=None):
+    """check для асинхронных представлений."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    wait, pushes = _take(action, ip, client_id, project_id, plan)
+    for push in pushes:
+        await shared.apush(*push)
+    return wait
+
+
+def client_ip(request):
+    # За прокси REMOTE_ADDR выставляет сервер (uvicorn/gunicorn --forwarded-allow-ips)
+    return request.META.get('REMOTE_ADDR')
+
+
+def reset():
+    buckets.clear()
+    shared.clear()
+    _rates.clear()
@@ -0,0 +1,54 @@
+import json
+
+import orjson
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+_encoder = JSONEncoder()
+
+# Даты и время отдаются через JSONEncoder DRF, чтобы формат совпадал с обычным рендерером
+_ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def json_dumps(data):
+    """JSON в bytes тем же способом, что и API-рендерер (API_JSON_RENDERER)."""
+    if settings.API_JSON_RENDERER == 'orjson':
+        return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson: тот же вывод, что у JSONRenderer, в разы быстрее на больших ответах."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = _ORJSON_OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_encoder.default, option=options)
+
+
+class _ExportRenderer(BaseRenderer):
+    """
+    Маркер формата выгрузки (?format=csv|ndjson). Успешный ответ потоковый
+    (StreamingHttpResponse) и сюда не попадает — рендерятся только ошибки.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class CSVRenderer(_ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(_ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -0,0 +1,84 @@
+"""
+Precompiled model-to-dict serializers for hot response paths.
+
+``compile_model_serializer(Model)`` inspects the model once and returns a
+plain function producing the same dict as a ``fields = '__all__'``
+``ModelSerializer`` (same keys, key order and value formats: ISO 8601
+datetimes with ``Z`` for UTC, UUIDs and decimals as strings, foreign keys as
+ids), without building DRF fields for every object.
+"""
+from decimal import Decimal
+
+from django.db import models
+from django.utils import timezone
+
+
+def _identity(value):
+    return value
+
+
+def _datetime(value):
+    if not value or isinstance(value, str):
+        return value or None
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _isoformat(value):
+    if not value or isinstance(value, str):
+        return value or None
+    return value.isoformat()
+
+
+def _string(value):
+    return None if value is None else str(value)
+
+
+def _decimal(value):
+    if value is None or isinstance(value, str):
+        return value
+    return str(Decimal(value))
+
+
+CONVERTERS = (
+    (models.DateTimeField, _datetime),
+    (models.DateField, _isoformat),
+    (models.TimeField, _isoformat),
+    (models.UUIDField, _string),
+    (models.DecimalField, _decimal),
+)
+
+
+def _converter(field):
+    for field_class, convert in CONVERTERS:
+        if isinstance(field, field_class):
+            return convert
+    return _identity
+
+
+def compile_model_serializer(model, exclude=()):
+    """Функция obj -> dict с выводом, совпадающим с ModelSerializer(fields='__all__')."""
+    opts = model._meta
+    plain, relations = [], []
+    for field in opts.concrete_fields:
+        if field.name in exclude:
+            continue
+        if field.primary_key:
+            plain.insert(0, (field.name, field.attname, _identity))
+        elif field.is_relation:
+            # Внешние ключи — id связанного объекта, без обращения к нему
+            relations.append((field.name, field.attname, _identity))
+        else:
+            plain.append((field.name, field.attname, _converter(field)))
+    spec = tuple(plain + relations)
+
+    def serialize(obj):
+        return {name: convert(getattr(obj, attname)) for name, attname, convert in spec}
+
+    serialize.__name__ = f'serialize_{opts.model_name}'
+    serialize.fields = tuple(name for name, _, _ in spec)
+    return serialize
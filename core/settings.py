@@ -1,7 +1,10 @@
 from pathlib import Path
+import json
 import os
 import secrets
 
+from core.log_handlers import file_handler
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,13 +51,17 @@ INSTALLED_APPS = [
     'leads',
     'chat',
     'abtests',
+    'analytics',
+    'webhooks',
     'widget',
+    'benchmarks',
 ]
 
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -175,7 +182,150 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Request instrumentation (core.middleware.PerformanceMiddleware, exposed at /metrics)
+PERF_METRICS_ENABLED = os.getenv('PERF_METRICS_ENABLED', 'True').lower() in ('true', '1', 'yes')
+# Requests slower than this (ms) are logged with their SQL; unset to disable
+PERF_SLOW_REQUEST_MS = float(os.getenv('PERF_SLOW_REQUEST_MS')) if os.getenv('PERF_SLOW_REQUEST_MS') else None
+# Bearer token for /metrics; without one the endpoint is open unless PERF_METRICS_REQUIRE_TOKEN
+PERF_METRICS_TOKEN = os.getenv('PERF_METRICS_TOKEN', '')
+PERF_METRICS_REQUIRE_TOKEN = os.getenv('PERF_METRICS_REQUIRE_TOKEN', 'False').lower() in ('true', '1', 'yes')
+# Directory where each worker writes its metrics so /metrics returns totals for all workers
+# (set by gunicorn.conf.py); empty means per-process metrics
+PERF_METRICS_DIR = os.getenv('PERF_METRICS_DIR', '')
+PERF_METRICS_FLUSH_INTERVAL = float(os.getenv('PERF_METRICS_FLUSH_INTERVAL', '5'))
+
+# JSON renderer for API responses: 'orjson' (core.renderers.ORJSONRenderer) or 'json' (DRF JSONRenderer)
+API_JSON_RENDERER = os.getenv('API_JSON_RENDERER', 'orjson')
+
+# Serve the public widget endpoints with async views (widget/views.py) instead of WidgetViewSet
+WIDGET_ASYNC_VIEWS = os.getenv('WIDGET_ASYNC_VIEWS', 'True').lower() in ('true', '1', 'yes')
+
+# Cache (core.cache namespaces). CACHE_BACKEND: locmem (per process, development),
+# redis (shared by all workers, production), file or db (shared stand-ins; db needs createcachetable)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'habio'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://localhost:6379/1'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / '.cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'habio_cache'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'habio'),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')),
+    }
+}
+# Lifetime of namespace versions. A per-process cache can't see invalidations made by
+# other workers, so there versions expire to bound staleness; shared backends keep them.
+CACHE_VERSION_TIMEOUT = (
+    int(os.getenv('CACHE_VERSION_TIMEOUT')) if os.getenv('CACHE_VERSION_TIMEOUT')
+    else 60 if CACHE_BACKEND == 'locmem' else None
+)
+
+# Widget config cache
+# Entries are invalidated by version bumps, the timeout only bounds memory use
+WIDGET_CONFIG_CACHE_TIMEOUT = int(os.getenv('WIDGET_CONFIG_CACHE_TIMEOUT', '86400'))
+# Cache-Control max-age for widget config responses (seconds)
+WIDGET_CONFIG_MAX_AGE = int(os.getenv('WIDGET_CONFIG_MAX_AGE', '60'))
+
+# Static widget config snapshots (widget.snapshots): <root>/<project id>/current.json and
+# <version>.json for nginx/CDN, re-published after widget-related changes are committed
+WIDGET_SNAPSHOTS_ENABLED = os.getenv('WIDGET_SNAPSHOTS_ENABLED', 'False').lower() in ('true', '1', 'yes')
+# Empty: MEDIA_ROOT / 'widget'
+WIDGET_SNAPSHOT_ROOT = os.getenv('WIDGET_SNAPSHOT_ROOT', '')
+# Versioned files kept per project
+WIDGET_SNAPSHOT_KEEP = int(os.getenv('WIDGET_SNAPSHOT_KEEP', '5'))
+# Days of concrete open intervals in a snapshot; run publish_widget_snapshots daily
+WIDGET_SNAPSHOT_HORIZON_DAYS = int(os.getenv('WIDGET_SNAPSHOT_HORIZON_DAYS', '14'))
+
+# Lead ingestion: 'sync' writes leads in the request, 'queued' spools them for the drain_leads worker
+LEAD_INGEST_MODE = os.getenv('LEAD_INGEST_MODE', 'sync')
+LEAD_SPOOL_PATH = os.getenv('LEAD_SPOOL_PATH', str(BASE_DIR / 'lead_spool.sqlite3'))
+LEAD_INGEST_BATCH_SIZE = int(os.getenv('LEAD_INGEST_BATCH_SIZE', '500'))
+LEAD_INGEST_FLUSH_INTERVAL = float(os.getenv('LEAD_INGEST_FLUSH_INTERVAL', '1.0'))
+
+# JWT authentication (users.authentication.CachedJWTAuthentication) keeps users in a
+# per-process LRU for this many seconds; User saves invalidate it through the shared cache
+AUTH_USER_CACHE_TTL = float(os.getenv('AUTH_USER_CACHE_TTL', '30'))
+# Max cached users per process (0 disables the cache)
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '10000'))
+
+# Rate limits of the public widget actions (core/ratelimit.py), per key kind:
+# ip, client (client_id) and project. RATE_LIMITS may be overridden with a JSON env var.
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() in ('true', '1', 'yes')
+RATE_LIMITS = json.loads(os.getenv('RATE_LIMITS', 'null')) or {
+    'get_channels': {'ip': '120/min', 'project': '6000/min'},
+    'record_exposure': {'ip': '120/min', 'client': '10/min', 'project': '6000/min'},
+    'create_lead': {'ip': '10/min', 'client': '5/min', 'project': '600/min'},
+    'create_callback': {'ip': '10/min', 'client': '5/min', 'project': '600/min'},
+    'start_chat': {'ip': '20/min', 'client': '10/min', 'project': '1200/min'},
+    'send_message': {'ip': '60/min', 'client': '30/min', 'project': '6000/min'},
+}
+# Limits are multiplied by the User.plan factor for authenticated callers
+RATE_LIMIT_PLAN_MULTIPLIERS = {'free': 1, 'pro': 5}
+# 'local': per-process buckets only; 'cache': also a sliding window shared through the cache
+RATE_LIMIT_SYNC = os.getenv('RATE_LIMIT_SYNC', 'local')
+RATE_LIMIT_SYNC_INTERVAL = float(os.getenv('RATE_LIMIT_SYNC_INTERVAL', '1'))
+RATE_LIMIT_CACHE_ALIAS = os.getenv('RATE_LIMIT_CACHE_ALIAS', 'default')
+
+# Idempotency-Key on widget create endpoints (core.idempotency): successful responses are
+# replayed for this long (seconds); a key stays locked while its first request runs
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '30'))
+IDEMPOTENCY_CACHE_ALIAS = os.getenv('IDEMPOTENCY_CACHE_ALIAS', 'default')
+# Identical lead/callback submissions within this many seconds return the first one (0 disables)
+LEAD_DEDUP_WINDOW = int(os.getenv('LEAD_DEDUP_WINDOW', '600'))
+
+# A/B exposure/conversion counters are flushed to VariantDailyStats at most this often (seconds)
+ABTEST_EVENTS_FLUSH_INTERVAL = float(os.getenv('ABTEST_EVENTS_FLUSH_INTERVAL', '10'))
+
+# Outbound webhooks (deliver_webhooks worker)
+WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', '100'))
+WEBHOOK_CLAIM_SIZE = int(os.getenv('WEBHOOK_CLAIM_SIZE', '1000'))
+WEBHOOK_CONCURRENCY = int(os.getenv('WEBHOOK_CONCURRENCY', '8'))
+WEBHOOK_POOL_HOSTS = int(os.getenv('WEBHOOK_POOL_HOSTS', '100'))
+WEBHOOK_TIMEOUT = float(os.getenv('WEBHOOK_TIMEOUT', '10'))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '8'))
+WEBHOOK_RETRY_BASE = float(os.getenv('WEBHOOK_RETRY_BASE', '30'))
+WEBHOOK_RETRY_MAX = float(os.getenv('WEBHOOK_RETRY_MAX', '3600'))
+WEBHOOK_LEASE = int(os.getenv('WEBHOOK_LEASE', '120'))
+WEBHOOK_POLL_INTERVAL = float(os.getenv('WEBHOOK_POLL_INTERVAL', '1.0'))
+
+# Rows fetched per server-side cursor round trip in streaming exports
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# Chat realtime (WebSocket fan-out). chat.realtime.InProcessBroker only reaches sockets of the
+# same process; with several ASGI workers use chat.realtime.RedisBroker (Redis pub/sub)
+CHAT_REALTIME_BACKEND = os.getenv('CHAT_REALTIME_BACKEND', 'chat.realtime.InProcessBroker')
+CHAT_REALTIME_REDIS_URL = os.getenv('CHAT_REALTIME_REDIS_URL', 'redis://localhost:6379/2')
+# Per-connection buffer; the oldest messages are dropped for clients that fall behind
+CHAT_REALTIME_QUEUE_SIZE = int(os.getenv('CHAT_REALTIME_QUEUE_SIZE', '100'))
+
 # Logging configuration
+# 'sync': the request thread writes log files itself; 'queue': records go through a bounded
+# in-memory queue to a listener thread (core.log_handlers), dropped and counted when it is full
+LOG_MODE = os.getenv('LOG_MODE', 'sync')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# 'text' or 'json' (one JSON object per line) for the log file
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+# 'none', 'size' (LOG_MAX_BYTES), 'time' (LOG_ROTATE_WHEN, UTC) or 'watched' (reopen after an
+# external logrotate). With several worker processes writing one file use 'watched'.
+LOG_ROTATION = os.getenv('LOG_ROTATION', 'none')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(100 * 1024 * 1024)))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '7'))
+LOG_FILE_OPTIONS = {
+    'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
+    'mode': LOG_MODE,
+    'rotation': LOG_ROTATION,
+    'max_bytes': LOG_MAX_BYTES,
+    'backup_count': LOG_BACKUP_COUNT,
+    'when': LOG_ROTATE_WHEN,
+    'queue_size': LOG_QUEUE_SIZE,
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -188,14 +338,12 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.log_handlers.JSONFormatter',
+        },
     },
     'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
-        },
+        'file': file_handler(BASE_DIR / 'logs' / 'django.log', **LOG_FILE_OPTIONS),
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
@@ -223,12 +371,16 @@ LOGGING = {
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer' if API_JSON_RENDERER == 'orjson' else 'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
@@ -266,4 +418,18 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+    # Checks the blacklist through users.tokens.BlacklistFilter first
+    'TOKEN_REFRESH_SERIALIZER': 'users.tokens.TokenRefreshSerializer',
 }
+
+# In-memory Bloom filter in front of the refresh token blacklist (users/tokens.py)
+TOKEN_BLACKLIST_FILTER_ENABLED = os.getenv('TOKEN_BLACKLIST_FILTER_ENABLED', 'True').lower() in ('true', '1', 'yes')
+TOKEN_BLACKLIST_FILTER_CAPACITY = int(os.getenv('TOKEN_BLACKLIST_FILTER_CAPACITY', '100000'))
+TOKEN_BLACKLIST_FILTER_ERROR_RATE = float(os.getenv('TOKEN_BLACKLIST_FILTER_ERROR_RATE', '0.001'))
+# Tokens blacklisted by other workers are seen after at most this many seconds (0: on every check)
+TOKEN_BLACKLIST_FILTER_SYNC_INTERVAL = float(os.getenv('TOKEN_BLACKLIST_FILTER_SYNC_INTERVAL', '1'))
+# Each sync re-reads rows blacklisted this many seconds before the previous one, covering
+# transactions that commit late and clock skew between workers
+TOKEN_BLACKLIST_FILTER_SYNC_MARGIN = float(os.getenv('TOKEN_BLACKLIST_FILTER_SYNC_MARGIN', '30'))
+# Full rebuild from the live rows drops expired tokens from the filter
+TOKEN_BLACKLIST_FILTER_REBUILD_INTERVAL = float(os.getenv('TOKEN_BLACKLIST_FILTER_REBUILD_INTERVAL', '3600'))
@@ -1,4 +1,5 @@
 from .settings import *
+import multiprocessing
 import os
 
 # Override settings for production
@@ -23,6 +24,55 @@ DATABASES = {
     }
 }
 
+# Database connection reuse, selected with DB_CONN_MODE:
+#   pool       - psycopg 3 connection pool per worker process (default). Works with the
+#                async views: connections go back to the pool at the end of each request.
+#   persistent - one connection per thread kept for DB_CONN_MAX_AGE seconds and health-checked
+#                before reuse. Only effective for sync code, async requests still reconnect.
+#   none       - a new connection for every request.
+# With the pool, the server needs max_connections >= workers * DB_POOL_MAX_SIZE (+ workers for jobs).
+DB_CONN_MODE = os.getenv('DB_CONN_MODE', 'pool')
+if DB_CONN_MODE == 'pool':
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            # Seconds a request waits for a free connection before failing
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+            # Drop connections the server closed (restart, failover) before handing them out
+            'check': ConnectionPool.check_connection,
+        },
+    }
+elif DB_CONN_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_CONN_MODE != 'none':
+    raise ValueError("DB_CONN_MODE must be one of: pool, persistent, none")
+
+# /metrics exposes per-endpoint traffic and error rates: without PERF_METRICS_TOKEN it answers 403
+PERF_METRICS_REQUIRE_TOKEN = True
+
+# Cache: widget config invalidation, cached users, idempotency keys and shared rate limits
+# only hold across workers with a shared backend, so the per-process locmem is not allowed here
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis')
+if CACHE_BACKEND not in CACHE_BACKENDS or CACHE_BACKEND == 'locmem':
+    raise ValueError("CACHE_BACKEND must be a shared backend in production: redis, file or db")
+CACHES['default']['BACKEND'] = CACHE_BACKENDS[CACHE_BACKEND][0]
+CACHES['default']['LOCATION'] = os.getenv('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1])
+CACHE_VERSION_TIMEOUT = int(os.getenv('CACHE_VERSION_TIMEOUT')) if os.getenv('CACHE_VERSION_TIMEOUT') else None
+
+# Chat pushes reach sockets in other workers only through a shared broker. The worker
+# count is read the same way as in gunicorn.conf.py
+CHAT_REALTIME_BACKEND = os.getenv('CHAT_REALTIME_BACKEND', 'chat.realtime.RedisBroker')
+if (CHAT_REALTIME_BACKEND == 'chat.realtime.InProcessBroker'
+        and int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count()))) > 1):
+    raise ValueError("CHAT_REALTIME_BACKEND must be a shared broker (chat.realtime.RedisBroker) "
+                     "with more than one worker; set GUNICORN_WORKERS=1 to use the in-process broker")
+
 # Security settings
 SECURE_HSTS_SECONDS = int(os.getenv('SECURE_HSTS_SECONDS', '31536000'))
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
@@ -52,14 +102,12 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.log_handlers.JSONFormatter',
+        },
     },
     'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': '/app/logs/django.log',
-            'formatter': 'verbose',
-        },
+        'file': file_handler('/app/logs/django.log', **LOG_FILE_OPTIONS),
         'console': {
             'level': 'WARNING',
             'class': 'logging.StreamHandler',
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from channels.models import Channel
+from chat.models import ChatSession, ChatMessage
+from chat.serializers import ChatMessageSerializer, ChatSessionListSerializer, serialize_chat_message, serialize_chat_session
+from leads.models import Lead, CallbackRequest
+from leads.serializers import LeadSerializer, CallbackRequestSerializer, serialize_lead, serialize_callback
+from projects.models import Project
+from . import ratelimit
+from .metrics import Registry, WorkerSnapshots, merge_dead_worker
+
+
+LIMITS = {'create_lead': {'ip': '3/min', 'client': '1/min'}}
+
+DATABASE_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'ratelimit': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'test_ratelimit'},
+}
+
+
+@override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMITS=LIMITS, RATE_LIMIT_SYNC='local')
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        ratelimit.reset()
+
+    def tearDown(self):
+        ratelimit.reset()
+
+    def test_rejection_does_not_spend_other_keys(self):
+        self.assertIsNone(ratelimit.check('create_lead', ip='1.1.1.1', client_id='a'))
+        # client 'a' исчерпан: ip-корзина при отказе не тратится
+        for _ in range(5):
+            self.assertIsNotNone(ratelimit.check('create_lead', ip='1.1.1.1', client_id='a'))
+        self.assertIsNone(ratelimit.check('create_lead', ip='1.1.1.1', client_id='b'))
+        self.assertIsNone(ratelimit.check('create_lead', ip='1.1.1.1', client_id='c'))
+        self.assertIsNotNone(ratelimit.check('create_lead', ip='1.1.1.1', client_id='d'))
+
+    def test_missing_values_are_not_limited(self):
+        for _ in range(5):
+            self.assertIsNone(ratelimit.check('create_lead', client_id=''))
+            self.assertIsNone(ratelimit.check('other_action', ip='2.2.2.2'))
+
+    def test_wait_is_rounded_up(self):
+        ratelimit.check('create_lead', client_id='a')
+        self.assertEqual(ratelimit.check('create_lead', client_id='a'), 60)
+
+
+@override_settings(
+    RATE_LIMIT_ENABLED=True, RATE_LIMITS=LIMITS, RATE_LIMIT_SYNC='cache', RATE_LIMIT_SYNC_INTERVAL=0,
+    RATE_LIMIT_CACHE_ALIAS='ratelimit', CACHES=DATABASE_CACHE,
+)
+class SharedRateLimitTests(TransactionTestCase):
+    def setUp(self):
+        ratelimit.reset()
+        call_command('createcachetable', 'test_ratelimit', database='default')
+
+    def tearDown(self):
+        ratelimit.reset()
+
+    async def test_async_check_with_database_cache(self):
+        # Синхронный вызов кеша на БД в цикле событий дал бы SynchronousOnlyOperation
+        self.assertIsNone(await ratelimit.acheck('create_lead', ip='1.1.1.1'))
+        self.assertIsNone(await ratelimit.acheck('create_lead', ip='1.1.1.1'))
+        ratelimit.buckets.clear()
+        self.assertIsNone(await ratelimit.acheck('create_lead', ip='1.1.1.1'))
+        # Общий счетчик уже 3 из 3: следующий запрос закрывает ключ до конца окна
+        await ratelimit.acheck('create_lead', ip='1.1.1.1')
+        ratelimit.buckets.clear()
+        self.assertIsNotNone(await ratelimit.acheck('create_lead', ip='1.1.1.1'))
+
+
+class SerializerParityTests(TestCase):
+    """Скомпилированные сериализаторы отдают то же, что ModelSerializer(fields='__all__')."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Project.objects.create(name='Parity')
+        cls.channel = Channel.objects.create(project=cls.project, type='form', label='Form')
+
+    def test_chat(self):
+        session = ChatSession.objects.create(project=self.project, client_id='visitor-1', page_url='/pricing')
+        message = ChatMessage.objects.create(session=session, content='Привет', message_type='user')
+        session.refresh_from_db()
+        self.assertEqual(serialize_chat_message(message), ChatMessageSerializer(message).data)
+        self.assertEqual(serialize_chat_session(session), ChatSessionListSerializer(session).data)
+
+    def test_leads(self):
+        lead = Lead.objects.create(
+            project=self.project, channel=self.channel, contact='+79990000000', utm_source='ads',
+            submission_id=uuid.uuid4(),
+        )
+        callback = CallbackRequest.objects.create(
+            project=self.project, phone='+79990000000', preferred_time=timezone.now() + timedelta(hours=1),
+        )
+        self.assertEqual(serialize_lead(lead), LeadSerializer(lead).data)
+        self.assertEqual(serialize_callback(callback), CallbackRequestSerializer(callback).data)
+
+
+class WorkerMetricsTests(SimpleTestCase):
+    """/metrics одного воркера отдает суммы всех воркеров из PERF_METRICS_DIR."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+
+    def worker(self, pid, requests):
+        registry = Registry()
+        for _ in range(requests):
+            registry.inc('habio_requests_total', (('view', 'widget'), ('status', 201)))
+            registry.observe('habio_request_duration_seconds', (('view', 'widget'),), 0.02)
+        WorkerSnapshots(self.path, pid).write(*registry.collect())
+
+    def render(self, scraper):
+        with self.settings(PERF_METRICS_DIR=self.path):
+            return scraper.render()
+
+    def test_totals_include_other_and_exited_workers(self):
+        self.worker(101, 2)
+        self.worker(102, 3)
+        scraper = Registry()
+        scraper.inc('habio_requests_total', (('view', 'widget'), ('status', 201)))
+
+        text = self.render(scraper)
+        self.assertIn('habio_requests_total{view="widget",status="201"} 6', text)
+        self.assertIn('habio_request_duration_seconds_bucket{view="widget",le="0.025"} 5', text)
+
+        # Мастер переносит снимок завершившегося воркера: сумма не меняется
+        merge_dead_worker(self.path, 101)
+        self.assertEqual(sorted(os.listdir(self.path)), sorted(['102.json', 'dead.json', f'{os.getpid()}.json']))
+        self.assertEqual(self.render(scraper), text)
+        self.worker(103, 1)
+        merge_dead_worker(self.path, 103)
+        self.assertIn('habio_requests_total{view="widget",status="201"} 7', self.render(scraper))
+
+    def test_per_process_without_directory(self):
+        self.worker(101, 2)
+        scraper = Registry()
+        scraper.inc('habio_requests_total', (('view', 'widget'), ('status', 201)))
+        self.assertIn('habio_requests_total{view="widget",status="201"} 1', scraper.render())
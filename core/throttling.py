@@ -0,0 +1,31 @@
+from rest_framework.throttling import BaseThrottle
+
+from . import ratelimit
+
+
+def _param(request, name):
+    data = request.data
+    value = data.get(name) if hasattr(data, 'get') else None
+    return value if value is not None else request.query_params.get(name)
+
+
+class WidgetRateThrottle(BaseThrottle):
+    """
+    Лимиты публичных действий (core/ratelimit.py) по IP, client_id и проекту.
+    Действие — view.action; действия без записи в RATE_LIMITS не ограничиваются.
+    """
+
+    def allow_request(self, request, view):
+        user = request.user
+        plan = getattr(user, 'plan', None) if user and user.is_authenticated else None
+        self.wait_seconds = ratelimit.check(
+            getattr(view, 'action', None),
+            ip=ratelimit.client_ip(request),
+            client_id=_param(request, 'client_id'),
+            project_id=view.kwargs.get('project_id') or _param(request, 'project_id'),
+            plan=plan,
+        )
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
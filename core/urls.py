@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from .views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     # API schema and Swagger UI
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -14,5 +16,6 @@ urlpatterns = [
     path('api/', include('leads.urls')),
     path('api/', include('chat.urls')),
     path('api/', include('abtests.urls')),
+    path('api/', include('analytics.urls')),
     path('api/', include('widget.urls')),
 ]
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .metrics import registry
+
+
+def metrics_view(request):
+    """
+    Метрики в формате Prometheus, с PERF_METRICS_DIR — суммы по всем воркерам.
+    Если задан PERF_METRICS_TOKEN — нужен Bearer-токен; с PERF_METRICS_REQUIRE_TOKEN
+    без токена в настройках доступа нет.
+    """
+    token = settings.PERF_METRICS_TOKEN
+    if not token:
+        if settings.PERF_METRICS_REQUIRE_TOKEN:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,51 @@
+"""
+Gunicorn configuration for production (see Dockerfile.prod).
+
+Workers are uvicorn ASGI workers serving ``core.asgi:application``: each
+process runs an event loop, so async widget views and chat WebSockets wait
+on I/O without holding a worker. All values can be overridden from the
+environment.
+"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+# One event loop per core is enough: a worker is not blocked while requests wait on I/O
+# Chat sockets in different workers get each other's messages through Redis pub/sub
+# (CHAT_REALTIME_BACKEND=chat.realtime.RedisBroker, required by settings_production with workers > 1)
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count())))
+
+# Pending connections the kernel queues per listening socket before refusing new ones
+backlog = int(os.getenv('GUNICORN_BACKLOG', '2048'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+forwarded_allow_ips = os.getenv('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+# /metrics sums the snapshots all workers write here (core.metrics); the master keeps
+# the totals of exited workers, so counters survive max_requests recycling
+metrics_dir = os.environ.setdefault('PERF_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'habio-metrics'))
+
+
+def on_starting(server):
+    from core.metrics import reset_directory
+    reset_directory(metrics_dir)
+
+
+def worker_exit(server, worker):
+    from core.metrics import registry
+    registry.flush()
+
+
+def child_exit(server, worker):
+    from core.metrics import merge_dead_worker
+    merge_dead_worker(metrics_dir, worker.pid)
@@ -0,0 +1,107 @@
+"""
+Streaming CSV / NDJSON export.
+
+Rows are read with a server-side cursor (``iterator(chunk_size=...)``) and
+written out chunk by chunk, so memory stays flat no matter how many rows
+match the filters.
+
+Under ASGI Django would turn a sync iterator into a list before sending
+the first byte, so there the stream is an async generator that reads each
+chunk in the request's sync thread (where the cursor's connection lives).
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+
+LEAD_EXPORT_FIELDS = (
+    'id', 'project_id', 'channel_id', 'contact', 'message',
+    'utm_source', 'utm_medium', 'utm_campaign', 'page_url', 'client_id',
+    'device_type', 'language', 'processed', 'created_at',
+)
+
+CALLBACK_EXPORT_FIELDS = (
+    'id', 'project_id', 'channel_id', 'phone', 'preferred_time', 'message', 'page_url',
+    'utm_source', 'utm_medium', 'utm_campaign', 'client_id', 'device_type', 'language',
+    'processed', 'created_at',
+)
+
+
+# Ячейки, которые Excel/Sheets исполняют как формулу; контакты и сообщения приходят
+# от анонимного виджета, поэтому такие значения выгружаются с ведущим апострофом
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(tuple(value.isoformat() if isinstance(value, datetime) else value for value in row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _csv_stream(fields, rows, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue()
+    for chunk in _chunks(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+
+
+def _ndjson_stream(fields, rows, chunk_size):
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(
+            json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n'
+            for row in chunk
+        )
+
+
+async def _astream(stream):
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(stream, None)) is not None:
+            yield chunk
+    finally:
+        # Закрывает серверный курсор и при обрыве соединения клиентом
+        await sync_to_async(stream.close, thread_sensitive=True)()
+
+
+def export_response(queryset, fields, export_format, name, request=None):
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    rows = queryset.order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+    if export_format == 'ndjson':
+        content_type = 'application/x-ndjson'
+        stream = _ndjson_stream(fields, rows, chunk_size)
+    else:
+        export_format = 'csv'
+        content_type = 'text/csv; charset=utf-8'
+        stream = _csv_stream(fields, rows, chunk_size)
+
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        stream = _astream(stream)
+
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,204 @@
+"""
+Queued lead ingestion.
+
+In ``queued`` mode the widget endpoints only validate a submission and append
+it to a local SQLite spool. The ``drain_leads`` worker reads the spool in
+batches and writes them with ``bulk_create``, so a campaign spike turns into
+a few large inserts instead of a write storm of single-row transactions.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from projects.models import Project
+from channels.models import Channel
+from .models import Lead
+from .serializers import LeadSubmissionSerializer
+from .signals import leads_bulk_created
+
+
+logger = logging.getLogger(__name__)
+
+
+class LeadSpool:
+    """Append-only очередь заявок в SQLite (WAL), переживает рестарт процесса."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._ensure_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self):
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS lead_spool ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' submission_id TEXT NOT NULL,'
+            ' payload TEXT NOT NULL,'
+            ' queued_at REAL NOT NULL)'
+        )
+
+    def append(self, submission_id, payload):
+        self._connection().execute(
+            'INSERT INTO lead_spool (submission_id, payload, queued_at) VALUES (?, ?, ?)',
+            (str(submission_id), json.dumps(payload, default=str), time.time()),
+        )
+
+    def read_batch(self, limit):
+        rows = self._connection().execute(
+            'SELECT id, submission_id, payload FROM lead_spool ORDER BY id LIMIT ?', (limit,)
+        ).fetchall()
+        return [(row_id, submission_id, json.loads(payload)) for row_id, submission_id, payload in rows]
+
+    def ack(self, last_id):
+        self._connection().execute('DELETE FROM lead_spool WHERE id <= ?', (last_id,))
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM lead_spool').fetchone()[0]
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool():
+    global _spool
+    path = str(settings.LEAD_SPOOL_PATH)
+    if _spool is None or _spool.path != path:
+        with _spool_lock:
+            if _spool is None or _spool.path != path:
+                _spool = LeadSpool(path)
+    return _spool
+
+
+def is_queued_mode():
+    return settings.LEAD_INGEST_MODE == 'queued'
+
+
+def queue_lead(data):
+    """Валидирует заявку и кладет ее в очередь. Возвращает submission_id."""
+    serializer = LeadSubmissionSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    payload = dict(serializer.validated_data)
+    submission_id = payload.pop('submission_id', None) or uuid.uuid4()
+    get_spool().append(submission_id, payload)
+    return submission_id
+
+
+def _default_channels(project_ids):
+    """Дефолтный канал 'form' для каждого проекта (как get_or_create в синхронном пути)."""
+    channels = {}
+    for channel_id, project_id in (
+        Channel.objects
+        .filter(project_id__in=project_ids, type='form')
+        .order_by('-id')
+        .values_list('id', 'project_id')
+    ):
+        channels[project_id] = channel_id
+
+    for project_id in set(project_ids) - set(channels):
+        channels[project_id] = Channel.objects.create(
+            project_id=project_id,
+            type='form',
+            label='Форма обратной связи',
+            priority=1,
+            is_active=True,
+        ).id
+    return channels
+
+
+def build_leads(batch):
+    project_ids = {data['project_id'] for _, _, data in batch}
+    project_ids = set(Project.objects.filter(id__in=project_ids).values_list('id', flat=True))
+
+    channel_ids = {data['channel'] for _, _, data in batch if data.get('channel')}
+    known_channels = set(Channel.objects.filter(id__in=channel_ids).values_list('id', flat=True))
+    missing = {
+        data['project_id'] for _, _, data in batch
+        if data['project_id'] in project_ids and data.get('channel') not in known_channels
+    }
+    default_channels = _default_channels(missing) if missing else {}
+
+    leads = []
+    for _, submission_id, data in batch:
+        project_id = data['project_id']
+        if project_id not in project_ids:
+            logger.warning('Dropping queued lead %s: project %s does not exist', submission_id, project_id)
+            continue
+        channel_id = data.get('channel')
+        if channel_id not in known_channels:
+            channel_id = default_channels[project_id]
+        leads.append(Lead(
+            submission_id=uuid.UUID(submission_id),
+            project_id=project_id,
+            channel_id=channel_id,
+            contact=data.get('contact') or '',
+            message=data.get('message', ''),
+            utm_source=data.get('utm_source'),
+            utm_medium=data.get('utm_medium'),
+            utm_campaign=data.get('utm_campaign'),
+            page_url=data.get('page_url'),
+            client_id=data.get('client_id'),
+            device_type=data.get('device_type') or 'desktop',
+            language=data.get('language') or 'en',
+        ))
+    return leads
+
+
+def _insert(leads):
+    """
+    Вставляет лиды с первичными ключами (ignore_conflicts их не возвращает, а
+    webhooks нужен id). Возвращает вставленные: submission_id уникален, и лиды,
+    которые успел сохранить другой воркер, пропускаются.
+    """
+    try:
+        with transaction.atomic():
+            return Lead.objects.bulk_create(leads)
+    except IntegrityError:
+        created = []
+        for lead in leads:
+            try:
+                with transaction.atomic():
+                    Lead.objects.bulk_create([lead])
+            except IntegrityError:
+                continue
+            created.append(lead)
+        return created
+
+
+def drain_once(spool=None, batch_size=None):
+    """Переносит одну пачку из очереди в БД. Возвращает число прочитанных записей."""
+    spool = spool or get_spool()
+    batch = spool.read_batch(batch_size or settings.LEAD_INGEST_BATCH_SIZE)
+    if not batch:
+        return 0
+
+    leads = build_leads(batch)
+    # Пачка могла быть записана до падения воркера: пропускаем уже сохраненные
+    existing = set(
+        Lead.objects
+        .filter(submission_id__in=[lead.submission_id for lead in leads])
+        .values_list('submission_id', flat=True)
+    )
+    leads = [lead for lead in leads if lead.submission_id not in existing]
+
+    with transaction.atomic():
+        leads = _insert(leads)
+        if leads:
+            transaction.on_commit(lambda: leads_bulk_created.send(sender=Lead, leads=leads))
+    spool.ack(batch[-1][0])
+    return len(batch)
@@ -0,0 +1,76 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from projects.models import Project
+from channels.models import Channel
+from leads.models import Lead
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Генерирует набор лидов и замеряет скорость и пиковую память потоковой выгрузки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--insert-batch', type=int, default=10_000)
+        parser.add_argument('--keep', action='store_true', help='Не удалять сгенерированные данные')
+
+    def _seed(self, project, channel, rows, batch):
+        started = time.perf_counter()
+        for offset in range(0, rows, batch):
+            Lead.objects.bulk_create([
+                Lead(
+                    project=project,
+                    channel=channel,
+                    contact=f'lead-{i}@example.com',
+                    message='Benchmark lead with a short message',
+                    utm_source=('google', 'facebook', 'direct')[i % 3],
+                    utm_medium='cpc',
+                    utm_campaign=f'campaign-{i % 20}',
+                    page_url='https://example.com/landing',
+                    client_id=f'client-{i}',
+                    device_type=('desktop', 'mobile')[i % 2],
+                    language='en',
+                )
+                for i in range(offset, min(offset + batch, rows))
+            ], batch_size=batch)
+        return time.perf_counter() - started
+
+    def _measure(self, client, url):
+        tracemalloc.start()
+        started = time.perf_counter()
+        response = client.get(url)
+        size = 0
+        lines = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak, size, lines
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        project = Project.objects.create(name='bench-export')
+        channel = Channel.objects.create(project=project, type='form', label='Bench')
+        client = APIClient()
+        client.force_authenticate(User(email='bench@example.com'))
+
+        try:
+            seed_elapsed = self._seed(project, channel, rows, options['insert_batch'])
+            self.stdout.write(f'Seeded {rows} leads in {seed_elapsed:.1f}s')
+
+            for export_format in ('csv', 'ndjson'):
+                url = f'/api/leads/export/?format={export_format}&project={project.id}'
+                elapsed, peak, size, lines = self._measure(client, url)
+                self.stdout.write(
+                    f'{export_format:7s} {lines:>10d} lines  {size / 1e6:8.1f} MB  '
+                    f'{lines / elapsed:10.0f} rows/s  peak Python memory {peak / 1e6:6.1f} MB'
+                )
+        finally:
+            if not options['keep']:
+                project.delete()
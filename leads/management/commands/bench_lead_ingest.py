@@ -0,0 +1,69 @@
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from projects.models import Project
+from channels.models import Channel
+from leads.ingest import get_spool, drain_once
+from leads.models import Lead
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность синхронного и очередного приема заявок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=settings.LEAD_INGEST_BATCH_SIZE)
+
+    def _post_leads(self, client, project, count):
+        url = f'/api/widget/create_lead/{project.id}/'
+        host = settings.ALLOWED_HOSTS[0].lstrip('.').replace('*', 'localhost') or 'localhost'
+        failed = 0
+        started = time.perf_counter()
+        for i in range(count):
+            response = client.post(url, {
+                'contact': f'bench-{i}@example.com',
+                'message': 'benchmark',
+                'utm_source': 'bench',
+                'client_id': f'bench-client-{i}',
+            }, content_type='application/json', HTTP_HOST=host, secure=True)
+            if response.status_code >= 300:
+                failed += 1
+        if failed:
+            self.stderr.write(f'{failed} of {count} requests failed')
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        count = options['count']
+        project = Project.objects.create(name='bench-lead-ingest')
+        Channel.objects.create(project=project, type='form', label='Форма обратной связи', priority=1)
+        client = Client()
+
+        try:
+            with override_settings(LEAD_INGEST_MODE='sync'):
+                sync_elapsed = self._post_leads(client, project, count)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                with override_settings(LEAD_INGEST_MODE='queued', LEAD_SPOOL_PATH=Path(tmp) / 'spool.sqlite3'):
+                    spool = get_spool()
+                    queued_elapsed = self._post_leads(client, project, count)
+
+                started = time.perf_counter()
+                while drain_once(spool, options['batch_size']):
+                    pass
+                drain_elapsed = time.perf_counter() - started
+
+            written = Lead.objects.filter(project=project).count()
+        finally:
+            project.delete()
+
+        self.stdout.write(f'Leads per mode:       {count}')
+        self.stdout.write(f'sync requests:        {count / sync_elapsed:10.1f} req/s')
+        self.stdout.write(f'queued requests:      {count / queued_elapsed:10.1f} req/s')
+        self.stdout.write(f'drain (bulk_create):  {count / drain_elapsed:10.1f} leads/s '
+                          f'(batch {options["batch_size"]})')
+        self.stdout.write(f'rows written:         {written} (expected {count * 2})')
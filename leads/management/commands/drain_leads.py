@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from leads.ingest import drain_once, get_spool
+
+
+class Command(BaseCommand):
+    help = 'Переносит заявки из локальной очереди в БД пачками (bulk_create)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.LEAD_INGEST_BATCH_SIZE)
+        parser.add_argument('--flush-interval', type=float, default=settings.LEAD_INGEST_FLUSH_INTERVAL,
+                            help='Пауза (сек) перед следующей пачкой, если очередь неполная')
+        parser.add_argument('--once', action='store_true', help='Опустошить очередь и выйти')
+
+    def handle(self, *args, **options):
+        spool = get_spool()
+        batch_size = options['batch_size']
+        total = 0
+
+        while True:
+            drained = drain_once(spool, batch_size)
+            total += drained
+            if drained:
+                self.stdout.write(f'Drained {drained} leads ({total} total)')
+            if drained < batch_size:
+                if options['once']:
+                    break
+                # Неполная пачка: ждем, пока накопятся новые заявки
+                time.sleep(options['flush_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Done, {total} leads written'))
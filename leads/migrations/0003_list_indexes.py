@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hc_channels', '0002_channel_is_active'),
+        ('leads', '0002_lead_submission_id'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='callbackrequest',
+            index=models.Index(fields=['created_at', 'id'], name='callback_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='callbackrequest',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='callback_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='callbackrequest',
+            index=models.Index(fields=['project', 'processed', 'created_at'], name='callback_processed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='callbackrequest',
+            index=models.Index(fields=['project', 'utm_source', 'created_at'], name='callback_utm_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='callbackrequest',
+            index=models.Index(fields=['project', 'utm_medium', 'created_at'], name='callback_utm_medium_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='callbackrequest',
+            index=models.Index(fields=['project', 'utm_campaign', 'created_at'], name='callback_utm_campaign_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['created_at', 'id'], name='lead_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='lead_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['project', 'processed', 'created_at'], name='lead_project_processed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['channel', 'created_at'], name='lead_channel_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['project', 'utm_source', 'created_at'], name='lead_utm_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['project', 'utm_medium', 'created_at'], name='lead_utm_medium_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['project', 'utm_campaign', 'created_at'], name='lead_utm_campaign_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hc_channels', '0002_channel_is_active'),
+        ('leads', '0003_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='callbackrequest',
+            name='channel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='hc_channels.channel'),
+        ),
+        migrations.AddField(
+            model_name='callbackrequest',
+            name='device_type',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='callbackrequest',
+            name='language',
+            field=models.CharField(default='en', max_length=10),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hc_channels', '0002_channel_is_active'),
+        ('leads', '0004_callback_channel_device_language'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='callbackrequest',
+            name='dedup_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='dedup_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='callbackrequest',
+            constraint=models.UniqueConstraint(condition=models.Q(('dedup_key__isnull', False)), fields=('project', 'dedup_key'), name='callback_dedup_key_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='lead',
+            constraint=models.UniqueConstraint(condition=models.Q(('dedup_key__isnull', False)), fields=('project', 'dedup_key'), name='lead_dedup_key_uniq'),
+        ),
+    ]
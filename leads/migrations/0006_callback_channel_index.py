@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hc_channels', '0002_channel_is_active'),
+        ('leads', '0005_dedup_key'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='callbackrequest',
+            index=models.Index(fields=['channel', 'created_at'], name='callback_channel_created_idx'),
+        ),
+    ]
@@ -16,11 +16,32 @@ class Lead(models.Model):
     device_type = models.CharField(max_length=20, blank=True, null=True)
     language = models.CharField(max_length=10, default='en')
     processed = models.BooleanField(default=False)
+    # Client-generated id of a queued submission, makes spool replays idempotent
+    submission_id = models.UUIDField(unique=True, blank=True, null=True, editable=False)
+    # Content hash of a widget submission within LEAD_DEDUP_WINDOW (leads/dedup.py)
+    dedup_key = models.CharField(max_length=64, blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset-пагинация и фильтры админки (см. LeadViewSet)
+            models.Index(fields=['created_at', 'id'], name='lead_created_idx'),
+            models.Index(fields=['project', 'created_at', 'id'], name='lead_project_created_idx'),
+            models.Index(fields=['project', 'processed', 'created_at'], name='lead_project_processed_idx'),
+            models.Index(fields=['channel', 'created_at'], name='lead_channel_created_idx'),
+            models.Index(fields=['project', 'utm_source', 'created_at'], name='lead_utm_source_idx'),
+            models.Index(fields=['project', 'utm_medium', 'created_at'], name='lead_utm_medium_idx'),
+            models.Index(fields=['project', 'utm_campaign', 'created_at'], name='lead_utm_campaign_idx'),
+        ]
+        constraints = [
+            # Две одновременные одинаковые заявки: вторая вставка падает, view отдает первую
+            models.UniqueConstraint(
+                fields=['project', 'dedup_key'], condition=models.Q(dedup_key__isnull=False),
+                name='lead_dedup_key_uniq',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Lead {self.contact}"
@@ -28,6 +49,7 @@ class Lead(models.Model):
 
 class CallbackRequest(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='callbacks')
+    channel = models.ForeignKey(Channel, on_delete=models.SET_NULL, blank=True, null=True)
     phone = models.CharField(max_length=20)
     preferred_time = models.DateTimeField(blank=True, null=True)
     message = models.TextField(blank=True, null=True)
@@ -36,12 +58,31 @@ class CallbackRequest(models.Model):
     utm_medium = models.CharField(max_length=100, blank=True, null=True)
     utm_campaign = models.CharField(max_length=100, blank=True, null=True)
     client_id = models.CharField(max_length=100, blank=True, null=True)
+    device_type = models.CharField(max_length=20, blank=True, null=True)
+    language = models.CharField(max_length=10, default='en')
     processed = models.BooleanField(default=False)
+    # Content hash of a widget submission within LEAD_DEDUP_WINDOW (leads/dedup.py)
+    dedup_key = models.CharField(max_length=64, blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='callback_created_idx'),
+            models.Index(fields=['project', 'created_at', 'id'], name='callback_project_created_idx'),
+            models.Index(fields=['project', 'processed', 'created_at'], name='callback_processed_idx'),
+            models.Index(fields=['channel', 'created_at'], name='callback_channel_created_idx'),
+            models.Index(fields=['project', 'utm_source', 'created_at'], name='callback_utm_source_idx'),
+            models.Index(fields=['project', 'utm_medium', 'created_at'], name='callback_utm_medium_idx'),
+            models.Index(fields=['project', 'utm_campaign', 'created_at'], name='callback_utm_campaign_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['project', 'dedup_key'], condition=models.Q(dedup_key__isnull=False),
+                name='callback_dedup_key_uniq',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"Callback {self.phone}"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.serialization import compile_model_serializer
 from .models import Lead, CallbackRequest
 
 
@@ -12,3 +13,24 @@ class CallbackRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = CallbackRequest
         fields = '__all__'
+
+
+# Тот же вывод, что у LeadSerializer / CallbackRequestSerializer, для горячих путей виджета
+serialize_lead = compile_model_serializer(Lead)
+serialize_callback = compile_model_serializer(CallbackRequest)
+
+
+class LeadSubmissionSerializer(serializers.Serializer):
+    """Проверка заявки из виджета перед постановкой в очередь (без обращений к БД)."""
+    submission_id = serializers.UUIDField(required=False)
+    project_id = serializers.IntegerField()
+    channel = serializers.IntegerField(required=False, allow_null=True)
+    contact = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    message = serializers.CharField(required=False, allow_blank=True, allow_null=True, default='')
+    utm_source = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    utm_medium = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    utm_campaign = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    page_url = serializers.URLField(required=False, allow_blank=True, allow_null=True)
+    client_id = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    device_type = serializers.CharField(max_length=20, required=False, default='desktop')
+    language = serializers.CharField(max_length=10, required=False, default='en')
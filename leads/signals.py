@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# bulk_create не отправляет post_save, поэтому пакетная запись шлет свой сигнал.
+# Аргументы: leads — список созданных Lead.
+leads_bulk_created = Signal()
@@ -0,0 +1,48 @@
+import csv
+import io
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from channels.models import Channel
+from projects.models import Project
+from users.models import User
+from .export import _csv_stream
+from .models import CallbackRequest
+
+
+class CSVExportTests(SimpleTestCase):
+    def export(self, rows):
+        return list(csv.reader(io.StringIO(''.join(_csv_stream(('contact', 'message', 'id'), iter(rows), 2)))))
+
+    def test_formula_cells_are_neutralised(self):
+        rows = self.export([
+            ('=HYPERLINK("http://evil","x")', '=cmd|" /C calc"!A0', 1),
+            ('+79991234567', '-2+3', 2),
+            ('@SUM(A1)', '\tTab', 3),
+            ('\r=1', 'plain', 4),
+        ])
+        self.assertEqual(rows[0], ['contact', 'message', 'id'])
+        self.assertEqual(rows[1], ['\'=HYPERLINK("http://evil","x")', '\'=cmd|" /C calc"!A0', '1'])
+        self.assertEqual(rows[2], ["'+79991234567", "'-2+3", '2'])
+        self.assertEqual(rows[3], ["'@SUM(A1)", "'\tTab", '3'])
+        self.assertEqual(rows[4][0], "'\r=1")
+
+    def test_other_values_are_unchanged(self):
+        rows = self.export([('user@example.com', 'a = b', -5), ('', None, 0)])
+        self.assertEqual(rows[1], ['user@example.com', 'a = b', '-5'])
+        self.assertEqual(rows[2], ['', '', '0'])
+
+
+class CallbackFilterTests(TestCase):
+    def test_filter_by_channel(self):
+        project = Project.objects.create(name='Callbacks')
+        call, form = (Channel.objects.create(project=project, type=kind, label=kind) for kind in ('call', 'form'))
+        expected = CallbackRequest.objects.create(project=project, channel=call, phone='+79990000001')
+        CallbackRequest.objects.create(project=project, channel=form, phone='+79990000002')
+        CallbackRequest.objects.create(project=project, phone='+79990000003')
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(User.objects.create(email='operator@example.com'))
+
+        rows = client.get(f'/api/callbacks/?channel={call.id}', secure=True).json()['results']
+        self.assertEqual([row['id'] for row in rows], [expected.id])
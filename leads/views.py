@@ -4,23 +4,67 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.shortcuts import get_object_or_404
 from .models import Lead, CallbackRequest
-from .serializers import LeadSerializer, CallbackRequestSerializer
+from .serializers import LeadSerializer, CallbackRequestSerializer, serialize_lead, serialize_callback
+from .ingest import is_queued_mode, queue_lead
+from .dedup import dedup_keys, find_duplicate, create_once
 from projects.models import Project
 from channels.models import Channel
+from core.filters import QueryParamFilterMixin, DATE_RANGE_FILTERS, apply_filters, parse_bool
+from core.idempotency import idempotent
+from core.throttling import WidgetRateThrottle
+from core.pagination import CreatedAtCursorPagination
+from core.renderers import CSVRenderer, NDJSONRenderer
+from .export import export_response, LEAD_EXPORT_FIELDS, CALLBACK_EXPORT_FIELDS
 
 
-class LeadViewSet(viewsets.ModelViewSet):
+UTM_FILTERS = {
+    'utm_source': ('utm_source', str),
+    'utm_medium': ('utm_medium', str),
+    'utm_campaign': ('utm_campaign', str),
+}
+
+
+class LeadViewSet(QueryParamFilterMixin, viewsets.ModelViewSet):
     queryset = Lead.objects.all()
     serializer_class = LeadSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_fields = {
+        'project': ('project_id', int),
+        'channel': ('channel_id', int),
+        'processed': ('processed', parse_bool),
+        **UTM_FILTERS,
+        **DATE_RANGE_FILTERS,
+    }
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Потоковая выгрузка лидов (?format=csv|ndjson) с теми же фильтрами, что и список"""
+        queryset = apply_filters(Lead.objects.all(), request.query_params, self.filter_fields)
+        return export_response(
+            queryset, LEAD_EXPORT_FIELDS, request.accepted_renderer.format, 'leads', request=request,
+        )
 
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny], throttle_classes=[WidgetRateThrottle])
+    @idempotent('create_lead')
     def create_lead(self, request):
         """Создание лида через виджет"""
         project_id = request.data.get('project_id')
         if not project_id:
             return Response({'error': 'Project ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if is_queued_mode():
+            submission_id = queue_lead(request.data)
+            return Response({'id': str(submission_id), 'status': 'queued'}, status=status.HTTP_202_ACCEPTED)
         
         try:
+            keys = dedup_keys(
+                project_id, request.data.get('client_id'), request.data.get('contact', ''),
+                request.data.get('message', ''), request.data.get('channel'),
+            )
+            duplicate = find_duplicate(Lead, keys)
+            if duplicate is not None:
+                return Response(serialize_lead(duplicate), status=status.HTTP_200_OK)
+
             project = get_object_or_404(Project, id=project_id)
             channel_id = request.data.get('channel')
             if channel_id:
@@ -37,7 +81,8 @@ class LeadViewSet(viewsets.ModelViewSet):
                     }
                 )
             
-            lead = Lead.objects.create(
+            lead, created = create_once(
+                Lead, keys,
                 project=project,
                 channel=channel,
                 contact=request.data.get('contact', ''),
@@ -51,18 +96,36 @@ class LeadViewSet(viewsets.ModelViewSet):
                 language=request.data.get('language', 'en')
             )
             
-            serializer = LeadSerializer(lead)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(
+                serialize_lead(lead), status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+            )
             
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CallbackRequestViewSet(viewsets.ModelViewSet):
+class CallbackRequestViewSet(QueryParamFilterMixin, viewsets.ModelViewSet):
     queryset = CallbackRequest.objects.all()
     serializer_class = CallbackRequestSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_fields = {
+        'project': ('project_id', int),
+        'channel': ('channel_id', int),
+        'processed': ('processed', parse_bool),
+        **UTM_FILTERS,
+        **DATE_RANGE_FILTERS,
+    }
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """Потоковая выгрузка заявок на звонок (?format=csv|ndjson)"""
+        queryset = apply_filters(CallbackRequest.objects.all(), request.query_params, self.filter_fields)
+        return export_response(
+            queryset, CALLBACK_EXPORT_FIELDS, request.accepted_renderer.format, 'callbacks', request=request,
+        )
 
-    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny], throttle_classes=[WidgetRateThrottle])
+    @idempotent('create_callback')
     def create_callback(self, request):
         """Создание заявки на звонок через виджет"""
         project_id = request.data.get('project_id')
@@ -70,6 +133,15 @@ class CallbackRequestViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Project ID is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
+            phone = request.data.get('phone') or request.data.get('contact', '')
+            keys = dedup_keys(
+                project_id, request.data.get('client_id'), phone,
+                request.data.get('message', ''), request.data.get('channel'),
+            )
+            duplicate = find_duplicate(CallbackRequest, keys)
+            if duplicate is not None:
+                return Response(serialize_callback(duplicate), status=status.HTTP_200_OK)
+
             project = get_object_or_404(Project, id=project_id)
             channel_id = request.data.get('channel')
             if channel_id:
@@ -86,10 +158,11 @@ class CallbackRequestViewSet(viewsets.ModelViewSet):
                     }
                 )
             
-            callback = CallbackRequest.objects.create(
+            callback, created = create_once(
+                CallbackRequest, keys,
                 project=project,
                 channel=channel,
-                contact=request.data.get('contact', ''),
+                phone=phone,
                 message=request.data.get('message', ''),
                 preferred_time=request.data.get('preferred_time'),
                 page_url=request.data.get('page_url'),
@@ -98,8 +171,9 @@ class CallbackRequestViewSet(viewsets.ModelViewSet):
                 language=request.data.get('language', 'en')
             )
             
-            serializer = CallbackRequestSerializer(callback)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(
+                serialize_callback(callback), status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+            )
             
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
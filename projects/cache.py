@@ -0,0 +1,4 @@
+from core.cache import CacheNamespace
+
+# Данные проекта (настройки, часовой пояс); scope — id проекта
+project_cache = CacheNamespace('projects')
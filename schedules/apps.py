@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class SchedulesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'schedules'
+
+    def ready(self):
+        from .cache import schedule_cache
+        from .models import Schedule
+        schedule_cache.connect(Schedule, lambda schedule: schedule.project_id)
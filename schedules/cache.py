@@ -0,0 +1,4 @@
+from core.cache import CacheNamespace
+
+# Расписание проекта; scope — id проекта
+schedule_cache = CacheNamespace('schedules')
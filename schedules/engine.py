@@ -0,0 +1,153 @@
+"""
+Compiled business-hours engine.
+
+A project's ``Schedule`` rows are compiled once into sorted weekly open
+intervals (seconds since Monday 00:00 in the project timezone). Online
+status is then a bisect over those intervals, and the answer is kept until
+the next open/close transition, so the hot path does no queries and almost
+no work.
+"""
+import threading
+from bisect import bisect_right
+from datetime import timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+
+
+DAY_INDEX = {
+    'monday': 0,
+    'tuesday': 1,
+    'wednesday': 2,
+    'thursday': 3,
+    'friday': 4,
+    'saturday': 5,
+    'sunday': 6,
+}
+
+DAY_SECONDS = 24 * 60 * 60
+WEEK_SECONDS = 7 * DAY_SECONDS
+
+# Used when a project has no Schedule rows: Mon-Fri 09:00-18:00
+DEFAULT_INTERVALS = tuple(
+    (day * DAY_SECONDS + 9 * 3600, day * DAY_SECONDS + 18 * 3600) for day in range(5)
+)
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def compile_intervals(rows):
+    """
+    Превращает строки расписания (day, start_time, end_time, is_working_day)
+    в отсортированные непересекающиеся недельные интервалы [start, end).
+    Интервал, закрывающийся в конце недели, продолжается первым интервалом
+    понедельника, если тот открыт с 00:00: его end больше WEEK_SECONDS.
+    """
+    rows = list(rows)
+    if not rows:
+        return DEFAULT_INTERVALS
+
+    raw = []
+    for day, start_time, end_time, is_working_day in rows:
+        if not is_working_day or day not in DAY_INDEX:
+            continue
+        start = DAY_INDEX[day] * DAY_SECONDS + _seconds(start_time)
+        end = DAY_INDEX[day] * DAY_SECONDS + _seconds(end_time)
+        if end <= start:
+            # Смена через полночь
+            end += DAY_SECONDS
+        if end > WEEK_SECONDS:
+            # Воскресная ночная смена переходит на понедельник
+            raw.append((start, WEEK_SECONDS))
+            raw.append((0, end - WEEK_SECONDS))
+        else:
+            raw.append((start, end))
+
+    raw.sort()
+    merged = []
+    for start, end in raw:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    if merged and merged[0][0] == 0 and merged[-1][1] == WEEK_SECONDS:
+        # Воскресенье до 24:00 и понедельник с 00:00 — одна смена, без перехода в полночь
+        merged[-1] = (merged[-1][0], WEEK_SECONDS + merged[0][1])
+    return tuple(merged)
+
+
+def resolve_timezone(name):
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+
+class CompiledSchedule:
+    __slots__ = ('version', 'tz', 'starts', 'ends', '_status')
+
+    def __init__(self, timezone_name, intervals, version=None):
+        self.version = version
+        self.tz = resolve_timezone(timezone_name)
+        self.starts = [start for start, _ in intervals]
+        self.ends = [end for _, end in intervals]
+        self._status = None
+
+    def status(self, now=None):
+        """
+        Возвращает (is_online, next_available, valid_until); valid_until в UTC.
+        Результат кешируется до ближайшего открытия/закрытия.
+        """
+        now = now or timezone.now()
+        cached = self._status
+        if cached is not None and cached[0] <= now < cached[3]:
+            return cached[1], cached[2], cached[3]
+
+        local = now.astimezone(self.tz)
+        second = (
+            local.weekday() * DAY_SECONDS
+            + local.hour * 3600 + local.minute * 60 + local.second
+        )
+
+        if not self.starts:
+            result = (now, False, None, now + timedelta(days=365))
+            self._status = result
+            return result[1], result[2], result[3]
+
+        i = bisect_right(self.starts, second) - 1
+        is_online = i >= 0 and second < self.ends[i]
+        if is_online:
+            transition = self.ends[i]
+        elif i + 1 < len(self.starts):
+            transition = self.starts[i + 1]
+        else:
+            transition = self.starts[0] + WEEK_SECONDS
+
+        # Переход задан настенным временем; момент перехода считается в UTC, так что
+        # смена смещения (DST) и повторяющийся час при переводе назад учтены
+        wall = local.replace(tzinfo=None, microsecond=0) + timedelta(seconds=transition - second)
+        valid_until = wall.replace(tzinfo=self.tz).astimezone(dt_timezone.utc)
+        if valid_until <= now:
+            # Сейчас второй проход повторяющегося часа: переход тоже во втором
+            valid_until = wall.replace(tzinfo=self.tz, fold=1).astimezone(dt_timezone.utc)
+        next_available = None if is_online else wall.strftime('%H:%M')
+
+        result = (now, is_online, next_available, valid_until)
+        self._status = result
+        return is_online, next_available, valid_until
+
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def get_compiled_schedule(project_id, version, timezone_name, intervals):
+    """Скомпилированное расписание проекта из кеша процесса (по версии конфигурации)."""
+    compiled = _compiled.get(project_id)
+    if compiled is None or compiled.version != version:
+        compiled = CompiledSchedule(timezone_name, intervals, version=version)
+        with _lock:
+            _compiled[project_id] = compiled
+    return compiled
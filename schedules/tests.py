@@ -0,0 +1,60 @@
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.test import SimpleTestCase
+
+from .engine import DAY_SECONDS, DEFAULT_INTERVALS, WEEK_SECONDS, CompiledSchedule, compile_intervals
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class DaylightSavingTests(SimpleTestCase):
+    def test_spring_forward_before_next_opening(self):
+        # Берлин, 29.03.2026: 02:00 CET -> 03:00 CEST, смещение +1 -> +2
+        schedule = CompiledSchedule('Europe/Berlin', DEFAULT_INTERVALS)
+        is_online, next_available, valid_until = schedule.status(utc(2026, 3, 28, 12))
+        self.assertFalse(is_online)
+        self.assertEqual(next_available, '09:00')
+        self.assertEqual(valid_until, utc(2026, 3, 30, 7))
+
+    def test_fall_back_before_next_opening(self):
+        # Берлин, 25.10.2026: 03:00 CEST -> 02:00 CET, смещение +2 -> +1
+        schedule = CompiledSchedule('Europe/Berlin', DEFAULT_INTERVALS)
+        is_online, next_available, valid_until = schedule.status(utc(2026, 10, 24, 12))
+        self.assertEqual((is_online, next_available), (False, '09:00'))
+        self.assertEqual(valid_until, utc(2026, 10, 26, 8))
+
+    def test_closing_inside_repeated_hour(self):
+        # Воскресенье 01:00-02:30; 02:10 второго прохода (CET) закрывается в 02:30 CET
+        schedule = CompiledSchedule('Europe/Berlin', ((6 * DAY_SECONDS + 3600, 6 * DAY_SECONDS + 9000),))
+        is_online, next_available, valid_until = schedule.status(utc(2026, 10, 25, 1, 10))
+        self.assertEqual((is_online, next_available), (True, None))
+        self.assertEqual(valid_until, utc(2026, 10, 25, 1, 30))
+
+    def test_status_is_cached_until_transition(self):
+        schedule = CompiledSchedule('Europe/Berlin', DEFAULT_INTERVALS)
+        first = schedule.status(utc(2026, 3, 28, 12))
+        self.assertEqual(schedule.status(utc(2026, 3, 30, 6, 59)), first)
+        self.assertEqual(schedule.status(utc(2026, 3, 30, 7))[:2], (True, None))
+
+
+class WeekWrapTests(SimpleTestCase):
+    def test_sunday_shift_continues_into_monday(self):
+        intervals = compile_intervals([
+            ('sunday', time(18), time(0), True),
+            ('monday', time(0), time(9), True),
+        ])
+        self.assertEqual(intervals, ((0, 9 * 3600), (6 * DAY_SECONDS + 18 * 3600, WEEK_SECONDS + 9 * 3600)))
+        schedule = CompiledSchedule('UTC', intervals)
+        # Воскресенье 20:00 — открыто до понедельника 09:00, перехода в полночь нет
+        self.assertEqual(schedule.status(utc(2026, 10, 18, 20)), (True, None, utc(2026, 10, 19, 9)))
+        self.assertEqual(schedule.status(utc(2026, 10, 19, 3)), (True, None, utc(2026, 10, 19, 9)))
+        self.assertEqual(schedule.status(utc(2026, 10, 19, 9)), (False, '18:00', utc(2026, 10, 25, 18)))
+
+    def test_whole_week(self):
+        intervals = compile_intervals([(day, time(0), time(0), True) for day in (
+            'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday',
+        )])
+        self.assertEqual(intervals, ((0, 2 * WEEK_SECONDS),))
+        self.assertTrue(CompiledSchedule('UTC', intervals).status(utc(2026, 10, 18, 23, 59))[0])
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        from .authentication import evict_user
+        from .models import User
+        from .tokens import blacklisted
+        post_save.connect(evict_user, sender=User, dispatch_uid='users.evict_cached_user')
+        post_delete.connect(evict_user, sender=User, dispatch_uid='users.evict_cached_user')
+        post_save.connect(blacklisted, sender=BlacklistedToken, dispatch_uid='users.blacklist_filter')
@@ -0,0 +1,138 @@
+"""
+JWT authentication without a ``User`` query per request.
+
+``JWTAuthentication`` loads ``request.user`` by primary key on every
+request. ``CachedJWTAuthentication`` keeps the user's row in a small
+per-process LRU for ``AUTH_USER_CACHE_TTL`` seconds and builds a fresh
+``User`` instance from it, so views can modify ``request.user`` without
+touching the cache. Each entry remembers the user's version in the shared
+``users`` cache namespace; ``User`` save/delete bumps it after commit, so
+every worker drops its copy on the next request (one cache read instead
+of a query).
+
+``request.user`` may still be a few milliseconds old: views that write the
+current user re-read the row under a lock or save only the changed fields.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.metrics import registry, register_counter
+from .cache import user_versions
+
+
+register_counter('habio_auth_user_cache_total', 'JWT user lookups by result')
+
+_HIT = (('result', 'hit'),)
+_MISS = (('result', 'miss'),)
+
+
+class UserCache:
+    """LRU строк пользователей с TTL: {user_id: (истекает, версия, значения полей)}."""
+
+    def __init__(self, model, size=None, ttl=None):
+        self.model = model
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fields = [field.attname for field in model._meta.concrete_fields]
+
+    def _limits(self):
+        size = settings.AUTH_USER_CACHE_SIZE if self.size is None else self.size
+        ttl = settings.AUTH_USER_CACHE_TTL if self.ttl is None else self.ttl
+        return size, ttl
+
+    def get(self, user_id, version):
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now or entry[1] != version:
+                return None
+            self._entries.move_to_end(key)
+        # Каждому запросу — свой экземпляр: изменения request.user не попадают в кеш
+        return self.model.from_db('default', self._fields, entry[2])
+
+    def put(self, user, version):
+        size, ttl = self._limits()
+        if size <= 0 or ttl <= 0:
+            return
+        values = tuple(getattr(user, field) for field in self._fields)
+        key = str(user.pk)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, version, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_user_cache = None
+
+
+def get_user_cache():
+    global _user_cache
+    if _user_cache is None:
+        from .models import User
+        _user_cache = UserCache(User)
+    return _user_cache
+
+
+def evict_user(sender, instance, **kwargs):
+    """
+    Сигнал post_save/post_delete User: после коммита (чтобы запись не заполнили
+    старыми данными) поднимает версию для всех процессов и убирает запись здесь.
+    """
+    user_id = instance.pk
+
+    def evict():
+        user_versions.bump(user_id)
+        get_user_cache().evict(user_id)
+
+    transaction.on_commit(evict)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        cache = get_user_cache()
+        # Версия читается до запроса к БД: изменение между ними не даст закешировать старую строку
+        version = user_versions.version(user_id)
+        user = cache.get(user_id, version)
+        if user is None:
+            registry.inc('habio_auth_user_cache_total', _MISS)
+            # Запрос и проверки — как у JWTAuthentication; в кеш попадают только прошедшие их
+            user = super().get_user(validated_token)
+            cache.put(user, version)
+            return user
+
+        registry.inc('habio_auth_user_cache_total', _HIT)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
@@ -0,0 +1,4 @@
+from core.cache import CacheNamespace
+
+# Версии строк пользователей для кеша аутентификации (users.authentication); scope — id пользователя
+user_versions = CacheNamespace('users')
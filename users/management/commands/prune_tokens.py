@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from users.tokens import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Удаляет истекшие refresh-токены из token_blacklist (outstanding и blacklisted) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Окно по id на одну транзакцию')
+        parser.add_argument('--pause', type=float, default=0.0, help='Пауза (сек) между пачками')
+        parser.add_argument('--full', action='store_true',
+                            help='Пройти всю таблицу, а не остановиться на первом окне без истекших')
+
+    def handle(self, *args, **options):
+        def progress(window_start, outstanding, blacklisted):
+            self.stdout.write(f'id {window_start}+: {outstanding} outstanding, {blacklisted} blacklisted deleted')
+
+        outstanding, blacklisted = prune_expired_tokens(
+            options['chunk_size'], full=options['full'], pause=options['pause'], on_chunk=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Done, {outstanding} outstanding and {blacklisted} blacklisted tokens deleted'
+        ))
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Индекс по blacklisted_at для инкрементальной синхронизации фильтра черного
+    списка (users/tokens.py). Модель принадлежит token_blacklist, поэтому — SQL.
+    """
+
+    dependencies = [
+        ('users', '0004_add_plan'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS token_blacklist_blacklisted_at_idx '
+            'ON token_blacklist_blacklistedtoken (blacklisted_at)',
+            'DROP INDEX IF EXISTS token_blacklist_blacklisted_at_idx',
+        ),
+    ]
@@ -0,0 +1,51 @@
+import uuid
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .tokens import BlacklistFilter, BloomFilter
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(1000, 0.01)
+        added = [uuid.uuid4().hex for _ in range(1000)]
+        for value in added:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in added))
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_count_ignores_repeats(self):
+        bloom = BloomFilter(100, 0.01)
+        bloom.add('jti')
+        bloom.add('jti')
+        self.assertEqual(bloom.count, 1)
+
+
+@override_settings(TOKEN_BLACKLIST_FILTER_SYNC_INTERVAL=0, TOKEN_BLACKLIST_FILTER_SYNC_MARGIN=30)
+class BlacklistFilterTests(TestCase):
+    def blacklist(self, blacklisted_at=None):
+        """Строка другого воркера: post_save этого процесса ее в фильтр не добавляет."""
+        now = timezone.now()
+        token = OutstandingToken.objects.create(
+            jti=uuid.uuid4().hex, token='token', created_at=now, expires_at=now + timedelta(days=1),
+        )
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token)])
+        if blacklisted_at is not None:
+            BlacklistedToken.objects.filter(token=token).update(blacklisted_at=blacklisted_at)
+        return token.jti
+
+    def test_rows_from_other_workers_are_synced(self):
+        blacklist = BlacklistFilter()
+        known = self.blacklist()
+        self.assertTrue(blacklist.might_contain(known))
+        self.assertFalse(blacklist.might_contain(uuid.uuid4().hex))
+
+        fresh = self.blacklist()
+        # Зафиксирована позже, но с меткой времени до прошлой синхронизации
+        late = self.blacklist(blacklisted_at=timezone.now() - timedelta(seconds=10))
+        self.assertTrue(blacklist.might_contain(fresh))
+        self.assertTrue(blacklist.might_contain(late))
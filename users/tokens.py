@@ -0,0 +1,188 @@
+"""
+Refresh tokens with an in-memory pre-check of the blacklist.
+
+With ``ROTATE_REFRESH_TOKENS`` and ``BLACKLIST_AFTER_ROTATION`` every
+refresh checks ``token_blacklist`` for the presented token, and almost
+always finds nothing. ``BlacklistFilter`` is a per-process Bloom filter
+over the JTIs of blacklisted, not yet expired tokens: "not in the filter"
+means "not blacklisted" and skips the query; a hit (real or false
+positive, ~``TOKEN_BLACKLIST_FILTER_ERROR_RATE``) falls through to the
+usual database check.
+
+Blacklisting in this process is added to the filter immediately. Rows
+written by other workers are picked up by an incremental sync at most
+``TOKEN_BLACKLIST_FILTER_SYNC_INTERVAL`` seconds apart (with 0 every check
+syncs). It re-reads rows by ``blacklisted_at`` from the previous sync minus
+``TOKEN_BLACKLIST_FILTER_SYNC_MARGIN`` seconds, so rows that commit late
+or out of id order, or come from a worker with a skewed clock, are not
+missed. The filter is rebuilt from the
+live rows every ``TOKEN_BLACKLIST_FILTER_REBUILD_INTERVAL`` seconds, or
+when it outgrows its capacity, so expired and pruned tokens drop out.
+
+``prune_expired_tokens`` removes expired outstanding tokens (and their
+blacklist rows) in primary-key windows, so the tables stop growing.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        # Двойное хеширование: k позиций из двух 64-битных хешей
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        """Добавляет значение; count растет только если значения (вероятно) еще не было."""
+        bits, new = self.bits, False
+        for position in self._positions(value):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        self.count += new
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._bloom = None
+        self._synced_from = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+
+    def _live_jtis(self):
+        return BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).values_list('token__jti', flat=True)
+
+    def rebuild(self):
+        """Строит фильтр заново по живым (не истекшим) токенам черного списка."""
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).count()
+        bloom = BloomFilter(
+            max(settings.TOKEN_BLACKLIST_FILTER_CAPACITY, live * 2), settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE,
+        )
+        started = timezone.now()
+        for jti in self._live_jtis().iterator(chunk_size=10000):
+            bloom.add(jti)
+        now = time.monotonic()
+        with self._lock:
+            self._bloom, self._synced_from = bloom, started
+            self._synced_at = self._built_at = now
+
+    def sync(self):
+        """Добавляет в фильтр токены, занесенные в черный список после прошлой синхронизации."""
+        started = timezone.now()
+        since = self._synced_from - timedelta(seconds=settings.TOKEN_BLACKLIST_FILTER_SYNC_MARGIN)
+        jtis = list(self._live_jtis().filter(blacklisted_at__gte=since))
+        with self._lock:
+            for jti in jtis:
+                self._bloom.add(jti)
+            self._synced_from = max(self._synced_from, started)
+            self._synced_at = time.monotonic()
+
+    def add(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def _rebuild_due(self, now):
+        bloom = self._bloom
+        return (
+            bloom is None
+            or now - self._built_at >= settings.TOKEN_BLACKLIST_FILTER_REBUILD_INTERVAL
+            or bloom.count > bloom.capacity
+        )
+
+    def might_contain(self, jti):
+        now = time.monotonic()
+        rebuilt = False
+        if self._rebuild_due(now):
+            # Пока один поток перестраивает фильтр, остальные работают со старым;
+            # без фильтра (первый запрос процесса) — ждут
+            if self._rebuild_lock.acquire(blocking=self._bloom is None):
+                try:
+                    if self._rebuild_due(now):
+                        self.rebuild()
+                        rebuilt = True
+                finally:
+                    self._rebuild_lock.release()
+        if not rebuilt and now - self._synced_at >= settings.TOKEN_BLACKLIST_FILTER_SYNC_INTERVAL:
+            self.sync()
+        return jti in self._bloom
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def blacklisted(sender, instance, created, **kwargs):
+    """post_save BlacklistedToken: токен сразу попадает в фильтр этого процесса."""
+    if created:
+        blacklist_filter.add(instance.token.jti)
+
+
+class RefreshToken(tokens.RefreshToken):
+    def check_blacklist(self):
+        if not settings.TOKEN_BLACKLIST_FILTER_ENABLED:
+            return super().check_blacklist()
+        # Отрицательный ответ фильтра точен — запрос нужен только при совпадении
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+def prune_expired_tokens(chunk_size=10000, full=False, pause=0.0, on_chunk=None):
+    """
+    Удаляет истекшие OutstandingToken и их BlacklistedToken окнами по id
+    (индекса по expires_at нет, а диапазон первичного ключа дешев). Срок жизни
+    refresh-токена постоянный, поэтому без full обход останавливается на первом
+    окне, где истекших нет. Возвращает (outstanding, blacklisted) удалено.
+    """
+    now = timezone.now()
+    bounds = OutstandingToken.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return 0, 0
+
+    outstanding = blacklisted_total = 0
+    start = bounds['low']
+    while start <= bounds['high']:
+        window = OutstandingToken.objects.filter(id__gte=start, id__lt=start + chunk_size)
+        ids = list(window.filter(expires_at__lte=now).values_list('id', flat=True))
+        if ids:
+            with transaction.atomic():
+                blacklisted_total += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                outstanding += OutstandingToken.objects.filter(id__in=ids).only('id').delete()[0]
+            if on_chunk:
+                on_chunk(start, outstanding, blacklisted_total)
+            if pause:
+                time.sleep(pause)
+        elif not full and window.exists():
+            break
+        start += chunk_size
+    return outstanding, blacklisted_total
@@ -1,13 +1,15 @@
 from rest_framework import viewsets, generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
 from django.contrib.auth.hashers import make_password, check_password
 from drf_spectacular.utils import extend_schema
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.contrib.auth import authenticate
+from django.db import transaction
 
 from .models import User
+from .tokens import RefreshToken
 from .serializers import (
     UserSerializer, LoginSerializer, RegisterSerializer, 
     ProfileUpdateSerializer, LogoutSerializer, MeSerializer, PlanUpdateSerializer
@@ -20,6 +22,15 @@ class IsAdmin(permissions.BasePermission):
         return bool(request.user and request.user.is_authenticated and (request.user.role == 'admin' or request.user.is_superuser))
 
 
+def _locked_user(request):
+    """
+    Строка текущего пользователя из БД под блокировкой (внутри transaction.atomic):
+    request.user может быть из кеша аутентификации, и полное сохранение такого
+    объекта затерло бы более новые пароль, роль или тариф.
+    """
+    return User.objects.select_for_update().get(pk=request.user.pk)
+
+
 # ===== User CRUD =====
 class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdmin]
@@ -102,9 +113,10 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['put', 'patch'], permission_classes=[permissions.IsAuthenticated])
     def profile(self, request):
         """Обновление профиля текущего пользователя"""
-        serializer = ProfileUpdateSerializer(request.user, data=request.data, partial=True)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer = ProfileUpdateSerializer(_locked_user(request), data=request.data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['delete'], permission_classes=[permissions.IsAuthenticated])
@@ -112,7 +124,7 @@ class UserViewSet(viewsets.ModelViewSet):
         """Удаление профиля текущего пользователя"""
         user = request.user
         user.is_active = False
-        user.save()
+        user.save(update_fields=['is_active'])
         return Response({"detail": "Profile deleted successfully"}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['put', 'patch'], permission_classes=[permissions.IsAuthenticated])
@@ -229,7 +241,11 @@ class ProfileView(generics.UpdateAPIView):
     serializer_class = ProfileUpdateSerializer
 
     def get_object(self):
-        return self.request.user
+        return _locked_user(self.request)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
 
 
 class ProfileDeleteView(generics.DestroyAPIView):
@@ -241,7 +257,7 @@ class ProfileDeleteView(generics.DestroyAPIView):
 
     def perform_destroy(self, instance):
         instance.is_active = False
-        instance.save()
+        instance.save(update_fields=['is_active'])
 
 
 # ===== Plan Update =====
@@ -0,0 +1,225 @@
+"""
+Outbound webhook delivery for ``Project.webhook_url``.
+
+Requests only append ``WebhookEvent`` rows (an outbox). The
+``deliver_webhooks`` worker claims due events, batches them per project,
+signs each batch with HMAC-SHA256 using ``Project.webhook_secret`` and posts
+it over a pooled keep-alive HTTP session. Failed batches are retried with
+exponential backoff; after ``WEBHOOK_MAX_ATTEMPTS`` they move to
+``WebhookDeadLetter``.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from projects.cache import project_cache
+from projects.models import Project
+from .models import WebhookEvent, WebhookDeadLetter
+
+
+SIGNATURE_HEADER = 'X-Habio-Signature'
+TIMESTAMP_HEADER = 'X-Habio-Timestamp'
+
+
+# ===== Enqueue =====
+def _has_webhook(project_id):
+    return Project.objects.filter(id=project_id, webhook_url__isnull=False).exclude(webhook_url='').exists()
+
+
+def webhook_project_ids(project_ids):
+    """
+    Проекты из project_ids, у которых задан webhook_url. Флаг кешируется в
+    пространстве projects: вставки в проекты без вебхука не идут в БД.
+    """
+    enabled = set()
+    for project_id in set(project_ids):
+        version = project_cache.version(project_id)
+        if project_cache.get_or_build(project_id, version, lambda: _has_webhook(project_id), 'webhook'):
+            enabled.add(project_id)
+    return enabled
+
+
+def enqueue(event_type, items, serialize):
+    """
+    Ставит события в очередь доставки. items — пары (project_id, объект);
+    события проектов без webhook_url отбрасываются, payload = serialize(объект)
+    строится только для остальных.
+    """
+    items = list(items)
+    if not items:
+        return
+    enabled = webhook_project_ids(project_id for project_id, _ in items)
+    events = [
+        WebhookEvent(project_id=project_id, event_type=event_type, payload=serialize(obj))
+        for project_id, obj in items
+        if project_id in enabled
+    ]
+    if events:
+        WebhookEvent.objects.bulk_create(events)
+
+
+# ===== Signing / HTTP =====
+def sign(secret, timestamp, body):
+    message = f'{timestamp}.'.encode() + body
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Общая HTTP-сессия с пулом keep-alive соединений на каждый хост."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=settings.WEBHOOK_POOL_HOSTS,
+                    pool_maxsize=settings.WEBHOOK_CONCURRENCY,
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def post_batch(project, events, session=None):
+    """Отправляет пачку событий. Возвращает None при успехе или текст ошибки."""
+    body = json.dumps({
+        'project_id': project.id,
+        'events': [
+            {
+                'id': event.id,
+                'type': event.event_type,
+                'created_at': event.created_at,
+                'data': event.payload,
+            }
+            for event in events
+        ],
+    }, cls=DjangoJSONEncoder).encode()
+
+    timestamp = str(int(time.time()))
+    headers = {'Content-Type': 'application/json', TIMESTAMP_HEADER: timestamp}
+    if project.webhook_secret:
+        headers[SIGNATURE_HEADER] = sign(project.webhook_secret, timestamp, body)
+
+    try:
+        response = (session or get_session()).post(
+            project.webhook_url, data=body, headers=headers, timeout=settings.WEBHOOK_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        return str(e)[:1000]
+    if response.status_code >= 300:
+        return f'HTTP {response.status_code}: {response.text[:500]}'
+    return None
+
+
+# ===== Worker =====
+def retry_delay(attempts):
+    delay = min(settings.WEBHOOK_RETRY_BASE * 2 ** (attempts - 1), settings.WEBHOOK_RETRY_MAX)
+    # Джиттер, чтобы повторы к одному получателю не шли синхронно
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_due_events(limit):
+    """
+    Забирает готовые к отправке события и откладывает их на WEBHOOK_LEASE секунд,
+    чтобы параллельный воркер их не взял. Сама отправка идет вне транзакции.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        qs = WebhookEvent.objects.filter(next_attempt_at__lte=now).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        events = list(qs[:limit])
+        if events:
+            WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(
+                next_attempt_at=now + timedelta(seconds=settings.WEBHOOK_LEASE),
+            )
+    return events
+
+
+def _batches(events):
+    by_project = defaultdict(list)
+    for event in events:
+        by_project[event.project_id].append(event)
+    projects = Project.objects.in_bulk(by_project.keys())
+    size = settings.WEBHOOK_BATCH_SIZE
+    for project_id, project_events in by_project.items():
+        for i in range(0, len(project_events), size):
+            yield projects.get(project_id), project_events[i:i + size]
+
+
+def _record_failure(events, error):
+    now = timezone.now()
+    dead, retry = [], []
+    for event in events:
+        event.attempts += 1
+        event.last_error = error
+        (dead if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS else retry).append(event)
+
+    with transaction.atomic():
+        if dead:
+            WebhookDeadLetter.objects.bulk_create([
+                WebhookDeadLetter(
+                    project_id=event.project_id,
+                    event_type=event.event_type,
+                    payload=event.payload,
+                    attempts=event.attempts,
+                    last_error=event.last_error,
+                    created_at=event.created_at,
+                )
+                for event in dead
+            ])
+            WebhookEvent.objects.filter(id__in=[event.id for event in dead]).delete()
+        if retry:
+            # У всей пачки одинаковое число попыток — одна задержка на пачку
+            next_attempt_at = now + retry_delay(retry[0].attempts)
+            for event in retry:
+                event.next_attempt_at = next_attempt_at
+            WebhookEvent.objects.bulk_update(retry, ['attempts', 'last_error', 'next_attempt_at'])
+
+
+def deliver_once(limit=None, session=None):
+    """Одна итерация воркера. Возвращает (доставлено, неудачно)."""
+    events = claim_due_events(limit or settings.WEBHOOK_CLAIM_SIZE)
+    if not events:
+        return 0, 0
+
+    batches = []
+    for project, batch in _batches(events):
+        if project is None or not project.webhook_url:
+            _record_failure(batch, 'webhook_url is not set')
+            continue
+        batches.append((project, batch))
+
+    with ThreadPoolExecutor(max_workers=settings.WEBHOOK_CONCURRENCY) as pool:
+        errors = list(pool.map(lambda item: post_batch(item[0], item[1], session), batches))
+
+    delivered = failed = 0
+    delivered_ids = []
+    for (project, batch), error in zip(batches, errors):
+        if error is None:
+            delivered_ids.extend(event.id for event in batch)
+            delivered += len(batch)
+        else:
+            _record_failure(batch, error)
+            failed += len(batch)
+    if delivered_ids:
+        WebhookEvent.objects.filter(id__in=delivered_ids).delete()
+    return delivered, failed
@@ -0,0 +1,101 @@
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+from webhooks.delivery import SIGNATURE_HEADER, TIMESTAMP_HEADER, deliver_once, sign
+from webhooks.models import WebhookEvent, WebhookDeadLetter
+
+
+SECRET = 'bench-secret'
+
+
+class _Receiver(BaseHTTPRequestHandler):
+    """Локальный получатель вебхуков: проверяет подпись и считает события."""
+    protocol_version = 'HTTP/1.1'
+    stats = None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        expected = sign(SECRET, self.headers[TIMESTAMP_HEADER], body)
+        ok = hmac.compare_digest(expected, self.headers.get(SIGNATURE_HEADER, ''))
+        with self.stats['lock']:
+            self.stats['requests'] += 1
+            self.stats['connections'].add(self.client_address)
+            if ok:
+                self.stats['events'] += len(json.loads(body)['events'])
+            else:
+                self.stats['bad_signatures'] += 1
+        self.send_response(200 if ok else 401)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Замеряет пропускную способность доставки вебхуков на локальный сервер'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--projects', type=int, default=10)
+
+    def _run(self, projects, count, session):
+        WebhookEvent.objects.bulk_create([
+            WebhookEvent(
+                project=projects[i % len(projects)],
+                event_type='lead.created',
+                payload={'id': i, 'contact': f'lead-{i}@example.com', 'utm_source': 'bench'},
+            )
+            for i in range(count)
+        ], batch_size=5000)
+
+        started = time.perf_counter()
+        while True:
+            delivered, failed = deliver_once(session=session)
+            if not delivered and not failed:
+                break
+        return time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        stats = {'lock': threading.Lock(), 'requests': 0, 'events': 0, 'bad_signatures': 0, 'connections': set()}
+        handler = type('Receiver', (_Receiver,), {'stats': stats})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}/hook'
+
+        projects = [
+            Project.objects.create(name=f'bench-webhooks-{i}', webhook_url=url, webhook_secret=SECRET)
+            for i in range(options['projects'])
+        ]
+        try:
+            for label, session in (('pooled session', None), ('new connection per request', _NoKeepAlive())):
+                for key in ('requests', 'events', 'bad_signatures'):
+                    stats[key] = 0
+                stats['connections'] = set()
+                elapsed = self._run(projects, options['events'], session)
+                self.stdout.write(
+                    f'{label:28s} {stats["events"]:>7d} events in {stats["requests"]:>5d} requests, '
+                    f'{len(stats["connections"]):>4d} TCP connections, '
+                    f'{stats["events"] / elapsed:10.0f} events/s, bad signatures: {stats["bad_signatures"]}'
+                )
+            dead = WebhookDeadLetter.objects.filter(project__in=projects).count()
+            self.stdout.write(f'dead letters: {dead}')
+        finally:
+            server.shutdown()
+            for project in projects:
+                project.delete()
+
+
+class _NoKeepAlive:
+    """Сравнение: каждый запрос — новое TCP-соединение."""
+
+    def post(self, *args, **kwargs):
+        headers = dict(kwargs.pop('headers', {}), Connection='close')
+        return requests.post(*args, headers=headers, **kwargs)
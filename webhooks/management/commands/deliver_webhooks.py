@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from webhooks.delivery import deliver_once
+
+
+class Command(BaseCommand):
+    help = 'Доставляет исходящие вебхуки проектов (пачками, с повторами и dead-letter)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=settings.WEBHOOK_POLL_INTERVAL,
+                            help='Пауза (сек), когда доставлять нечего')
+        parser.add_argument('--once', action='store_true', help='Доставить все готовые события и выйти')
+
+    def handle(self, *args, **options):
+        while True:
+            delivered, failed = deliver_once()
+            if delivered or failed:
+                self.stdout.write(f'Delivered {delivered}, failed {failed}')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,40 @@
+from django.db import models
+from django.utils import timezone
+from projects.models import Project
+
+
+class WebhookEvent(models.Model):
+    """Исходящее событие, ожидающее доставки на Project.webhook_url (outbox)."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='webhook_events')
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['next_attempt_at', 'id'], name='webhook_event_due_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event_type} #{self.id}"
+
+
+class WebhookDeadLetter(models.Model):
+    """Событие, которое не удалось доставить за WEBHOOK_MAX_ATTEMPTS попыток."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='webhook_dead_letters')
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField()
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-failed_at']
+
+    def __str__(self) -> str:
+        return f"{self.event_type} (dead)"
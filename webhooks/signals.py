@@ -0,0 +1,82 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from leads.models import Lead, CallbackRequest
+from leads.serializers import serialize_lead, serialize_callback
+from leads.signals import leads_bulk_created
+from chat.models import ChatSession, ChatMessage
+from chat.serializers import serialize_chat_message
+from chat.signals import messages_bulk_created
+from .delivery import enqueue
+
+
+# События пишутся в outbox в той же транзакции, что и сам объект;
+# доставка идет отдельно, воркером deliver_webhooks
+
+# Сессия не переходит в другой проект, поэтому ее проект кешируется без версии
+SESSION_PROJECT_TIMEOUT = 24 * 60 * 60
+
+
+def _session_project_key(session_id):
+    return f'webhooks:session_project:{session_id}'
+
+
+def session_project_ids(messages):
+    """{session_id: project_id} для сообщений: из загруженной сессии, из кеша или одним запросом."""
+    session_field = ChatMessage._meta.get_field('session')
+    projects = {
+        message.session_id: message.session.project_id
+        for message in messages if session_field.is_cached(message)
+    }
+    missing = {message.session_id for message in messages} - projects.keys()
+    if missing:
+        found = cache.get_many([_session_project_key(session_id) for session_id in missing])
+        for session_id in list(missing):
+            project_id = found.get(_session_project_key(session_id))
+            if project_id is not None:
+                projects[session_id] = project_id
+                missing.discard(session_id)
+    if missing:
+        loaded = dict(ChatSession.objects.filter(id__in=missing).values_list('id', 'project_id'))
+        cache.set_many(
+            {_session_project_key(session_id): project_id for session_id, project_id in loaded.items()},
+            SESSION_PROJECT_TIMEOUT,
+        )
+        projects.update(loaded)
+    return projects
+
+
+def chat_messages_created(messages):
+    projects = session_project_ids(messages)
+    enqueue('chat_message.created', [
+        (projects[message.session_id], message) for message in messages
+    ], serialize_chat_message)
+
+
+@receiver(post_save, sender=Lead)
+def lead_created(sender, instance, created, **kwargs):
+    if created:
+        enqueue('lead.created', [(instance.project_id, instance)], serialize_lead)
+
+
+@receiver(leads_bulk_created)
+def leads_bulk_created_handler(sender, leads, **kwargs):
+    enqueue('lead.created', [(lead.project_id, lead) for lead in leads], serialize_lead)
+
+
+@receiver(post_save, sender=CallbackRequest)
+def callback_created(sender, instance, created, **kwargs):
+    if created:
+        enqueue('callback.created', [(instance.project_id, instance)], serialize_callback)
+
+
+@receiver(post_save, sender=ChatMessage)
+def chat_message_created(sender, instance, created, **kwargs):
+    if created:
+        chat_messages_created([instance])
+
+
+@receiver(messages_bulk_created)
+def chat_messages_bulk_created(sender, messages, **kwargs):
+    chat_messages_created(messages)
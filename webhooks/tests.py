@@ -0,0 +1,121 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from projects.models import Project
+from .delivery import SIGNATURE_HEADER, TIMESTAMP_HEADER, claim_due_events, deliver_once, sign
+from .models import WebhookEvent, WebhookDeadLetter
+
+
+SECRET = 'test-secret'
+
+
+class _Receiver(BaseHTTPRequestHandler):
+    """Получатель вебхуков: запоминает запросы и отвечает кодом server.status."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((dict(self.headers), body))
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(WEBHOOK_MAX_ATTEMPTS=3, WEBHOOK_RETRY_BASE=30, WEBHOOK_RETRY_MAX=3600, WEBHOOK_LEASE=120)
+class DeliveryTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Receiver)
+        self.server.daemon_threads = True
+        self.server.status = 200
+        self.server.received = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.session = requests.Session()
+        self.project = Project.objects.create(
+            name='Hooks', webhook_url=f'http://127.0.0.1:{self.server.server_address[1]}/hook', webhook_secret=SECRET,
+        )
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_events(self, count=2):
+        return WebhookEvent.objects.bulk_create([
+            WebhookEvent(project=self.project, event_type='lead.created', payload={'id': i}) for i in range(count)
+        ])
+
+    def deliver(self):
+        return deliver_once(session=self.session)
+
+    def make_due(self):
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+
+    def test_batch_is_signed(self):
+        self.add_events()
+        self.assertEqual(self.deliver(), (2, 0))
+
+        [(headers, body)] = self.server.received
+        self.assertEqual(headers[SIGNATURE_HEADER], sign(SECRET, headers[TIMESTAMP_HEADER], body))
+        self.assertNotEqual(headers[SIGNATURE_HEADER], sign('other-secret', headers[TIMESTAMP_HEADER], body))
+        payload = json.loads(body)
+        self.assertEqual(payload['project_id'], self.project.id)
+        self.assertEqual([event['data'] for event in payload['events']], [{'id': 0}, {'id': 1}])
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_failed_batch_is_retried_with_backoff(self):
+        self.server.status = 500
+        self.add_events()
+        # Задержка растет вдвое с каждой попыткой, джиттер ±20%
+        for attempts, delay in ((1, 30), (2, 60)):
+            started = timezone.now()
+            self.assertEqual(self.deliver(), (0, 2))
+            self.assertEqual(self.deliver(), (0, 0))
+            for event in WebhookEvent.objects.all():
+                self.assertEqual(event.attempts, attempts)
+                self.assertTrue(event.last_error.startswith('HTTP 500'))
+                self.assertGreaterEqual(event.next_attempt_at, started + timedelta(seconds=delay * 0.8))
+                self.assertLessEqual(event.next_attempt_at, timezone.now() + timedelta(seconds=delay * 1.2))
+            self.make_due()
+
+        self.server.status = 200
+        self.assertEqual(self.deliver(), (2, 0))
+        self.assertFalse(WebhookDeadLetter.objects.exists())
+
+    def test_dead_letter_after_max_attempts(self):
+        self.server.status = 500
+        [event, _] = self.add_events()
+        for _ in range(3):
+            self.assertEqual(self.deliver(), (0, 2))
+            self.make_due()
+
+        self.assertFalse(WebhookEvent.objects.exists())
+        self.assertEqual(len(self.server.received), 3)
+        dead = WebhookDeadLetter.objects.get(payload={'id': 0})
+        self.assertEqual((dead.attempts, dead.event_type, dead.created_at), (3, 'lead.created', event.created_at))
+        self.assertTrue(dead.last_error.startswith('HTTP 500'))
+
+    def test_claimed_events_are_leased(self):
+        self.add_events()
+        started = timezone.now()
+        self.assertEqual(len(claim_due_events(10)), 2)
+        # Параллельный воркер не заберет события до конца аренды
+        self.assertEqual(claim_due_events(10), [])
+        for event in WebhookEvent.objects.all():
+            self.assertGreaterEqual(event.next_attempt_at, started + timedelta(seconds=120))
+            self.assertEqual(event.attempts, 0)
+
+    def test_project_without_url_is_not_posted(self):
+        self.add_events(1)
+        Project.objects.filter(id=self.project.id).update(webhook_url='')
+        self.assertEqual(self.deliver(), (0, 0))
+        self.assertEqual(WebhookEvent.objects.get().last_error, 'webhook_url is not set')
+        self.assertEqual(self.server.received, [])
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class WidgetConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'widget'
+
+    def ready(self):
+        from . import snapshots
+        snapshots.connect()
@@ -0,0 +1,233 @@
+"""
+Cached widget configuration.
+
+The channel list, compiled schedule and A/B variant table of a project are
+rebuilt only when one of their rows changes: ``widget_cache`` depends on the
+projects, channels, schedules and abtests cache namespaces, whose versions
+are bumped by signals (see ``core.cache``).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.cache import CacheNamespace
+from core.renderers import json_dumps
+from projects.cache import project_cache
+from projects.models import Project
+from channels.cache import channel_cache
+from channels.models import Channel
+from schedules.cache import schedule_cache
+from schedules.models import Schedule
+from schedules.engine import compile_intervals, get_compiled_schedule
+from abtests.cache import abtest_cache
+from abtests.assignment import compile_project_tests, assign_variants, apply_channel_order
+from abtests.events import record_exposures, arecord_exposures
+
+
+CHANNEL_FIELDS = (
+    'id',
+    'type',
+    'label',
+    'link',
+    'phone_number',
+    'priority',
+    'show_in_top',
+    'icon',
+    'description',
+)
+
+
+widget_cache = CacheNamespace(
+    'widget', depends_on=(project_cache, channel_cache, schedule_cache, abtest_cache),
+)
+
+
+def build_widget_config(project_id, version=None):
+    """Собирает конфигурацию виджета из БД. Возвращает None, если проекта нет."""
+    project = Project.objects.filter(id=project_id).only('id', 'timezone').first()
+    if project is None:
+        return None
+
+    channels = list(
+        Channel.objects
+        .filter(project_id=project.id, is_active=True)
+        .order_by('priority', 'id')
+        .values(*CHANNEL_FIELDS)
+    )
+    ab_tests = compile_project_tests(project.id)
+    digest = hashlib.sha1(
+        json.dumps([channels, ab_tests], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    schedule = compile_intervals(
+        Schedule.objects
+        .filter(project_id=project.id)
+        .values_list('day', 'start_time', 'end_time', 'is_working_day')
+    )
+
+    return {
+        'project_id': project.id,
+        'version': version,
+        'timezone': project.timezone,
+        'channels': channels,
+        'schedule': schedule,
+        'ab_tests': ab_tests,
+        'digest': digest,
+    }
+
+
+# Конфигурации, уже прочитанные этим процессом: при совпадении версии
+# не нужно заново десериализовать запись из общего кеша
+_local_configs = {}
+
+
+def get_widget_config(project_id):
+    version = widget_cache.version(project_id)
+    config = _local_configs.get(str(project_id))
+    if config is not None and config['version'] == version:
+        return config
+
+    config = widget_cache.get_or_build(
+        project_id, version, lambda: build_widget_config(project_id, version),
+        timeout=settings.WIDGET_CONFIG_CACHE_TIMEOUT,
+    )
+    if config is not None:
+        _local_configs[str(project_id)] = config
+    return config
+
+
+async def aget_widget_config(project_id):
+    """Асинхронный вариант get_widget_config; сборка из БД (редкий промах) идет в потоке."""
+    version = await widget_cache.aversion(project_id)
+    config = _local_configs.get(str(project_id))
+    if config is not None and config['version'] == version:
+        return config
+
+    config = await widget_cache.aget_or_build(
+        project_id, version, lambda: build_widget_config(project_id, version),
+        timeout=settings.WIDGET_CONFIG_CACHE_TIMEOUT,
+    )
+    if config is not None:
+        _local_configs[str(project_id)] = config
+    return config
+
+
+def online_status(config):
+    schedule = get_compiled_schedule(
+        config['project_id'], config['version'], config['timezone'], config['schedule'],
+    )
+    return schedule.status()
+
+
+def _config_payload(config, client_id, if_none_match):
+    """
+    Данные ответа для посетителя. Возвращает (data, etag, max_age, variant_ids);
+    data = None, если у клиента уже актуальная версия (If-None-Match).
+    """
+    is_online, next_available, valid_until = online_status(config)
+    assigned = assign_variants(config['ab_tests'], client_id)
+    variant_ids = [variant[0] for _, variant in assigned]
+    etag = '"%s"' % hashlib.sha1(
+        f"{config['digest']}:{is_online}:{next_available}:{variant_ids}".encode()
+    ).hexdigest()
+    # Не кешируем дольше, чем до ближайшей смены онлайн-статуса
+    max_age = min(
+        settings.WIDGET_CONFIG_MAX_AGE,
+        max(int((valid_until - timezone.now()).total_seconds()), 0),
+    )
+
+    if etag in parse_etags(if_none_match):
+        return None, etag, max_age, variant_ids
+
+    data = {
+        "channels": config['channels'],
+        "is_online": is_online,
+        "next_available": next_available,
+    }
+    if config['ab_tests']:
+        # Вариант A/B-теста меняет порядок каналов и тексты виджета
+        copy = {}
+        for test_id, (variant_id, name, channel_order, copy_text) in assigned:
+            data['channels'] = apply_channel_order(data['channels'], channel_order)
+            copy.update(copy_text)
+        data['variants'] = [
+            {"test_id": test_id, "variant_id": variant[0], "name": variant[1]}
+            for test_id, variant in assigned
+        ]
+        data['copy'] = copy
+    return data, etag, max_age, variant_ids
+
+
+def _finish(response, etag, max_age):
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def widget_config_response(request, project_id):
+    """Ответ с конфигурацией виджета, поддерживает ETag / If-None-Match."""
+    config = get_widget_config(project_id)
+    if config is None:
+        raise Http404('No Project matches the given query.')
+
+    client_id = request.query_params.get('client_id')
+    data, etag, max_age, variant_ids = _config_payload(
+        config, client_id, request.META.get('HTTP_IF_NONE_MATCH', ''),
+    )
+    record_exposures(variant_ids, client_id)
+    if data is None:
+        return _finish(Response(status=status.HTTP_304_NOT_MODIFIED), etag, max_age)
+    return _finish(Response(data), etag, max_age)
+
+
+async def awidget_config_response(request, project_id):
+    """Асинхронный вариант widget_config_response для обычного Django-запроса."""
+    config = await aget_widget_config(project_id)
+    if config is None:
+        raise Http404('No Project matches the given query.')
+
+    client_id = request.GET.get('client_id')
+    data, etag, max_age, variant_ids = _config_payload(
+        config, client_id, request.META.get('HTTP_IF_NONE_MATCH', ''),
+    )
+    await arecord_exposures(variant_ids, client_id)
+    if data is None:
+        return _finish(HttpResponseNotModified(), etag, max_age)
+    return _finish(HttpResponse(json_dumps(data), content_type='application/json'), etag, max_age)
+
+
+def _assigned_payload(config, client_id):
+    assigned = assign_variants(config['ab_tests'], client_id)
+    variants = [
+        {"test_id": test_id, "variant_id": variant[0], "name": variant[1]}
+        for test_id, variant in assigned
+    ]
+    return [variant[0] for _, variant in assigned], {"variants": variants}
+
+
+def exposure_response(project_id, client_id):
+    """
+    Показ вариантов посетителю виджета, загрузившему конфигурацию из статического
+    снимка (widget/snapshots.py): тот же учет, что при запросе конфигурации.
+    """
+    config = get_widget_config(project_id)
+    if config is None:
+        raise Http404('No Project matches the given query.')
+    variant_ids, data = _assigned_payload(config, client_id)
+    record_exposures(variant_ids, client_id)
+    return Response(data)
+
+
+async def aexposure_response(project_id, client_id):
+    config = await aget_widget_config(project_id)
+    if config is None:
+        raise Http404('No Project matches the given query.')
+    variant_ids, data = _assigned_payload(config, client_id)
+    await arecord_exposures(variant_ids, client_id)
+    return HttpResponse(json_dumps(data), content_type='application/json')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from projects.models import Project
+from widget.snapshots import publish, snapshot_root, unpublish
+
+
+class Command(BaseCommand):
+    help = (
+        'Публикует статические снимки конфигурации виджета (widget/snapshots.py). '
+        'Запускать раз в сутки: open_intervals в снимке рассчитаны на WIDGET_SNAPSHOT_HORIZON_DAYS дней'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', help='Только этот проект (можно несколько раз)')
+        parser.add_argument('--prune', action='store_true', help='Удалить снимки несуществующих проектов')
+
+    def handle(self, *args, **options):
+        project_ids = options['project'] or list(Project.objects.order_by('id').values_list('id', flat=True))
+        published = 0
+        for project_id in project_ids:
+            if publish(project_id) is not None:
+                published += 1
+
+        removed = 0
+        root = snapshot_root()
+        if options['prune'] and root.is_dir():
+            existing = {str(project_id) for project_id in Project.objects.values_list('id', flat=True)}
+            for directory in root.iterdir():
+                if directory.is_dir() and directory.name not in existing:
+                    unpublish(directory.name)
+                    removed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{published} snapshots published to {root}, {removed} removed'))
@@ -0,0 +1,215 @@
+"""
+Static snapshots of the widget configuration.
+
+``publish(project_id)`` renders a project's widget config — active
+channels, business hours and the A/B variant table — into
+``<root>/<project_id>/<version>.json`` (immutable, the version is a hash
+of the content) and ``<root>/<project_id>/current.json``. The root is
+``WIDGET_SNAPSHOT_ROOT`` or ``MEDIA_ROOT/widget``, so nginx or a CDN can
+serve widget config without Django: versioned files can be cached
+forever, ``current.json`` briefly.
+
+With ``WIDGET_SNAPSHOTS_ENABLED`` a project is re-published after any
+committed change of its ``Project``, ``Channel``, ``Schedule``, ``ABTest``
+or ``ABTestVariant`` rows. ``open_intervals`` cover the next
+``WIDGET_SNAPSHOT_HORIZON_DAYS`` days, so ``publish_widget_snapshots``
+should also run daily (cron). ``/api/widget/channels/<id>/`` stays as
+the fallback. A widget loaded from a snapshot reports its A/B exposures
+with ``POST /api/widget/record_exposure/<id>/`` (``client_id``).
+
+A static client computes online status and variants itself: online means
+"now" falls in an ``open_intervals`` pair; variants are assigned as in
+``abtests.assignment``.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+
+from abtests.cache import variant_project_id
+from abtests.models import ABTest, ABTestVariant
+from channels.models import Channel
+from projects.models import Project
+from schedules.engine import resolve_timezone
+from schedules.models import Schedule
+from .config import build_widget_config
+
+
+logger = logging.getLogger('widget.snapshots')
+
+CURRENT = 'current.json'
+
+
+def snapshot_root():
+    return Path(settings.WIDGET_SNAPSHOT_ROOT or Path(settings.MEDIA_ROOT) / 'widget')
+
+
+def open_intervals(timezone_name, intervals, now=None, days=None):
+    """
+    Недельные интервалы расписания (секунды от понедельника 00:00 по времени
+    проекта) -> пары [открытие, закрытие] в UTC с полуночи текущего дня на days дней.
+    """
+    days = settings.WIDGET_SNAPSHOT_HORIZON_DAYS if days is None else days
+    tz = resolve_timezone(timezone_name)
+    today = (now or timezone.now()).astimezone(tz).date()
+    start = datetime.combine(today, datetime.min.time())
+    stop = start + timedelta(days=days)
+    monday = start - timedelta(days=today.weekday())
+
+    result = []
+    week = 0
+    while monday + timedelta(weeks=week) < stop:
+        base = monday + timedelta(weeks=week)
+        for opens, closes in intervals:
+            opens_at, closes_at = base + timedelta(seconds=opens), base + timedelta(seconds=closes)
+            if closes_at <= start or opens_at >= stop:
+                continue
+            # Локальное время -> UTC с учетом перехода на летнее время в этот день
+            opens_at = max(opens_at, start).replace(tzinfo=tz).astimezone(dt_timezone.utc)
+            closes_at = min(closes_at, stop).replace(tzinfo=tz).astimezone(dt_timezone.utc)
+            if result and result[-1][1] >= opens_at:
+                # Ночная смена воскресенья продолжается в понедельник
+                result[-1][1] = max(result[-1][1], closes_at)
+            else:
+                result.append([opens_at, closes_at])
+        week += 1
+    return [[opens.isoformat(), closes.isoformat()] for opens, closes in result]
+
+
+def snapshot_data(config, now=None):
+    """Содержимое снимка по конфигурации из build_widget_config."""
+    ab_tests = []
+    for test_id, traffic, cumulative, variants in config['ab_tests']:
+        weights = [high - low for low, high in zip((0, *cumulative), cumulative)]
+        ab_tests.append({
+            'test_id': test_id,
+            'traffic': traffic,
+            'variants': [
+                {'variant_id': variant_id, 'name': name, 'weight': weight,
+                 'channel_order': channel_order, 'copy': copy_text}
+                for (variant_id, name, channel_order, copy_text), weight in zip(variants, weights)
+            ],
+        })
+    return {
+        'project_id': config['project_id'],
+        'timezone': config['timezone'],
+        'channels': config['channels'],
+        'schedule': [list(interval) for interval in config['schedule']],
+        'open_intervals': open_intervals(config['timezone'], config['schedule'], now),
+        'ab_tests': ab_tests,
+    }
+
+
+def _write(path, body):
+    """Атомарная запись: читатель видит либо старый файл, либо новый целиком."""
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(body)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _prune_versions(directory, keep):
+    versions = sorted(
+        (path for path in directory.glob('*.json') if path.name != CURRENT),
+        key=lambda path: path.stat().st_mtime, reverse=True,
+    )
+    # Несколько прежних версий остаются: на них ссылаются еще не истекшие в кешах current.json
+    for path in versions[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def publish(project_id, now=None):
+    """
+    Публикует снимок проекта; без изменений файлы не переписываются. Возвращает
+    версию или None, если проекта нет (тогда его снимки удаляются).
+    """
+    config = build_widget_config(project_id)
+    if config is None:
+        unpublish(project_id)
+        return None
+
+    data = snapshot_data(config, now)
+    version = hashlib.sha1(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()[:16]
+    body = orjson.dumps({'version': version, **data})
+
+    directory = snapshot_root() / str(config['project_id'])
+    directory.mkdir(parents=True, exist_ok=True)
+    versioned = directory / f'{version}.json'
+    if versioned.exists():
+        # Возврат к прежней версии: она снова самая свежая для _prune_versions
+        os.utime(versioned)
+    else:
+        _write(versioned, body)
+    current = directory / CURRENT
+    try:
+        unchanged = current.read_bytes() == body
+    except FileNotFoundError:
+        unchanged = False
+    if not unchanged:
+        _write(current, body)
+        _prune_versions(directory, settings.WIDGET_SNAPSHOT_KEEP)
+    return version
+
+
+def unpublish(project_id):
+    shutil.rmtree(snapshot_root() / str(project_id), ignore_errors=True)
+
+
+# ===== Re-publishing on changes =====
+_pending = threading.local()
+
+
+def _publish_committed(project_id):
+    pending = _pending.__dict__.setdefault('projects', set())
+    if project_id not in pending:
+        # Уже опубликован предыдущим обработчиком этой же транзакции
+        return
+    pending.discard(project_id)
+    try:
+        publish(project_id)
+    except Exception:
+        # Статический снимок — оптимизация: ошибка записи не должна ломать запрос
+        logger.exception('Widget snapshot of project %s was not published', project_id)
+
+
+def schedule_publish(project_id):
+    """Публикация после коммита; несколько изменений в одной транзакции дают одну публикацию."""
+    if project_id is None or not settings.WIDGET_SNAPSHOTS_ENABLED:
+        return
+    _pending.__dict__.setdefault('projects', set()).add(project_id)
+    transaction.on_commit(lambda: _publish_committed(project_id))
+
+
+SOURCES = (
+    (Project, lambda project: project.pk),
+    (Channel, lambda channel: channel.project_id),
+    (Schedule, lambda schedule: schedule.project_id),
+    (ABTest, lambda test: test.project_id),
+    (ABTestVariant, variant_project_id),
+)
+
+
+def connect():
+    for model, project_of in SOURCES:
+        def receiver(sender, instance, project_of=project_of, **kwargs):
+            if settings.WIDGET_SNAPSHOTS_ENABLED:
+                schedule_publish(project_of(instance))
+
+        uid = f'widget.snapshots:{model._meta.label}'
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
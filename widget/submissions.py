@@ -0,0 +1,132 @@
+"""
+Widget writes shared by the sync ``WidgetViewSet`` and the async views.
+
+Each function does the whole database part of an endpoint and returns
+``(response data, status)``. The async views run it with ``sync_to_async``
+(one hop to the ORM thread per request rather than one per query), so both
+paths answer the same way by construction.
+"""
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+
+from projects.models import Project
+from channels.models import Channel
+from leads.models import Lead, CallbackRequest
+from chat.models import ChatSession, ChatMessage
+from leads.serializers import serialize_lead, serialize_callback
+from chat.serializers import serialize_chat_session, serialize_chat_message
+from leads.ingest import queue_lead
+from leads.dedup import dedup_keys, find_duplicate, create_once
+
+
+WELCOME_MESSAGE = 'Добро пожаловать! Как мы можем вам помочь?'
+
+
+def submission_data(data):
+    """Тело запроса как dict; JSON-массив, строка или число — ParseError (400)."""
+    if hasattr(data, 'lists'):
+        # Форма (QueryDict): по одному значению на поле, как и при data.get()
+        return data.dict()
+    if not isinstance(data, dict):
+        raise ParseError('Request body must be a JSON object.')
+    return data
+
+
+def _channel(project, channel_id, channel_type, label, priority):
+    if channel_id:
+        return get_object_or_404(Channel, id=channel_id)
+    # Создаем дефолтный канал, если не указан
+    channel, created = Channel.objects.get_or_create(
+        project=project,
+        type=channel_type,
+        defaults={'label': label, 'priority': priority, 'is_active': True},
+    )
+    return channel
+
+
+def queue_submission(project_id, data):
+    submission_id = queue_lead({**data, 'project_id': project_id})
+    return {'id': str(submission_id), 'status': 'queued'}, status.HTTP_202_ACCEPTED
+
+
+def create_lead(project_id, data):
+    keys = dedup_keys(
+        project_id, data.get('client_id'), data.get('contact', ''), data.get('message', ''), data.get('channel'),
+    )
+    duplicate = find_duplicate(Lead, keys)
+    if duplicate is not None:
+        return serialize_lead(duplicate), status.HTTP_200_OK
+
+    project = get_object_or_404(Project, id=project_id)
+    channel = _channel(project, data.get('channel'), 'form', 'Форма обратной связи', 1)
+    lead, created = create_once(
+        Lead, keys,
+        project=project,
+        channel=channel,
+        contact=data.get('contact', ''),
+        message=data.get('message', ''),
+        utm_source=data.get('utm_source'),
+        utm_medium=data.get('utm_medium'),
+        utm_campaign=data.get('utm_campaign'),
+        page_url=data.get('page_url'),
+        client_id=data.get('client_id'),
+        device_type=data.get('device_type', 'desktop'),
+        language=data.get('language', 'en')
+    )
+    return serialize_lead(lead), status.HTTP_201_CREATED if created else status.HTTP_200_OK
+
+
+def create_callback(project_id, data):
+    phone = data.get('phone') or data.get('contact', '')
+    keys = dedup_keys(project_id, data.get('client_id'), phone, data.get('message', ''), data.get('channel'))
+    duplicate = find_duplicate(CallbackRequest, keys)
+    if duplicate is not None:
+        return serialize_callback(duplicate), status.HTTP_200_OK
+
+    project = get_object_or_404(Project, id=project_id)
+    channel = _channel(project, data.get('channel'), 'call', 'Заказ звонка', 2)
+    callback, created = create_once(
+        CallbackRequest, keys,
+        project=project,
+        channel=channel,
+        phone=phone,
+        message=data.get('message', ''),
+        preferred_time=data.get('preferred_time'),
+        page_url=data.get('page_url'),
+        client_id=data.get('client_id'),
+        device_type=data.get('device_type', 'desktop'),
+        language=data.get('language', 'en')
+    )
+    return serialize_callback(callback), status.HTTP_201_CREATED if created else status.HTTP_200_OK
+
+
+def start_chat(project_id, data):
+    project = get_object_or_404(Project, id=project_id)
+    session = ChatSession.objects.create(
+        project=project,
+        client_id=data.get('client_id'),
+        page_url=data.get('page_url'),
+        device_type=data.get('device_type', 'desktop'),
+        language=data.get('language', 'en')
+    )
+    welcome_message = ChatMessage.objects.create(session=session, content=WELCOME_MESSAGE, message_type='system')
+
+    # Сессия только что создана — из сообщений у нее только приветствие
+    payload = serialize_chat_session(session)
+    payload['messages'] = [serialize_chat_message(welcome_message)]
+    return payload, status.HTTP_201_CREATED
+
+
+def send_message(data):
+    session_id = data.get('session_id')
+    if not session_id:
+        return {'error': 'Session ID is required'}, status.HTTP_400_BAD_REQUEST
+
+    session = get_object_or_404(ChatSession, id=session_id)
+    message = ChatMessage.objects.create(
+        session=session,
+        content=data.get('content', ''),
+        message_type=data.get('message_type', 'user')
+    )
+    return serialize_chat_message(message), status.HTTP_201_CREATED
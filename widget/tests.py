@@ -0,0 +1,163 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import include, path, resolve
+
+from channels.models import Channel
+from core.idempotency import REPLAYED_HEADER, _identify
+from leads.dedup import dedup_keys
+from leads.models import Lead, CallbackRequest
+from projects.models import Project
+from .urls import router
+
+
+# Синхронный WidgetViewSet на тех же URL, что и async-представления (WIDGET_ASYNC_VIEWS=False)
+urlpatterns = [path('api/', include(router.urls))]
+
+ENDPOINTS = ('create_lead', 'create_callback', 'start_chat', 'send_message', 'record_exposure')
+
+
+@override_settings(RATE_LIMIT_ENABLED=False, SECURE_SSL_REDIRECT=False)
+class WidgetTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Project.objects.create(name='Widget')
+        cls.channel = Channel.objects.create(project=cls.project, type='form', label='Form')
+
+    def setUp(self):
+        self.client = Client(HTTP_HOST='localhost')
+
+    def post(self, endpoint, body, content_type='application/json', **headers):
+        return self.client.post(
+            f'/api/widget/{endpoint}/{self.project.id}/', body, content_type=content_type, headers=headers,
+        )
+
+
+class AsyncWidgetBodyTests(WidgetTestCase):
+    def test_non_object_json_is_rejected(self):
+        for endpoint in ENDPOINTS:
+            for body in ('[1]', '"x"', '1', 'null', b'{"contact": "\xff"}', '{broken'):
+                with self.subTest(endpoint=endpoint, body=body):
+                    response = self.post(endpoint, body)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('detail', response.json())
+
+    def test_form_body_is_accepted(self):
+        response = self.post('create_lead', 'contact=%2B79990000000&client_id=c1',
+                             content_type='application/x-www-form-urlencoded')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['contact'], '+79990000000')
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class SyncWidgetBodyTests(AsyncWidgetBodyTests):
+    pass
+
+
+class SubmissionParityTests(WidgetTestCase):
+    """Синхронный и асинхронный пути отдают одинаковые ответы."""
+
+    def submit(self):
+        results = []
+        for contact in ('+79990000001', '+79990000002'):
+            body = {'contact': contact, 'client_id': 'c1', 'channel': self.channel.id}
+            created, duplicate = self.post('create_lead', body), self.post('create_lead', body)
+            results.append((created.status_code, duplicate.status_code, duplicate.json()['id'] == created.json()['id']))
+            chat = self.post('start_chat', {'client_id': 'c1'}).json()
+            message = self.post('send_message', {'session_id': chat['id'], 'content': 'Hi'})
+            results.append((len(chat['messages']), message.status_code, message.json()['content']))
+            missing = self.post('send_message', {'content': 'Hi'})
+            results.append((missing.status_code, missing.json()))
+        return results
+
+    def test_sync_and_async_paths_match(self):
+        async_results = self.submit()
+        Lead.objects.all().delete()
+        with override_settings(ROOT_URLCONF=__name__):
+            self.assertEqual(self.submit(), async_results)
+        self.assertEqual(async_results[0], (201, 200, True))
+
+
+@override_settings(LEAD_DEDUP_WINDOW=0)
+class IdempotencyTests(WidgetTestCase):
+    BODY = {'contact': '+79990000000', 'client_id': 'c1'}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def create(self, body=BODY, key='k1'):
+        return self.post('create_lead', body, Idempotency_Key=key)
+
+    def test_repeat_is_replayed(self):
+        first, repeat = self.create(), self.create()
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn(REPLAYED_HEADER, first)
+        self.assertEqual((repeat.status_code, repeat[REPLAYED_HEADER]), (201, 'true'))
+        self.assertEqual(repeat.json(), first.json())
+        self.assertEqual(Lead.objects.count(), 1)
+        # Другой ключ — новая заявка
+        self.assertEqual(self.create(key='k2').status_code, 201)
+        self.assertEqual(Lead.objects.count(), 2)
+
+    def test_repeat_while_first_is_running_gets_409(self):
+        path = f'/api/widget/create_lead/{self.project.id}/'
+        request = RequestFactory().post(path, self.BODY, content_type='application/json', HTTP_IDEMPOTENCY_KEY='k1')
+        request.resolver_match = resolve(path)
+        key, fingerprint = _identify('widget_create_lead', request)
+        # Так ключ выглядит, пока первый запрос не завершился
+        cache.set(key, (fingerprint, None))
+
+        self.assertEqual(self.create().status_code, 409)
+        self.assertFalse(Lead.objects.exists())
+
+    def test_changed_body_gets_422(self):
+        self.create()
+        response = self.create({**self.BODY, 'message': 'Other'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Lead.objects.count(), 1)
+
+    def test_errors_are_not_stored(self):
+        self.assertEqual(self.post('send_message', {'content': 'Hi'}, Idempotency_Key='k1').status_code, 400)
+        chat = self.post('start_chat', {'client_id': 'c1'}).json()
+        # Ответ с ошибкой не сохранен: ключ можно повторить с исправленным телом
+        response = self.post('send_message', {'content': 'Hi', 'session_id': chat['id']}, Idempotency_Key='k1')
+        self.assertEqual(response.status_code, 201)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class SyncIdempotencyTests(IdempotencyTests):
+    pass
+
+
+class DedupRaceTests(WidgetTestCase):
+    """Проигравший в гонке одинаковых заявок получает запись победителя."""
+
+    def test_racing_insert_returns_existing_row(self):
+        body = {'contact': '+79990000000', 'client_id': 'c1', 'channel': self.channel.id}
+        keys = dedup_keys(self.project.id, 'c1', body['contact'], '', self.channel.id)
+        lead = Lead.objects.create(project=self.project, channel=self.channel, contact=body['contact'],
+                                   dedup_key=keys.current)
+        callback = CallbackRequest.objects.create(project=self.project, channel=self.channel, phone=body['contact'],
+                                                  dedup_key=keys.current)
+        # Проверка дубликата не видит запись, вставленную параллельным запросом
+        with mock.patch('widget.submissions.find_duplicate', return_value=None):
+            for urlconf in ('core.urls', __name__):
+                with self.subTest(urlconf=urlconf), override_settings(ROOT_URLCONF=urlconf):
+                    response = self.post('create_lead', body)
+                    self.assertEqual((response.status_code, response.json()['id']), (200, lead.id))
+                    response = self.post('create_callback', body)
+                    self.assertEqual((response.status_code, response.json()['id']), (200, callback.id))
+        self.assertEqual((Lead.objects.count(), CallbackRequest.objects.count()), (1, 1))
+
+    def test_submission_from_previous_window_is_kept(self):
+        body = {'contact': '+79990000000', 'client_id': 'c1', 'channel': self.channel.id}
+        keys = dedup_keys(self.project.id, 'c1', body['contact'], '', self.channel.id)
+        # Параллельный запрос вставил заявку в последние мгновения прошлого окна
+        lead = Lead.objects.create(project=self.project, channel=self.channel, contact=body['contact'],
+                                   dedup_key=keys.previous)
+        with mock.patch('widget.submissions.find_duplicate', return_value=None):
+            response = self.post('create_lead', body)
+        self.assertEqual((response.status_code, response.json()['id']), (200, lead.id))
+        self.assertEqual(Lead.objects.count(), 1)
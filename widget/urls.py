@@ -1,10 +1,25 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
+from . import views
 from .views import WidgetViewSet
 
 router = DefaultRouter()
 router.register(r'widget', WidgetViewSet, basename='widget')
 
-urlpatterns = [
-    path('', include(router.urls)),
-]
\ No newline at end of file
+if settings.WIDGET_ASYNC_VIEWS:
+    # Асинхронные представления на тех же URL и с теми же именами, что у WidgetViewSet
+    urlpatterns = [
+        re_path(r'^widget/channels/(?P<project_id>[^/.]+)/$', views.get_channels, name='widget-get-channels'),
+        re_path(r'^widget/record_exposure/(?P<project_id>[^/.]+)/$', views.record_exposure,
+                name='widget-record-exposure'),
+        re_path(r'^widget/create_lead/(?P<project_id>[^/.]+)/$', views.create_lead, name='widget-create-lead'),
+        re_path(r'^widget/create_callback/(?P<project_id>[^/.]+)/$', views.create_callback,
+                name='widget-create-callback'),
+        re_path(r'^widget/start_chat/(?P<project_id>[^/.]+)/$', views.start_chat, name='widget-start-chat'),
+        re_path(r'^widget/send_message/(?P<project_id>[^/.]+)/$', views.send_message, name='widget-send-message'),
+    ]
+else:
+    urlpatterns = [
+        path('', include(router.urls)),
+    ]
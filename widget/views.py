@@ -1,196 +1,219 @@
+import functools
+import json
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.permissions import AllowAny
-from django.shortcuts import get_object_or_404
-from django.utils import timezone
-from datetime import datetime, time
-import pytz
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 
-from projects.models import Project
-from channels.models import Channel
-from leads.models import Lead, CallbackRequest
-from chat.models import ChatSession, ChatMessage
-from leads.serializers import LeadSerializer, CallbackRequestSerializer
-from chat.serializers import ChatSessionSerializer, ChatMessageSerializer
+from leads.ingest import is_queued_mode
+from core import ratelimit
+from core.idempotency import idempotent
+from core.throttling import WidgetRateThrottle
+from core.renderers import json_dumps
+from . import submissions
+from .config import widget_config_response, awidget_config_response, exposure_response, aexposure_response
+from .submissions import submission_data
 
 
 class WidgetViewSet(viewsets.ViewSet):
     permission_classes = [AllowAny]
+    throttle_classes = [WidgetRateThrottle]
 
     @action(detail=False, methods=['get'], url_path='channels/(?P<project_id>[^/.]+)')
     def get_channels(self, request, project_id=None):
         """Получение каналов для виджета"""
         try:
-            project = get_object_or_404(Project, id=project_id)
-            channels = Channel.objects.filter(project=project, is_active=True).order_by('priority', 'id')
-            
-            # Определяем онлайн статус (простая логика - рабочие часы)
-            now = timezone.now()
-            current_time = now.time()
-            current_weekday = now.weekday()  # 0 = Monday, 6 = Sunday
-            
-            # Простая логика: рабочие дни с 9:00 до 18:00
-            is_online = (
-                current_weekday < 5 and  # Понедельник-Пятница
-                time(9, 0) <= current_time <= time(18, 0)
-            )
-            
-            next_available = "09:00" if not is_online else None
-            
-            # Формируем ответ в формате, ожидаемом фронтендом
-            response_data = {
-                "channels": [
-                    {
-                        "id": channel.id,
-                        "type": channel.type,
-                        "label": channel.label,
-                        "link": channel.link,
-                        "phone_number": channel.phone_number,
-                        "priority": channel.priority,
-                        "show_in_top": channel.show_in_top,
-                        "icon": channel.icon,
-                        "description": channel.description
-                    }
-                    for channel in channels
-                ],
-                "is_online": is_online,
-                "next_available": next_available
-            }
-            
-            return Response(response_data)
-            
+            return widget_config_response(request, project_id)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'], url_path='record_exposure/(?P<project_id>[^/.]+)')
+    def record_exposure(self, request, project_id=None):
+        """Учет показа A/B-вариантов виджету, загруженному из статического снимка"""
+        client_id = submission_data(request.data).get('client_id')
+        if not client_id:
+            return Response({'error': 'Client ID is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return exposure_response(project_id, client_id)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['post'], url_path='create_lead/(?P<project_id>[^/.]+)')
+    @idempotent('widget_create_lead')
     def create_lead(self, request, project_id=None):
         """Создание лида через виджет"""
+        data = submission_data(request.data)
+        if is_queued_mode():
+            return Response(*submissions.queue_submission(project_id, data))
         try:
-            project = get_object_or_404(Project, id=project_id)
-            channel_id = request.data.get('channel')
-            if channel_id:
-                channel = get_object_or_404(Channel, id=channel_id)
-            else:
-                # Создаем дефолтный канал если не указан
-                channel, created = Channel.objects.get_or_create(
-                    project=project,
-                    type='form',
-                    defaults={
-                        'label': 'Форма обратной связи',
-                        'priority': 1,
-                        'is_active': True
-                    }
-                )
-            
-            lead = Lead.objects.create(
-                project=project,
-                channel=channel,
-                contact=request.data.get('contact', ''),
-                message=request.data.get('message', ''),
-                utm_source=request.data.get('utm_source'),
-                utm_medium=request.data.get('utm_medium'),
-                utm_campaign=request.data.get('utm_campaign'),
-                page_url=request.data.get('page_url'),
-                client_id=request.data.get('client_id'),
-                device_type=request.data.get('device_type', 'desktop'),
-                language=request.data.get('language', 'en')
-            )
-            
-            serializer = LeadSerializer(lead)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-            
+            return Response(*submissions.create_lead(project_id, data))
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['post'], url_path='create_callback/(?P<project_id>[^/.]+)')
+    @idempotent('widget_create_callback')
     def create_callback(self, request, project_id=None):
         """Создание заявки на звонок через виджет"""
+        data = submission_data(request.data)
         try:
-            project = get_object_or_404(Project, id=project_id)
-            channel_id = request.data.get('channel')
-            if channel_id:
-                channel = get_object_or_404(Channel, id=channel_id)
-            else:
-                # Создаем дефолтный канал для звонков
-                channel, created = Channel.objects.get_or_create(
-                    project=project,
-                    type='call',
-                    defaults={
-                        'label': 'Заказ звонка',
-                        'priority': 2,
-                        'is_active': True
-                    }
-                )
-            
-            callback = CallbackRequest.objects.create(
-                project=project,
-                channel=channel,
-                contact=request.data.get('contact', ''),
-                message=request.data.get('message', ''),
-                preferred_time=request.data.get('preferred_time'),
-                page_url=request.data.get('page_url'),
-                client_id=request.data.get('client_id'),
-                device_type=request.data.get('device_type', 'desktop'),
-                language=request.data.get('language', 'en')
-            )
-            
-            serializer = CallbackRequestSerializer(callback)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-            
+            return Response(*submissions.create_callback(project_id, data))
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['post'], url_path='start_chat/(?P<project_id>[^/.]+)')
+    @idempotent('widget_start_chat')
     def start_chat(self, request, project_id=None):
         """Начало чат-сессии через виджет"""
+        data = submission_data(request.data)
         try:
-            project = get_object_or_404(Project, id=project_id)
-            
-            # Создаем новую сессию чата
-            session = ChatSession.objects.create(
-                project=project,
-                client_id=request.data.get('client_id'),
-                page_url=request.data.get('page_url'),
-                device_type=request.data.get('device_type', 'desktop'),
-                language=request.data.get('language', 'en')
-            )
-            
-            # Добавляем приветственное сообщение
-            welcome_message = ChatMessage.objects.create(
-                session=session,
-                content="Добро пожаловать! Как мы можем вам помочь?",
-                message_type='system'
-            )
-            
-            serializer = ChatSessionSerializer(session)
-            data = serializer.data
-            data['messages'] = [ChatMessageSerializer(welcome_message).data]
-            
-            return Response(data, status=status.HTTP_201_CREATED)
-            
+            return Response(*submissions.start_chat(project_id, data))
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=False, methods=['post'], url_path='send_message/(?P<project_id>[^/.]+)')
+    @idempotent('widget_send_message')
     def send_message(self, request, project_id=None):
         """Отправка сообщения в чат через виджет"""
+        data = submission_data(request.data)
         try:
-            session_id = request.data.get('session_id')
-            if not session_id:
-                return Response({'error': 'Session ID is required'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            session = get_object_or_404(ChatSession, id=session_id)
-            
-            # Создаем сообщение от пользователя
-            message = ChatMessage.objects.create(
-                session=session,
-                content=request.data.get('content', ''),
-                message_type=request.data.get('message_type', 'user')
-            )
-            
-            serializer = ChatMessageSerializer(message)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-            
+            return Response(*submissions.send_message(data))
         except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+# ===== Асинхронные версии эндпоинтов виджета (ASGI) =====
+# Те же URL и ответы, что у WidgetViewSet (общая логика — widget/submissions.py),
+# но без блокировки воркера на время запросов к БД. Подключаются в urls.py при
+# WIDGET_ASYNC_VIEWS.
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(json_dumps(data), status=status_code, content_type='application/json')
+
+
+def _request_data(request):
+    """Тело POST как dict; ParseError, если это не JSON-объект или форма."""
+    # Разбирается один раз: тело нужно и лимиту (client_id), и самому view
+    data = getattr(request, '_widget_data', None)
+    if data is None:
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or b'{}')
+            except (ValueError, UnicodeDecodeError) as e:
+                raise ParseError(f'JSON parse error - {e}')
+        else:
+            data = request.POST
+        data = submission_data(data)
+        request._widget_data = data
+    return data
+
+
+def _rate_limited(action):
+    """Лимиты core/ratelimit.py для async-view: отказ 429 до любых запросов к БД."""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, project_id, *args, **kwargs):
+            error = None
+            try:
+                data = _request_data(request) if request.method == 'POST' else request.GET
+            except ParseError as e:
+                # Неразобранное тело тоже расходует лимит IP и проекта
+                data, error = {}, e
+            wait = await ratelimit.acheck(
+                action, ip=ratelimit.client_ip(request), client_id=data.get('client_id'), project_id=project_id,
+            )
+            if wait is not None:
+                response = _json(
+                    {'detail': f'Request was throttled. Expected available in {wait} seconds.'},
+                    status.HTTP_429_TOO_MANY_REQUESTS,
+                )
+                response['Retry-After'] = str(wait)
+                return response
+            if error is not None:
+                return _json({'detail': error.detail}, status.HTTP_400_BAD_REQUEST)
+            return await view(request, project_id, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@require_GET
+@_rate_limited('get_channels')
+async def get_channels(request, project_id):
+    """Получение каналов для виджета"""
+    try:
+        return await awidget_config_response(request, project_id)
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+@require_POST
+@_rate_limited('record_exposure')
+async def record_exposure(request, project_id):
+    """Учет показа A/B-вариантов виджету, загруженному из статического снимка"""
+    try:
+        client_id = _request_data(request).get('client_id')
+        if not client_id:
+            return _json({'error': 'Client ID is required'}, status.HTTP_400_BAD_REQUEST)
+        return await aexposure_response(project_id, client_id)
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+@require_POST
+@_rate_limited('create_lead')
+@idempotent('widget_create_lead')
+async def create_lead(request, project_id):
+    """Создание лида через виджет"""
+    try:
+        data = _request_data(request)
+        if is_queued_mode():
+            # Запись в спул с fsync — вне event loop и вне потока ORM
+            return _json(*await sync_to_async(submissions.queue_submission, thread_sensitive=False)(project_id, data))
+        return _json(*await sync_to_async(submissions.create_lead)(project_id, data))
+    except ValidationError as e:
+        return _json(e.detail, status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+@require_POST
+@_rate_limited('create_callback')
+@idempotent('widget_create_callback')
+async def create_callback(request, project_id):
+    """Создание заявки на звонок через виджет"""
+    try:
+        return _json(*await sync_to_async(submissions.create_callback)(project_id, _request_data(request)))
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+@require_POST
+@_rate_limited('start_chat')
+@idempotent('widget_start_chat')
+async def start_chat(request, project_id):
+    """Начало чат-сессии через виджет"""
+    try:
+        return _json(*await sync_to_async(submissions.start_chat)(project_id, _request_data(request)))
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+@require_POST
+@_rate_limited('send_message')
+@idempotent('widget_send_message')
+async def send_message(request, project_id):
+    """Отправка сообщения в чат через виджет"""
+    try:
+        return _json(*await sync_to_async(submissions.send_message)(_request_data(request)))
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)